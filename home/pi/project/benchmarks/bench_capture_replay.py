@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_source import make_source_factory
+from frame_sync import SynchronizedCapture
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded session through synchronized capture')
+    parser.add_argument('session', help='Directory holding cam<N>.mp4 files or cam<N>/ image directories')
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--speed', type=float, default=0.0, help='Multiple of real time; 0 is as fast as possible')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--max-skew-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    capture_config = {
+        'source': 'replay',
+        'replay_path': args.session,
+        'replay_speed': args.speed,
+        'replay_loop': True,
+    }
+    capture = SynchronizedCapture(list(range(args.cameras)), max_skew_ms=args.max_skew_ms,
+                                  open_source=make_source_factory(capture_config))
+
+    frame_sets = 0
+    last_sequence = -1
+    capture.start_capture()
+    start_time = time.monotonic()
+    try:
+        while time.monotonic() - start_time < args.duration:
+            frame_set = capture.get_frame_set(after=last_sequence, timeout=1.0)
+            if frame_set is None:
+                continue
+            frame_sets += frame_set.sequence - last_sequence
+            last_sequence = frame_set.sequence
+    finally:
+        capture.stop_capture()
+
+    elapsed = time.monotonic() - start_time
+    print(f'{frame_sets} frame sets in {elapsed:.1f}s ({frame_sets / elapsed:.1f} sets/s)')
+    print(capture.get_skew_stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+import numpy as np
+import open3d as o3d
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact_mesh import decode_mesh, encode_mesh
+from depth_format import DepthFrame
+from grid_mesh import grid_mesh
+
+def open3d_format(extension):
+    # Encode and decode through Open3D itself, as save_model and the viewer's
+    # old .ply/.obj path do, so the comparison is against the real files
+    def encode(vertices, normals, triangles):
+        mesh = o3d.geometry.TriangleMesh()
+        mesh.vertices = o3d.utility.Vector3dVector(vertices.astype(np.float64))
+        mesh.vertex_normals = o3d.utility.Vector3dVector(normals.astype(np.float64))
+        mesh.triangles = o3d.utility.Vector3iVector(triangles)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'mesh' + extension)
+            o3d.io.write_triangle_mesh(path, mesh)
+            with open(path, 'rb') as file:
+                return file.read()
+
+    def decode(data):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'mesh' + extension)
+            with open(path, 'wb') as file:
+                file.write(data)
+            return o3d.io.read_triangle_mesh(path)
+    return encode, decode
+
+def best_of(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='Open3D PLY/OBJ vs compact mesh: size, decode and transfer time')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--stride', type=int, default=2)
+    parser.add_argument('--repeats', type=int, default=3)
+    # Pi 2 to viewer over the helmet's Wi-Fi
+    parser.add_argument('--link-mbps', type=float, default=20.0)
+    args = parser.parse_args()
+
+    # A grid mesh from a synthetic depth map stands in for a reconstructed model
+    rows, cols = np.mgrid[0:args.height, 0:args.width]
+    depth = (2000 + 300 * np.sin(cols / 40.0) * np.cos(rows / 50.0)).astype(np.uint16)
+    frame = DepthFrame(depth, 0, 0.0, 1.0, 500.0, 500.0, args.width / 2, args.height / 2)
+    vertices, normals, triangles = grid_mesh(frame, stride=args.stride)
+    print(f'{len(vertices)} vertices, {len(triangles)} triangles')
+
+    # Decoding .cmsh costs more CPU than reading a binary PLY, which is little
+    # more than a copy; it pays off wherever the link is slower than the
+    # decode, which the transfer column shows
+    formats = [('ply (open3d)',) + open3d_format('.ply'), ('obj (open3d)',) + open3d_format('.obj'),
+               ('compact', encode_mesh, decode_mesh)]
+    baseline = None
+    for name, encode, decode in formats:
+        data = encode(vertices, normals, triangles)
+        decode_time = best_of(lambda: decode(data), args.repeats)
+        baseline = baseline or len(data)
+        transfer_time = len(data) * 8 / (args.link_mbps * 1e6)
+        print(f'{name:13s} {len(data) / 1e6:8.2f} MB ({len(data) / baseline:5.2f}x)  '
+              f'deflated {len(zlib.compress(data, 6)) / 1e6:7.2f} MB  decode {decode_time * 1000:8.1f} ms  '
+              f'transfer at {args.link_mbps:g} Mbit/s {transfer_time * 1000:8.0f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_buffer import FrameRingBuffer
+from frame_bus import FrameBus
+
+SHAPE = (480, 640, 3)
+
+def encoded_frame():
+    # Cameras deliver MJPEG, so every captured frame costs one JPEG decode
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 255, SHAPE, dtype=np.uint8), (9, 9), 0)
+    return cv2.imencode('.jpg', frame)[1]
+
+def consume(frame):
+    # A mix of GIL-releasing OpenCV work and Python-level bookkeeping
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 50, 150)
+    return sum(int(v) for v in edges[::16, ::16].ravel())
+
+def run_threaded(cameras, consumers, duration):
+    jpeg = encoded_frame()
+    buffers = [FrameRingBuffer(4) for _ in range(cameras)]
+    for buffer in buffers:
+        buffer.allocate(SHAPE)
+    running = threading.Event()
+    running.set()
+    counts = [0] * consumers
+
+    def capture(buffer):
+        while running.is_set():
+            buffer.write_slot()[...] = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+            buffer.commit(time.monotonic())
+
+    def consumer(worker):
+        while running.is_set():
+            for buffer in buffers:
+                latest = buffer.latest()
+                if latest is not None:
+                    consume(latest[2])
+                    counts[worker] += 1
+
+    threads = [threading.Thread(target=capture, args=(buffer,)) for buffer in buffers]
+    threads += [threading.Thread(target=consumer, args=(worker,)) for worker in range(consumers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    running.clear()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+def bus_capture(spec, camera, running):
+    jpeg = encoded_frame()
+    bus = FrameBus.attach(spec)
+    while running.is_set():
+        reserved = bus.reserve(camera)
+        if reserved is None:
+            continue
+        slot, buffer = reserved
+        buffer[...] = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+        bus.commit(camera, slot)
+    bus.close()
+
+def bus_consumer(spec, cameras, running, count):
+    bus = FrameBus.attach(spec)
+    processed = 0
+    while running.is_set():
+        for camera in range(cameras):
+            ref = bus.acquire(camera, timeout=0.1)
+            if ref is not None:
+                with ref:
+                    consume(ref.frame)
+                processed += 1
+    bus.close()
+    with count.get_lock():
+        count.value += processed
+
+def run_processes(cameras, consumers, duration):
+    bus = FrameBus.create(cameras, SHAPE, slots=consumers + 3)
+    running = mp.Event()
+    running.set()
+    count = mp.Value('q', 0)
+
+    processes = [mp.Process(target=bus_capture, args=(bus.spec, camera, running)) for camera in range(cameras)]
+    processes += [mp.Process(target=bus_consumer, args=(bus.spec, cameras, running, count)) for _ in range(consumers)]
+    for process in processes:
+        process.start()
+    time.sleep(duration)
+    running.clear()
+    for process in processes:
+        process.join()
+    bus.close()
+    return count.value
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare threaded capture against the shared-memory frame bus')
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--consumers', type=int, default=3)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Keep OpenCV single-threaded so the comparison measures our own parallelism
+    cv2.setNumThreads(1)
+
+    threaded = run_threaded(args.cameras, args.consumers, args.duration)
+    processes = run_processes(args.cameras, args.consumers, args.duration)
+
+    print(f'cameras={args.cameras} consumers={args.consumers} cores={os.cpu_count()}')
+    print(f'threaded:  {threaded / args.duration:8.1f} consumed frames/s')
+    print(f'frame bus: {processes / args.duration:8.1f} consumed frames/s '
+          f'({processes / max(threaded, 1):.2f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parallel_depth import ParallelDepthStage
+from rectification import RectificationEngine
+from stereo_matchers import MatcherPool
+
+CALIBRATION = {
+    'camera_params': [
+        {
+            'camera_matrix': [[500.0, 0, 320.0], [0, 500.0, 240.0], [0, 0, 1]],
+            'distortion_coeffs': [[-0.2, 0.05, 0, 0, 0]],
+        }
+        for _ in range(4)
+    ],
+}
+
+def synthetic_frame_sets(count):
+    # Each camera sees the previous one's view shifted a few pixels
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 255, (480, 640), dtype=np.uint8), (5, 5), 0)
+    return [[np.roll(base, -4 * camera + offset, axis=1) for camera in range(4)] for offset in range(count)]
+
+def run_serial(frame_sets, stereo_config):
+    rectifier = RectificationEngine(CALIBRATION)
+    matchers = MatcherPool(stereo_config, 4)
+    start_time = time.perf_counter()
+    for frames in frame_sets:
+        for pair, (left, right) in enumerate(rectifier.rectify_frame_set(frames)):
+            matchers.compute(pair, left, right)
+    return len(frame_sets) / (time.perf_counter() - start_time)
+
+def run_stage(frame_sets, stereo_config, executor, workers):
+    stage = ParallelDepthStage(CALIBRATION, stereo_config, executor=executor, workers=workers)
+    # Warm up the workers so process start-up isn't counted
+    stage.submit(frame_sets[0])
+    stage.drain()
+    start_time = time.perf_counter()
+    for frames in frame_sets:
+        stage.submit(frames)
+    stage.drain()
+    elapsed = time.perf_counter() - start_time
+    stage.close()
+    return len(frame_sets) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Serial vs parallel ring-pair disparity throughput')
+    parser.add_argument('--frame-sets', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--algorithm', default='bm', choices=['bm', 'sgbm'])
+    parser.add_argument('--num-disparities', type=int, default=64)
+    args = parser.parse_args()
+
+    # Measure our own parallelism rather than OpenCV's internal threads
+    cv2.setNumThreads(1)
+    stereo_config = {'default': {'algorithm': args.algorithm, 'num_disparities': args.num_disparities,
+                                 'block_size': 15 if args.algorithm == 'bm' else 5}}
+    frame_sets = synthetic_frame_sets(args.frame_sets)
+
+    serial = run_serial(frame_sets, stereo_config)
+    print(f'cores={os.cpu_count()} workers={args.workers} algorithm={args.algorithm}')
+    print(f'serial:  {serial:6.1f} frame sets/s')
+    for executor in ('thread', 'process'):
+        throughput = run_stage(frame_sets, stereo_config, executor, args.workers)
+        print(f'{executor + ":":8} {throughput:6.1f} frame sets/s ({throughput / serial:.2f}x)')
+
+if __name__ == '__main__':
+    main()
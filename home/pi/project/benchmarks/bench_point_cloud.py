@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from point_cloud import back_project
+
+def loop_create_point_cloud(depth_map, intrinsic):
+    # The original per-pixel implementation from create_3d_model.py
+    height, width = depth_map.shape
+    fx, fy = intrinsic[0, 0], intrinsic[1, 1]
+    cx, cy = intrinsic[0, 2], intrinsic[1, 2]
+
+    point_cloud = []
+    for v in range(height):
+        for u in range(width):
+            depth = depth_map[v, u]
+            if depth > 0:
+                z = depth / 1000.0
+                x = (u - cx) * z / fx
+                y = (v - cy) * z / fy
+                point_cloud.append([x, y, z])
+
+    return np.array(point_cloud)
+
+def best_of(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-pixel loop vs vectorized back-projection')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    depth_map = rng.integers(500, 5000, (args.height, args.width)).astype(np.uint16)
+    depth_map[rng.random(depth_map.shape) < 0.2] = 0
+    intrinsic = np.array([[500.0, 0, args.width / 2], [0, 500.0, args.height / 2], [0, 0, 1]])
+
+    loop_time = best_of(lambda: loop_create_point_cloud(depth_map, intrinsic), 1)
+    print(f'{args.width}x{args.height}, {np.count_nonzero(depth_map)} valid pixels')
+    print(f'python loop:       {loop_time * 1000:9.1f} ms')
+    for stride in (1, 2, 4):
+        vector_time = best_of(lambda: back_project(depth_map, intrinsic, stride=stride), args.repeats)
+        print(f'vectorized (s={stride}): {vector_time * 1000:9.2f} ms ({loop_time / vector_time:.0f}x)')
+
+if __name__ == '__main__':
+    main()
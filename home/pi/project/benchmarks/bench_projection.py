@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from projection import Cylindrical, Equirectangular, ProjectionEngine
+
+def loop_cylindrical_projection(frame, fov_degrees):
+    # The original per-pixel implementation from depth_sensing.py
+    height, width, _ = frame.shape
+    fov_radians = np.radians(fov_degrees)
+
+    projected_width = int(width * fov_radians / (2 * np.pi))
+    projected_height = height
+
+    projected_img = np.zeros((projected_height, projected_width, 3), dtype=np.uint8)
+
+    center_x = width // 2
+    center_y = height // 2
+
+    for i in range(projected_width):
+        theta = i * (2 * np.pi) / projected_width
+        sin_theta = np.sin(theta)
+        cos_theta = np.cos(theta)
+
+        for j in range(projected_height):
+            x = int(center_x + (j - center_y) * sin_theta)
+            y = int(center_y + (j - center_y) * cos_theta)
+
+            if 0 <= x < width and 0 <= y < height:
+                projected_img[j, i] = frame[y, x]
+
+    return projected_img
+
+def best_of(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-pixel loop vs cached remap cylindrical projection')
+    # 360_video.mp4 is a 2:1 equirectangular stream
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=960)
+    parser.add_argument('--fov', type=float, default=120.0)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--face', type=int, default=512)
+    parser.add_argument('--batch', type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+
+    start_time = time.perf_counter()
+    loop_output = loop_cylindrical_projection(frame, args.fov)
+    loop_time = time.perf_counter() - start_time
+    print(f'{args.width}x{args.height} -> {loop_output.shape[1]}x{loop_output.shape[0]}, fov {args.fov:g}')
+    print(f'python loop:        {loop_time * 1000:9.1f} ms')
+
+    for name, interpolation in (('nearest', cv2.INTER_NEAREST), ('linear', cv2.INTER_LINEAR)):
+        engine = ProjectionEngine(interpolation=interpolation)
+        start_time = time.perf_counter()
+        output = engine.cylindrical(frame, args.fov)
+        build_time = time.perf_counter() - start_time
+        remap_time = best_of(lambda: engine.cylindrical(frame, args.fov), args.repeats)
+        note = ', identical to loop' if np.array_equal(output, loop_output) else ''
+        print(f'remap ({name}):{" " * (8 - len(name))}{remap_time * 1000:9.2f} ms ({loop_time / remap_time:.0f}x), '
+              f'first frame with map build {build_time * 1000:.1f} ms{note}')
+
+    # The same frame treated as equirectangular, as 360_video.mp4 is
+    engine = ProjectionEngine(cache_size=16, interpolation=cv2.INTER_LINEAR)
+    source = Equirectangular()
+    batch = np.stack([frame] * args.batch)
+    jobs = (
+        ('viewport 90 960x720', lambda frames: engine.viewport(frames, source, 90, 30, -10, (960, 720))),
+        (f'cubemap 6x{args.face}', lambda frames: engine.cubemap(frames, source, args.face)),
+        ('cylindrical 360', lambda frames: engine.reproject(frames, source, Cylindrical(360), (args.width, args.height))),
+    )
+    for name, job in jobs:
+        start_time = time.perf_counter()
+        job(frame)
+        build_time = time.perf_counter() - start_time
+        single_time = best_of(lambda: job(frame), args.repeats)
+        batch_time = best_of(lambda: job(batch), max(1, args.repeats // 4))
+        print(f'{name:24} first {build_time * 1000:7.1f} ms, then {single_time * 1000:6.2f} ms/frame, '
+              f'batch of {args.batch} {batch_time * 1000 / args.batch:6.2f} ms/frame')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TIMED_OUT = 'timed_out'
+
+def run_build(build, args):
+    # Own process group, so terminating a build also stops any pool workers it started
+    os.setpgrp()
+    build(*args)
+
+def terminate(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        process.terminate()
+
+class BuildStats:
+    def __init__(self):
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.timed_out = 0
+        # Pending builds replaced by a newer submission before they started
+        self.dropped = 0
+        self.total_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def report(self, queue_depth):
+        finished = self.completed + self.failed
+        return {
+            'queue_depth': queue_depth,
+            'submitted': self.submitted,
+            'started': self.started,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'timed_out': self.timed_out,
+            'dropped': self.dropped,
+            'last_build_s': self.last_seconds,
+            'mean_build_s': self.total_seconds / finished if finished else 0.0,
+        }
+
+class BuildScheduler:
+    # Runs build(*args) in a fresh worker process, one at a time. Only the
+    # newest submission waits: an older pending one is dropped, and with
+    # cancel_running the running build is terminated too. Builds that exceed
+    # time_budget seconds are terminated. on_finished(job_id, status) is
+    # called from the scheduler thread once a started build ends.
+    def __init__(self, build, time_budget=None, cancel_running=False, on_finished=None, poll_interval=0.05):
+        self.build = build
+        self.time_budget = time_budget
+        self.cancel_running = cancel_running
+        self.on_finished = on_finished
+        self.poll_interval = poll_interval
+        self.pending = None
+        self.process = None
+        self.job_id = None
+        self.started_at = None
+        self.stats = BuildStats()
+        self.condition = threading.Condition()
+        self.is_running = False
+        self.thread = None
+
+    def start(self):
+        self.is_running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, job_id, *args):
+        with self.condition:
+            if self.pending is not None:
+                self.stats.dropped += 1
+            self.pending = (job_id, args)
+            self.stats.submitted += 1
+            self.condition.notify_all()
+
+    def queue_depth(self):
+        with self.condition:
+            return (self.pending is not None) + (self.process is not None)
+
+    def launch_locked(self):
+        self.job_id, args = self.pending
+        self.pending = None
+        # Not a daemon, so builds may start pools of their own (tiled mode)
+        self.process = mp.Process(target=run_build, args=(self.build, args))
+        self.process.start()
+        self.started_at = time.monotonic()
+        self.stats.started += 1
+
+    def finish_locked(self, status):
+        elapsed = time.monotonic() - self.started_at
+        if status == COMPLETED:
+            self.stats.completed += 1
+        elif status == FAILED:
+            self.stats.failed += 1
+        elif status == CANCELLED:
+            self.stats.cancelled += 1
+        else:
+            self.stats.timed_out += 1
+        if status in (COMPLETED, FAILED):
+            self.stats.last_seconds = elapsed
+            self.stats.total_seconds += elapsed
+        self.process.join()
+        self.process.close()
+        job_id = self.job_id
+        self.process = None
+        self.job_id = None
+        return job_id
+
+    def run(self):
+        while self.is_running:
+            with self.condition:
+                if self.process is None:
+                    if self.pending is None:
+                        self.condition.wait(self.poll_interval)
+                        continue
+                    self.launch_locked()
+                process = self.process
+
+            process.join(self.poll_interval)
+
+            with self.condition:
+                if process.exitcode is not None:
+                    status = COMPLETED if process.exitcode == 0 else FAILED
+                elif self.time_budget and time.monotonic() - self.started_at > self.time_budget:
+                    status = TIMED_OUT
+                elif self.cancel_running and self.pending is not None:
+                    status = CANCELLED
+                else:
+                    continue
+                if status in (TIMED_OUT, CANCELLED):
+                    terminate(process)
+                job_id = self.finish_locked(status)
+            if self.on_finished is not None:
+                self.on_finished(job_id, status)
+
+    def get_stats(self):
+        with self.condition:
+            return self.stats.report((self.pending is not None) + (self.process is not None))
+
+    def close(self):
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join()
+        with self.condition:
+            if self.process is not None:
+                terminate(self.process)
+                self.finish_locked(CANCELLED)
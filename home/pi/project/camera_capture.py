@@ -1,17 +1,26 @@
 import cv2
 import threading
+import time
+from frame_buffer import FrameRingBuffer
+from frame_bus import BusCapture
+from frame_source import is_exhausted, make_source_factory
 
 class CameraCapture:
-    def __init__(self, camera_indices):
+    def __init__(self, camera_indices, buffer_depth=4, open_source=None):
         self.camera_indices = camera_indices
+        self.open_source = open_source or cv2.VideoCapture
         self.cameras = []
-        self.frames = {}
+        self.buffers = {index: FrameRingBuffer(buffer_depth) for index in camera_indices}
         self.capture_threads = []
         self.is_capturing = False
+        # Notified on every committed frame
+        self.condition = threading.Condition()
+        # Set when a source ran out, e.g. the end of a non-looping replay
+        self.ended = False
 
     def start_capture(self):
         for index in self.camera_indices:
-            camera = cv2.VideoCapture(index)
+            camera = self.open_source(index)
             if not camera.isOpened():
                 raise RuntimeError(f"Failed to open camera {index}")
             self.cameras.append(camera)
@@ -24,6 +33,8 @@ class CameraCapture:
 
     def stop_capture(self):
         self.is_capturing = False
+        with self.condition:
+            self.condition.notify_all()
         for thread in self.capture_threads:
             thread.join()
 
@@ -32,13 +43,84 @@ class CameraCapture:
         self.cameras = []
 
     def capture_frame(self, camera_index):
+        camera = self.cameras[self.camera_indices.index(camera_index)]
+        buffer = self.buffers[camera_index]
         while self.is_capturing:
-            ret, frame = self.cameras[camera_index].read()
-            if ret:
-                self.frames[camera_index] = frame
+            if not buffer.is_allocated():
+                ret, frame = camera.read()
+                if not ret and is_exhausted(camera):
+                    break
+                if ret:
+                    buffer.allocate(frame.shape, frame.dtype)
+                    buffer.write_slot()[...] = frame
+                    self.commit(buffer)
+                continue
+
+            # Decode straight into the next preallocated slot
+            slot = buffer.write_slot()
+            ret, frame = camera.read(slot)
+            if not ret:
+                if is_exhausted(camera):
+                    break
+                continue
+            if frame is not slot:
+                if frame.shape != slot.shape:
+                    buffer.allocate(frame.shape, frame.dtype)
+                    slot = buffer.write_slot()
+                slot[...] = frame
+            self.commit(buffer)
+        if self.is_capturing:
+            # This camera's source ran out; the others finish their own frames
+            self.ended = True
+
+    def commit(self, buffer):
+        with self.condition:
+            buffer.commit(time.monotonic())
+            self.condition.notify_all()
+
+    def get_frame(self, camera_index, n=0):
+        # Read-only view of the Nth-latest frame, valid until the ring wraps
+        latest = self.buffers[camera_index].latest(n)
+        if latest is None:
+            return None
+        return latest[2]
 
     def get_frames(self):
-        return self.frames
+        frames = {}
+        for index in self.camera_indices:
+            frame = self.get_frame(index)
+            if frame is not None:
+                frames[index] = frame
+        return frames
+
+    def get_new_frames(self, after, timeout=None):
+        # Newest frame of every camera, once any of them differs from the
+        # sequence in after[index] (a reallocated ring restarts at 0). Returns
+        # ({index: sequence}, {index: frame}), or None on timeout
+        def changed():
+            return any(self.buffers[index].sequence not in (-1, after.get(index, -1))
+                       for index in self.camera_indices)
+
+        with self.condition:
+            if not self.condition.wait_for(lambda: changed() or not self.is_capturing, timeout) or not changed():
+                return None
+        sequences = {}
+        frames = {}
+        for index in self.camera_indices:
+            latest = self.buffers[index].latest()
+            if latest is not None:
+                sequences[index] = latest[0]
+                frames[index] = latest[2]
+        return sequences, frames
+
+def make_camera_capture(camera_indices, capture_config=None):
+    # capture.frame_bus moves reading and decoding into one process per
+    # camera, publishing into shared memory; otherwise they are threads here
+    capture_config = capture_config or {}
+    if capture_config.get('frame_bus', False):
+        return BusCapture(camera_indices, capture_config.get('frame_shape', (480, 640, 3)), capture_config,
+                          slots=capture_config.get('frame_bus_slots', 6))
+    return CameraCapture(camera_indices, open_source=make_source_factory(capture_config))
 
 def main():
     camera_indices = [0, 1, 2, 3]  # Adjust the indices based on your camera setup
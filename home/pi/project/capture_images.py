@@ -1,9 +1,15 @@
 import cv2
-import numpy as np
 import os
+import signal
+import sys
+import threading
 import yaml
 import time
-import subprocess
+from frame_sync import SynchronizedCapture
+from frame_source import make_source_factory
+from parallel_depth import ParallelDepthStage
+from depth_format import EXTENSION, DisparityConverter, save_depth_frame
+from depth_transport import DepthSender
 
 # Load camera calibration data
 with open('camera_calibration.yaml', 'r') as file:
@@ -12,56 +18,108 @@ with open('camera_calibration.yaml', 'r') as file:
 # Extract calibration parameters for each camera
 camera_params = calibration_data['camera_params']
 
-def capture_images():
-    cameras = []
-    for i in range(4):
-        camera = cv2.VideoCapture(i)
-        cameras.append(camera)
-
-    while True:
-        frames = []
-        for camera in cameras:
-            ret, frame = camera.read()
-            if ret:
-                frames.append(frame)
-
-        if len(frames) == 4:
-            depth_maps = []
-            for i in range(4):
-                # Perform depth map computation for each camera pair
-                left_frame = frames[i]
-                right_frame = frames[(i+1) % 4]
-                left_camera_matrix = np.array(camera_params[i]['camera_matrix'])
-                left_distortion_coeffs = np.array(camera_params[i]['distortion_coeffs'])
-                right_camera_matrix = np.array(camera_params[(i+1) % 4]['camera_matrix'])
-                right_distortion_coeffs = np.array(camera_params[(i+1) % 4]['distortion_coeffs'])
-
-                # Undistort the images using camera calibration data
-                left_undistorted = cv2.undistort(left_frame, left_camera_matrix, left_distortion_coeffs)
-                right_undistorted = cv2.undistort(right_frame, right_camera_matrix, right_distortion_coeffs)
-
-                # Compute depth map for the camera pair
-                stereo = cv2.StereoBM_create(numDisparities=16, blockSize=15)
-                disparity = stereo.compute(cv2.cvtColor(left_undistorted, cv2.COLOR_BGR2GRAY),
-                                           cv2.cvtColor(right_undistorted, cv2.COLOR_BGR2GRAY))
-                depth_map = cv2.normalize(disparity, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
-                depth_maps.append(depth_map)
-
-            # Save depth maps to files
-            timestamp = int(time.time())
-            for i, depth_map in enumerate(depth_maps):
-                depth_map_filename = f'depth_map_{i}_{timestamp}.png'
-                cv2.imwrite(depth_map_filename, depth_map)
-
-                # Transfer depth map to Raspberry Pi 2
-                subprocess.run(['scp', depth_map_filename, 'pi@raspberrypi2:/path/to/depth_maps/'])
-
-                # Remove the depth map file after transfer
-                os.remove(depth_map_filename)
-
-    for camera in cameras:
-        camera.release()
+# Load capture settings
+with open('config.yaml', 'r') as file:
+    config = yaml.safe_load(file)
+
+depth_map_folder = config['depth_map_folder']
+capture_config = config.get('capture', {})
+depth_config = config.get('depth', {})
+transport_config = config.get('transport', {})
+
+# Disparity -> fixed-scale millimetre depth lookup tables, one per ring pair
+converters = {}
+
+def to_depth_frames(disparities, rectifier, timestamp):
+    depth_frames = []
+    for i, disparity in enumerate(disparities):
+        converter = converters.get(i)
+        if converter is None:
+            size = (disparity.shape[1], disparity.shape[0])
+            left, right = rectifier.pairs[i]
+            baseline_mm = rectifier.baseline(left, right, size) or depth_config.get('baseline_mm', 100.0)
+            converter = DisparityConverter(rectifier.projection(left, right, size), baseline_mm,
+                                           scale_mm=depth_config.get('scale_mm', 1.0),
+                                           max_depth_mm=depth_config.get('max_depth_mm', 20000.0))
+            converters[i] = converter
+        depth_frames.append(converter.convert(disparity, camera=i, timestamp=timestamp))
+    return depth_frames
+
+def send_depth_maps(sender, frame_set_id, depth_frames):
+    # Stream the depth maps to Raspberry Pi 2 over the persistent connection
+    for i, depth_frame in enumerate(depth_frames):
+        sender.send(i, frame_set_id, depth_frame.encode())
+
+def write_depth_maps(frame_set_id, depth_frames):
+    # transport.enabled: false. Pi 2 watches depth_map_folder and joins the
+    # files into frame sets by the capture timestamp in their headers
+    for depth_frame in depth_frames:
+        filename = f'depth_map_{depth_frame.camera}_{int(depth_frame.timestamp * 1e6)}{EXTENSION}'
+        save_depth_frame(os.path.join(depth_map_folder, filename), depth_frame)
+
+def capture_images(duration=None, stop_event=None):
+    # Runs until duration seconds have passed, stop_event is set or a replay
+    # ends, then finishes the depth sets still in flight before closing
+
+    # Frame sets are only emitted when all four cameras were grabbed within max_skew_ms
+    capture = SynchronizedCapture(list(range(4)), max_skew_ms=capture_config.get('max_skew_ms', 5.0),
+                                  open_source=make_source_factory(capture_config))
+
+    # Ring pairs run in parallel; the next frame set is rectified while the
+    # previous one's disparities are still being computed
+    depth_stage = ParallelDepthStage(calibration_data, config.get('stereo', {}),
+                                     executor=depth_config.get('executor', 'thread'),
+                                     workers=depth_config.get('workers', 4),
+                                     max_in_flight=depth_config.get('max_in_flight', 2),
+                                     cache_dir=capture_config.get('rectify_cache_dir'),
+                                     config_path='config.yaml')
+    sender = None
+    if transport_config.get('enabled', True):
+        sender = DepthSender(transport_config.get('host', 'raspberrypi2'), transport_config.get('port', 8100),
+                             batch_size=transport_config.get('batch_size', 4),
+                             max_unacked=transport_config.get('max_unacked', 8))
+        sender.start()
+        emit = lambda frame_set_id, depth_frames: send_depth_maps(sender, frame_set_id, depth_frames)
+    else:
+        os.makedirs(depth_map_folder, exist_ok=True)
+        emit = write_depth_maps
+    stop_event = stop_event or threading.Event()
+    capture.start_capture()
+    start_time = time.monotonic()
+    last_sequence = -1
+
+    try:
+        while not stop_event.is_set():
+            if duration is not None and time.monotonic() - start_time >= duration:
+                break
+            frame_set = capture.get_frame_set(after=last_sequence, timeout=1.0)
+            if frame_set is None:
+                # After the end of a replay, only once its last set is taken
+                if capture.ended:
+                    break
+                continue
+            last_sequence = frame_set.sequence
+            frames = frame_set.frames
+
+            if last_sequence % 300 == 0:
+                print(f'Depth stage: {depth_stage.get_stats()}')
+
+            if len(frames) == 4:
+                # Convert to grayscale first so the remap touches one channel instead of three
+                gray_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
 
+                tag = (frame_set.sequence, time.time())
+                for (sequence, timestamp), disparities in depth_stage.submit(gray_frames, tag):
+                    emit(sequence, to_depth_frames(disparities, depth_stage.rectifier, timestamp))
+
+        for (sequence, timestamp), disparities in depth_stage.drain():
+            emit(sequence, to_depth_frames(disparities, depth_stage.rectifier, timestamp))
+    finally:
+        depth_stage.close()
+        if sender is not None:
+            sender.close()
+        capture.stop_capture()
+    print(f'Capture finished. Depth stage: {depth_stage.get_stats()}')
 
 def read_camera_intrinsics(file_path):
     with open(file_path, 'r') as file:
@@ -74,115 +132,15 @@ def read_camera_intrinsics(file_path):
             intrinsics[key.strip()] = float(value.strip())
     return intrinsics
 
-# ...
-
 # Read camera intrinsics
 intrinsics_path = '/home/pi/project/camera_intrinsics/camera_intrinsics.txt'
 camera_intrinsics = read_camera_intrinsics(intrinsics_path)
 
-# Use the camera intrinsics in the depth map computation
-# ...
-
-
-
-def start_recording(duration):
-    # Start capturing images and computing depth maps
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        # Capture images and compute depth maps
-        # ...
-
-    # Transfer depth maps to Raspberry Pi 2
-    # ...
-
-def stop_recording():
-    # Stop capturing images and computing depth maps
-    # ...
-
-# Main program
-if len(sys.argv) > 1:
-    duration = int(sys.argv[1])
-    start_recording(duration)
-else:
-    stop_recording()
-
-
-#####Add in below:
-
-import cv2
-import numpy as np
-import os
-import yaml
-import time
-import subprocess
-
-# Load camera calibration data
-with open('camera_calibration.yaml', 'r') as file:
-    calibration_data = yaml.safe_load(file)
-
-# Extract calibration parameters
-left_camera_matrix = np.array(calibration_data['left_camera_matrix'])
-left_distortion_coeffs = np.array(calibration_data['left_distortion_coeffs'])
-right_camera_matrix = np.array(calibration_data['right_camera_matrix'])
-right_distortion_coeffs = np.array(calibration_data['right_distortion_coeffs'])
-stereo_rotation = np.array(calibration_data['stereo_rotation'])
-stereo_translation = np.array(calibration_data['stereo_translation'])
-
-# Set up stereo camera configuration
-stereo_config = cv2.stereoBM_create()
-stereo_config.setNumDisparities(128)
-stereo_config.setBlockSize(15)
-
-def capture_images():
-    left_camera = cv2.VideoCapture(0)  # Adjust the camera index if necessary
-    right_camera = cv2.VideoCapture(1)  # Adjust the camera index if necessary
-
-    while True:
-        # Capture images from left and right cameras
-        ret_left, left_frame = left_camera.read()
-        ret_right, right_frame = right_camera.read()
-
-        if ret_left and ret_right:
-            # Undistort the images using camera calibration data
-            left_undistorted = cv2.undistort(left_frame, left_camera_matrix, left_distortion_coeffs)
-            right_undistorted = cv2.undistort(right_frame, right_camera_matrix, right_distortion_coeffs)
-
-            # Compute depth map
-            disparity = stereo_config.compute(cv2.cvtColor(left_undistorted, cv2.COLOR_BGR2GRAY),
-                                              cv2.cvtColor(right_undistorted, cv2.COLOR_BGR2GRAY))
-            depth_map = cv2.normalize(disparity, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
-
-            # Save depth map to a file
-            timestamp = int(time.time())
-            depth_map_filename = f'depth_map_{timestamp}.png'
-            cv2.imwrite(depth_map_filename, depth_map)
-
-            # Transfer depth map to Raspberry Pi 2
-            subprocess.run(['scp', depth_map_filename, 'pi@raspberrypi2:/path/to/depth_maps/'])
-
-            # Remove the depth map file after transfer
-            os.remove(depth_map_filename)
-
-        else:
-            break
-
-    left_camera.release()
-    right_camera.release()
-
-def start_recording(duration):
-    start_time = time.time()
-
-    while time.time() - start_time < duration:
-        capture_images()
-
-    print('Recording completed.')
-
-def stop_recording():
-    print('Recording stopped.')
-
-# Check command-line arguments
-if len(sys.argv) > 1:
-    duration = int(sys.argv[1])
-    start_recording(duration)
-else:
-    stop_recording()
+if __name__ == '__main__':
+    # python capture_images.py [duration_seconds]. Without a duration it runs
+    # until Ctrl-C, SIGTERM or the end of a replay; either way the depth sets
+    # in flight are still sent
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    capture_images(float(sys.argv[1]) if len(sys.argv) > 1 else None, stop_event)
@@ -0,0 +1,109 @@
+// Browser decoder for the .cmsh files written by compact_mesh.py; the layout
+// is documented there. Returns {vertices, normals, triangles} as typed arrays
+// ready for a THREE.BufferGeometry; normals is null when the file has none.
+var CMS_HEADER_BYTES = 44;
+var CMS_FLAG_NORMALS = 1;
+var CMS_POSITION_LEVELS = 65535;
+var CMS_NORMAL_LEVELS = 127;
+
+function decodeCompactMesh(buffer) {
+    var view = new DataView(buffer);
+    var magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== 'CMS1' || view.getUint16(4, true) !== 1) {
+        throw new Error('Not a compact mesh');
+    }
+    var flags = view.getUint16(6, true);
+    var vertexCount = view.getUint32(8, true);
+    var triangleCount = view.getUint32(12, true);
+    var indexBytes = view.getUint32(16, true);
+    var scale = [];
+    var lower = [];
+    for (var axis = 0; axis < 3; axis++) {
+        lower.push(view.getFloat32(20 + 4 * axis, true));
+        var upper = view.getFloat32(32 + 4 * axis, true);
+        scale.push((upper > lower[axis] ? upper - lower[axis] : 1.0) / CMS_POSITION_LEVELS);
+    }
+
+    var offset = CMS_HEADER_BYTES;
+    var vertices = new Float32Array(vertexCount * 3);
+    for (var i = 0; i < vertexCount * 3; i++) {
+        vertices[i] = view.getUint16(offset + 2 * i, true) * scale[i % 3] + lower[i % 3];
+    }
+    offset += vertexCount * 6;
+
+    var normals = null;
+    if (flags & CMS_FLAG_NORMALS) {
+        // Octahedral: z is what x and y leave over; the lower half is folded
+        normals = new Float32Array(vertexCount * 3);
+        for (var v = 0; v < vertexCount; v++) {
+            var x = view.getInt8(offset + 2 * v) / CMS_NORMAL_LEVELS;
+            var y = view.getInt8(offset + 2 * v + 1) / CMS_NORMAL_LEVELS;
+            var z = 1.0 - Math.abs(x) - Math.abs(y);
+            var t = Math.max(-z, 0.0);
+            x -= x >= 0 ? t : -t;
+            y -= y >= 0 ? t : -t;
+            var length = Math.sqrt(x * x + y * y + z * z);
+            normals[3 * v] = x / length;
+            normals[3 * v + 1] = y / length;
+            normals[3 * v + 2] = z / length;
+        }
+        offset += vertexCount * 2;
+    }
+
+    // Delta + zigzag + LEB128 varints; values can exceed 32 bits, so no bit ops
+    var bytes = new Uint8Array(buffer, offset, indexBytes);
+    var triangles = new Uint32Array(triangleCount * 3);
+    var index = 0;
+    var value = 0;
+    var multiplier = 1;
+    var count = 0;
+    for (var b = 0; b < indexBytes; b++) {
+        value += (bytes[b] & 0x7f) * multiplier;
+        if (bytes[b] & 0x80) {
+            multiplier *= 128;
+            continue;
+        }
+        index += value % 2 ? -(value + 1) / 2 : value / 2;
+        triangles[count++] = index;
+        value = 0;
+        multiplier = 1;
+    }
+    if (count !== triangleCount * 3 || multiplier !== 1) {
+        throw new Error('Truncated compact mesh');
+    }
+    return {vertices: vertices, normals: normals, triangles: triangles};
+}
+
+if (typeof AFRAME !== 'undefined') {
+    // <a-entity compact-mesh="src: model_lod3.cmsh">
+    AFRAME.registerComponent('compact-mesh', {
+        schema: {src: {type: 'string'}, color: {type: 'color', default: '#cccccc'}},
+        update: function () {
+            var el = this.el;
+            var color = this.data.color;
+            fetch(this.data.src).then(function (response) {
+                return response.arrayBuffer();
+            }).then(function (buffer) {
+                var THREE = AFRAME.THREE;
+                var mesh = decodeCompactMesh(buffer);
+                var geometry = new THREE.BufferGeometry();
+                geometry.setAttribute('position', new THREE.BufferAttribute(mesh.vertices, 3));
+                geometry.setIndex(new THREE.BufferAttribute(mesh.triangles, 1));
+                if (mesh.normals) {
+                    geometry.setAttribute('normal', new THREE.BufferAttribute(mesh.normals, 3));
+                } else {
+                    geometry.computeVertexNormals();
+                }
+                var material = new THREE.MeshStandardMaterial({color: color, side: THREE.DoubleSide});
+                el.setObject3D('mesh', new THREE.Mesh(geometry, material));
+            });
+        },
+        remove: function () {
+            this.el.removeObject3D('mesh');
+        }
+    });
+}
+
+if (typeof module !== 'undefined') {
+    module.exports = {decodeCompactMesh: decodeCompactMesh};
+}
@@ -0,0 +1,209 @@
+import os
+import struct
+import numpy as np
+
+# Compact mesh container, sections in this order so a reader can stream them:
+#   header
+#   positions  uint16 x 3 per vertex, quantized over the bounding box
+#   normals    int8 x 2 per vertex, octahedral encoding (only if FLAG_NORMALS)
+#   indices    triangle index stream, delta + zigzag + LEB128 varint bytes
+MAGIC = b'CMS1'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIffffff')
+FLAG_NORMALS = 1
+EXTENSION = '.cmsh'
+
+POSITION_LEVELS = 65535
+NORMAL_LEVELS = 127
+
+def quantize_positions(vertices):
+    lower = vertices.min(axis=0) if len(vertices) else np.zeros(3, dtype=np.float32)
+    upper = vertices.max(axis=0) if len(vertices) else np.zeros(3, dtype=np.float32)
+    extent = np.where(upper > lower, upper - lower, 1.0)
+    quantized = np.rint((vertices - lower) * (POSITION_LEVELS / extent)).astype('<u2')
+    return quantized, lower.astype(np.float32), upper.astype(np.float32)
+
+def dequantize_positions(quantized, lower, upper):
+    extent = np.where(upper > lower, upper - lower, 1.0).astype(np.float32)
+    return quantized.astype(np.float32) * (extent / POSITION_LEVELS) + lower
+
+def sign_not_zero(values):
+    return np.where(values >= 0, 1.0, -1.0).astype(np.float32)
+
+def octahedral_encode(normals):
+    # Project onto the octahedron |x| + |y| + |z| = 1 and fold the lower half over
+    normals = np.asarray(normals, dtype=np.float32)
+    norm = np.abs(normals).sum(axis=1, keepdims=True)
+    norm[norm == 0] = 1.0
+    projected = normals[:, :2] / norm
+    lower = normals[:, 2] < 0
+    folded = (1.0 - np.abs(projected[:, ::-1])) * sign_not_zero(projected)
+    projected[lower] = folded[lower]
+    return np.rint(projected * NORMAL_LEVELS).astype(np.int8)
+
+def octahedral_decode(encoded):
+    projected = encoded.astype(np.float32) * np.float32(1.0 / NORMAL_LEVELS)
+    x = projected[:, 0]
+    y = projected[:, 1]
+    z = 1.0 - np.abs(x) - np.abs(y)
+    # Unfold the lower half: shift x and y back by how far z went below zero
+    t = np.maximum(-z, 0.0)
+    normals = np.empty((len(encoded), 3), dtype=np.float32)
+    normals[:, 0] = x - np.copysign(t, x)
+    normals[:, 1] = y - np.copysign(t, y)
+    normals[:, 2] = z
+    normals *= 1.0 / np.sqrt(np.einsum('ij,ij->i', normals, normals))[:, np.newaxis]
+    return normals
+
+def encode_varints(values):
+    # Unsigned LEB128, vectorized: 7 bits per byte, high bit set on all but the last
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28, 35):
+        lengths += values >= (1 << bits)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    output = np.empty(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+    for k in range(int(lengths.max()) if len(values) else 0):
+        present = lengths > k
+        chunk = (values[present] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[present] > k + 1).astype(np.uint64) << np.uint64(7)
+        output[starts[present] + k] = (chunk | more).astype(np.uint8)
+    return output
+
+def decode_varints(data):
+    # Returns the decoded values and how many bytes they used; a value cut
+    # off at the end of data is left for the next call. Most indices fit in
+    # one or two bytes, so each pass only touches the values still going.
+    data = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(data < 0x80)
+    if len(ends) == 0:
+        return np.empty(0, dtype=np.uint64), 0
+    used = int(ends[-1]) + 1
+    starts = np.empty(len(ends), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    values = (data[starts] & 0x7F).astype(np.uint64)
+    longer = np.flatnonzero(ends > starts)
+    shift = 7
+    while len(longer):
+        positions = starts[longer] + shift // 7
+        values[longer] |= (data[positions] & 0x7F).astype(np.uint64) << np.uint64(shift)
+        longer = longer[ends[longer] > positions]
+        shift += 7
+    return values, used
+
+def encode_indices(triangles):
+    # Consecutive indices in a mesh are usually close, so the deltas are small
+    flat = np.asarray(triangles, dtype=np.int64).reshape(-1)
+    deltas = np.diff(flat, prepend=0)
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+    return encode_varints(zigzag.astype(np.uint64))
+
+def decode_deltas(zigzag, base=0):
+    deltas = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    return np.cumsum(deltas) + base
+
+def encode_mesh(vertices, normals, triangles):
+    # Same (vertices, normals, triangles) order as grid_mesh; normals may be None
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    positions, lower, upper = quantize_positions(vertices)
+    flags = FLAG_NORMALS if normals is not None else 0
+    index_bytes = encode_indices(triangles)
+    parts = [HEADER.pack(MAGIC, VERSION, flags, len(vertices), len(triangles), len(index_bytes),
+                         *lower.tolist(), *upper.tolist()),
+             positions.tobytes()]
+    if normals is not None:
+        parts.append(octahedral_encode(np.asarray(normals).reshape(-1, 3)).tobytes())
+    parts.append(index_bytes.tobytes())
+    return b''.join(parts)
+
+def concatenate_chunks(chunks, width, dtype):
+    chunks = list(chunks)
+    return np.concatenate(chunks, axis=0) if chunks else np.empty((0, width), dtype=dtype)
+
+def decode_mesh(buffer):
+    reader = CompactMeshReader(memoryview(buffer))
+    vertices = concatenate_chunks(reader.iter_positions(), 3, np.float32)
+    normals = concatenate_chunks(reader.iter_normals(), 3, np.float32) if reader.has_normals else None
+    triangles = concatenate_chunks(reader.iter_triangles(), 3, np.uint32)
+    return vertices, normals, triangles
+
+def save_compact_mesh(path, vertices, normals, triangles):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(encode_mesh(vertices, normals, triangles))
+    os.replace(temp_path, path)
+
+def load_compact_mesh(path):
+    with open(path, 'rb') as file:
+        return decode_mesh(file.read())
+
+class BufferFile:
+    # Minimal read() over an in-memory buffer, so one reader serves both
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.offset = 0
+
+    def read(self, size):
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset += len(data)
+        return data
+
+class CompactMeshReader:
+    # Reads a compact mesh section by section in chunks, from a file object
+    # (or a bytes-like buffer); the iterators must be consumed in order
+    def __init__(self, source, chunk_vertices=65536, chunk_bytes=1 << 18):
+        self.file = BufferFile(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+        header = HEADER.unpack(self.read_exactly(HEADER.size))
+        magic, version, flags, self.vertex_count, self.triangle_count, self.index_bytes = header[:6]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a compact mesh")
+        self.lower = np.array(header[6:9], dtype=np.float32)
+        self.upper = np.array(header[9:12], dtype=np.float32)
+        self.has_normals = bool(flags & FLAG_NORMALS)
+        self.chunk_vertices = chunk_vertices
+        self.chunk_bytes = chunk_bytes
+
+    def read_exactly(self, size):
+        data = self.file.read(size)
+        if len(data) != size:
+            raise ValueError("Truncated compact mesh")
+        return data
+
+    def iter_positions(self):
+        for start in range(0, self.vertex_count, self.chunk_vertices):
+            count = min(self.chunk_vertices, self.vertex_count - start)
+            quantized = np.frombuffer(self.read_exactly(count * 6), dtype='<u2').reshape(-1, 3)
+            yield dequantize_positions(quantized, self.lower, self.upper)
+
+    def iter_normals(self):
+        if not self.has_normals:
+            return
+        for start in range(0, self.vertex_count, self.chunk_vertices):
+            count = min(self.chunk_vertices, self.vertex_count - start)
+            yield octahedral_decode(np.frombuffer(self.read_exactly(count * 2), dtype=np.int8).reshape(-1, 2))
+
+    def iter_triangles(self):
+        # Varints and triangles may straddle chunk boundaries; both carry over
+        remaining = self.index_bytes
+        pending_bytes = b''
+        pending_indices = np.empty(0, dtype=np.int64)
+        base = 0
+        while remaining > 0:
+            data = self.read_exactly(min(self.chunk_bytes, remaining))
+            remaining -= len(data)
+            data = pending_bytes + bytes(data)
+            zigzag, used = decode_varints(data)
+            pending_bytes = data[used:]
+            indices = decode_deltas(zigzag, base)
+            if len(indices):
+                base = int(indices[-1])
+            indices = np.concatenate((pending_indices, indices))
+            whole = len(indices) - len(indices) % 3
+            pending_indices = indices[whole:]
+            if whole:
+                yield indices[:whole].astype(np.uint32).reshape(-1, 3)
+        if pending_bytes or len(pending_indices):
+            raise ValueError("Truncated compact mesh")
@@ -1,3 +1,4 @@
+import json
 import paramiko
 import time
 
@@ -20,10 +21,13 @@ def stop_recording():
     send_command('192.168.0.1', 'pi', './stop_recording.sh')
     print("Recording stopped.")
 
-def retrieve_model():
-    # Retrieve the generated 3D model from Raspberry Pi 2
-    send_command('192.168.0.2', 'pi', 'scp /home/pi/project/output/output_3d_model.obj user@networked_computer:/path/to/save/')
-    print("3D model retrieved successfully.")
+def retrieve_model(level='preview'):
+    # Raspberry Pi 2 writes latest.json next to each model; it names the full
+    # mesh and its coarsest level of detail, which is a fraction of the size
+    manifest = json.loads(send_command('192.168.0.2', 'pi', 'cat /home/pi/project/output/latest.json'))
+    filename = manifest[level]
+    send_command('192.168.0.2', 'pi', f'scp /home/pi/project/output/{filename} user@networked_computer:/path/to/save/')
+    print(f"3D model {level} ({filename}) retrieved successfully.")
 
 # Main program
 duration = int(input("Enter the duration of the recording session (in seconds): "))
@@ -31,6 +35,8 @@ start_recording(duration)
 time.sleep(duration)
 stop_recording()
 retrieve_model()
+if input("Retrieve the full-resolution model? [y/N] ").lower() == 'y':
+    retrieve_model('full')
 
 ### INTEGRATE BELOW
 
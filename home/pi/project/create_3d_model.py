@@ -1,9 +1,22 @@
-import cv2
 import numpy as np
 import os
 import time
 import open3d as o3d
+import queue
+import threading
 import yaml
+from build_scheduler import BuildScheduler
+from depth_format import decode_depth_frame, load_depth_frame
+from depth_transport import DepthReceiver, FrameSetAssembler
+from depth_watcher import DepthMapWatcher
+from manifest import FrameSetManifest
+from mesh_lod import export_lods
+from grid_mesh import grid_mesh, merge_meshes
+from point_cloud import back_project
+from point_reduction import PointReducer
+from point_store import PointStore
+from tiled_reconstruction import TileMeshCache, TiledReconstructor
+from tsdf_fusion import TSDFFusion
 
 # Load configuration parameters
 with open('config.yaml', 'r') as file:
@@ -11,56 +24,120 @@ with open('config.yaml', 'r') as file:
 
 depth_map_folder = config['depth_map_folder']
 output_folder = config['output_folder']
-camera_params = config['camera_params']
-
-def create_point_cloud(depth_map, intrinsic):
-    height, width = depth_map.shape
-    fx, fy = intrinsic[0, 0], intrinsic[1, 1]
-    cx, cy = intrinsic[0, 2], intrinsic[1, 2]
-
-    point_cloud = []
-    for v in range(height):
-        for u in range(width):
-            depth = depth_map[v, u]
-            if depth > 0:
-                z = depth / 1000.0  # Convert depth from millimeters to meters
-                x = (u - cx) * z / fx
-                y = (v - cy) * z / fy
-                point_cloud.append([x, y, z])
-
-    return np.array(point_cloud)
-
-def create_3d_model():
-    depth_maps = []
-    timestamps = []
-
-    # Read depth maps from the folder
-    for i in range(8):
-        depth_map_files = [file for file in os.listdir(depth_map_folder) if file.startswith(f'depth_map_{i}_')]
-        depth_map_files.sort()
-
-        for filename in depth_map_files:
-            depth_map = cv2.imread(os.path.join(depth_map_folder, filename), cv2.IMREAD_UNCHANGED)
-            depth_maps.append(depth_map)
-            timestamps.append(int(filename.split('_')[-1].split('.')[0]))
-
-    # Sort depth maps based on timestamps
-    depth_maps = [depth_map for _, depth_map in sorted(zip(timestamps, depth_maps))]
-
-    # Create point clouds from depth maps
+transport_config = config.get('transport', {})
+model_config = config.get('model', {})
+reducer = PointReducer(model_config.get('reduction'))
+
+def create_point_cloud(depth_map, intrinsic, scale_mm=1.0):
+    # Vectorized back-projection over cached per-intrinsics ray grids
+    return back_project(depth_map, intrinsic, scale_mm, stride=model_config.get('pixel_stride', 1))
+
+def create_3d_model(depth_map_paths):
+    # Load one complete frame set; each file holds one camera's depth map
+    build_model([load_depth_frame(path) for path in depth_map_paths])
+
+def save_model(mesh):
+    # Full mesh plus decimated levels of detail and a manifest, so the
+    # control computer can fetch a small preview first
+    timestamp = int(time.time())
+    export_lods(mesh, output_folder, f'3d_model_{timestamp}',
+                model_config.get('lod_triangles', [200000, 50000, 10000]),
+                compact=model_config.get('compact_export', True))
+    print('3D model created successfully.')
+
+def build_model(depth_frames):
+    mode = model_config.get('mode', 'poisson')
+    if mode == 'tsdf':
+        fuse_model(depth_frames)
+    elif mode == 'grid':
+        build_grid_model(depth_frames)
+    elif mode == 'tiled':
+        build_tiled_model(depth_frames)
+    else:
+        build_poisson_model(depth_frames)
+
+def build_grid_model(depth_frames):
+    # Live-preview path: each depth map is meshed over its own pixel grid, no
+    # normal estimation or Poisson; cost is linear in the number of pixels
+    grid_config = model_config.get('grid', {})
+    camera_poses = model_config.get('camera_poses') or {}
+    meshes = [grid_mesh(depth_frame, stride=model_config.get('pixel_stride', 1),
+                        max_depth_jump=grid_config.get('max_depth_jump', 0.05),
+                        camera_pose=camera_poses.get(depth_frame.camera))
+              for depth_frame in depth_frames]
+    save_model(to_triangle_mesh(*merge_meshes(meshes)))
+
+def to_triangle_mesh(vertices, normals, triangles):
+    mesh = o3d.geometry.TriangleMesh()
+    mesh.vertices = o3d.utility.Vector3dVector(vertices.astype(np.float64))
+    mesh.vertex_normals = o3d.utility.Vector3dVector(normals.astype(np.float64))
+    mesh.triangles = o3d.utility.Vector3iVector(triangles)
+    return mesh
+
+def tiled_points(depth_frames):
+    point_clouds = [create_point_cloud(depth_frame.depth, depth_frame.intrinsic_matrix(), depth_frame.scale_mm)
+                    for depth_frame in depth_frames]
+    return reducer.reduce(point_clouds)
+
+# On-disk store for model.tiled.accumulate, opened once in this process;
+# build processes fork from it and see the points committed before they start
+point_store = None
+
+def get_point_store():
+    global point_store
+    if point_store is None:
+        tiled_config = model_config.get('tiled', {})
+        point_store = PointStore(tiled_config.get('store_path', os.path.join(output_folder, 'points')),
+                                 bucket_size=tiled_config.get('tile_size', 2.0))
+    return point_store
+
+def accumulate(depth_frames):
+    # Called as each frame set arrives, so every set reaches the store even
+    # when the scheduler replaces its build with a newer one
+    if model_config.get('mode', 'poisson') == 'tiled' and model_config.get('tiled', {}).get('accumulate', False):
+        get_point_store().append(tiled_points(depth_frames))
+
+def build_tiled_model(depth_frames):
+    # Poisson per overlapping spatial tile in a process pool, cropped at the
+    # tile boundaries and merged; memory is bounded by model.tiled.memory_budget_mb
+    tiled_config = model_config.get('tiled', {})
+    reconstructor = TiledReconstructor(tile_size=tiled_config.get('tile_size', 2.0),
+                                       overlap=tiled_config.get('overlap', 0.2),
+                                       workers=tiled_config.get('workers'),
+                                       memory_budget_mb=tiled_config.get('memory_budget_mb', 512),
+                                       bytes_per_point=tiled_config.get('bytes_per_point', 1000),
+                                       poisson_depth=tiled_config.get('poisson_depth', 8))
+    try:
+        if tiled_config.get('accumulate', False):
+            # Long sessions: accumulate() already added the frame set to
+            # everything captured so far, and only store buckets with new
+            # points nearby are meshed again; the rest come from the cache
+            store = get_point_store()
+            cache = TileMeshCache(os.path.join(store.root, 'meshes'))
+            mesh = to_triangle_mesh(*reconstructor.reconstruct_store(store, tiled_config.get('store_voxel_size', 0.01),
+                                                                     cache))
+        else:
+            mesh = to_triangle_mesh(*reconstructor.reconstruct(tiled_points(depth_frames)))
+    finally:
+        reconstructor.close()
+    print(f'Tiled reconstruction: {reconstructor.get_stats()}')
+    save_model(mesh)
+
+def build_poisson_model(depth_frames):
+    # Create point clouds from depth maps; each frame carries its own scale and intrinsics
     point_clouds = []
-    for i in range(8):
-        depth_map = depth_maps[i]
-        intrinsic_matrix = np.array(camera_params[i]['intrinsic_matrix'])
-        point_cloud = create_point_cloud(depth_map, intrinsic_matrix)
+    for depth_frame in depth_frames:
+        point_cloud = create_point_cloud(depth_frame.depth, depth_frame.intrinsic_matrix(), depth_frame.scale_mm)
         point_clouds.append(point_cloud)
 
-    # Combine point clouds
-    combined_point_cloud = np.concatenate(point_clouds, axis=0)
+    # Combine point clouds, bounded to a point budget before normals and Poisson
+    combined_point_cloud = reducer.reduce(point_clouds)
+    print(f'Point reduction: {reducer.get_stats()}')
 
     # Create Open3D point cloud object
     pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(combined_point_cloud)
+    # Open3D only takes float64 without falling back to a slow per-point copy
+    pcd.points = o3d.utility.Vector3dVector(combined_point_cloud.astype(np.float64))
 
     # Estimate normals
     pcd.estimate_normals()
@@ -69,20 +146,126 @@ def create_3d_model():
     mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=8, width=0, scale=1.1, linear_fit=False)[0]
 
     # Save the 3D model
-    timestamp = int(time.time())
-    output_filename = os.path.join(output_folder, f'3d_model_{timestamp}.ply')
-    o3d.io.write_triangle_mesh(output_filename, mesh)
+    save_model(mesh)
 
-    print('3D model created successfully.')
+# Persistent TSDF volume for mode: tsdf, created on the first frame set
+fusion = None
+
+def fuse_model(depth_frames):
+    # Integrate the frame set into the running volume; a mesh is only
+    # extracted and written every tsdf.mesh_interval seconds
+    global fusion
+    if fusion is None:
+        tsdf_config = model_config.get('tsdf', {})
+        fusion = TSDFFusion(voxel_length=tsdf_config.get('voxel_length', 0.01),
+                            sdf_trunc=tsdf_config.get('sdf_trunc', 0.04),
+                            depth_trunc=tsdf_config.get('depth_trunc', 10.0),
+                            camera_poses=model_config.get('camera_poses'),
+                            mesh_interval=tsdf_config.get('mesh_interval', 10.0))
+    fusion.integrate(depth_frames)
+    if fusion.mesh_due():
+        save_model(fusion.extract_mesh())
+        print(f'TSDF fusion: {fusion.get_stats()}')
+
+def make_scheduler(build, on_finished=None):
+    # TSDF keeps its volume in this process; the other modes build in a worker
+    # process so new frame sets keep being taken in while a build runs
+    if model_config.get('mode', 'poisson') == 'tsdf':
+        return None
+    scheduler_config = model_config.get('scheduler', {})
+    scheduler = BuildScheduler(build, time_budget=scheduler_config.get('time_budget'),
+                               cancel_running=scheduler_config.get('cancel_running', False),
+                               on_finished=on_finished)
+    scheduler.start()
+    return scheduler
+
+def remove_consumed(manifest, frame_set_id):
+    # Remove depth map files after processing, along with any older sets
+    for path in manifest.consume(frame_set_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+def watch_depth_map_folder():
+    # inotify (or polling where it is unavailable) registers arriving depth
+    # maps in the manifest, which joins them into frame sets by capture
+    # timestamp. Each build takes the latest complete set; consuming it also
+    # drops every older set, whose files are then removed.
+    manifest = FrameSetManifest(model_config.get('manifest_path', os.path.join(depth_map_folder, 'manifest.jsonl')),
+                                model_config.get('frames_per_set', 4),
+                                tolerance_ms=model_config.get('join_tolerance_ms', 20.0))
+
+    def on_finished(frame_set_id, status):
+        remove_consumed(manifest, frame_set_id)
+        print(f'Build {frame_set_id} {status}: {scheduler.get_stats()}')
+
+    scheduler = make_scheduler(create_3d_model, on_finished)
+    completed = threading.Event()
+
+    def on_complete(record):
+        accumulate([load_depth_frame(path) for path in record.sorted_paths()])
+        completed.set()
+
+    watcher = DepthMapWatcher(depth_map_folder, manifest, on_complete,
+                              poll_interval=model_config.get('poll_interval', 1.0))
+    watcher.start()
+    last_submitted = None
+    try:
+        while True:
+            record = manifest.latest_complete()
+            if record is None or record.frame_set_id == last_submitted:
+                completed.wait()
+                completed.clear()
+                continue
+            if scheduler is None:
+                create_3d_model(record.sorted_paths())
+                remove_consumed(manifest, record.frame_set_id)
+            else:
+                # Latest wins: a set still waiting for the worker is replaced
+                scheduler.submit(record.frame_set_id, record.sorted_paths())
+                last_submitted = record.frame_set_id
+    finally:
+        watcher.stop()
+        if scheduler is not None:
+            scheduler.close()
+        manifest.close()
+
+def receive_depth_maps():
+    # Depth maps stream in from Raspberry Pi 1. The receiver acknowledges a
+    # batch only after handing its frame sets on. In TSDF mode sets are fused
+    # here in the main thread, and the small queue makes a slow fusion hold
+    # back acknowledgements, which in turn throttles the sender. With a build
+    # scheduler nothing is held back: only the newest complete frame set
+    # waits for the worker and older ones are dropped.
+    scheduler = make_scheduler(build_model, lambda frame_set_id, status:
+                               print(f'Build {frame_set_id} {status}: {scheduler.get_stats()}'))
+    frame_sets = queue.Queue(maxsize=2)
 
-# Monitor for new depth maps and create 3D models
-while True:
-    depth_map_files = [file for file in os.listdir(depth_map_folder) if file.startswith('depth_map_')]
-    if len(depth_map_files) >= 8:
-        create_3d_model()
+    def on_frame_set(frame_set_id, frames):
+        accumulate(frames)
+        if scheduler is None:
+            frame_sets.put(frames)
+        else:
+            scheduler.submit(frame_set_id, frames)
 
-        # Remove depth map files after processing
-        for file in depth_map_files:
-            os.remove(os.path.join(depth_map_folder, file))
+    assembler = FrameSetAssembler(model_config.get('frames_per_set', 4), on_frame_set)
+    receiver = DepthReceiver(transport_config.get('listen_host', '0.0.0.0'), transport_config.get('port', 8100),
+                             lambda stream, frame_set_id, payload:
+                             assembler.add(stream, frame_set_id, decode_depth_frame(payload)))
+    receiver.start()
+    try:
+        if scheduler is None:
+            while True:
+                build_model(frame_sets.get())
+        else:
+            # Builds run in the scheduler's worker; this thread only waits for the receiver to stop
+            receiver.wait()
+    finally:
+        receiver.close()
+        if scheduler is not None:
+            scheduler.close()
 
-    time.sleep(1)
+if __name__ == '__main__':
+    if transport_config.get('enabled', True):
+        receive_depth_maps()
+    else:
+        watch_depth_map_folder()
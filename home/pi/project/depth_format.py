@@ -0,0 +1,90 @@
+import os
+import struct
+import numpy as np
+
+# Compact depth frame: fixed header followed by little-endian uint16 depth.
+# depth_mm = value * scale_mm; 0 means no depth.
+MAGIC = b'DPT1'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHdffffff')
+EXTENSION = '.d16'
+
+# StereoBM/StereoSGBM disparities are int16 with 4 fractional bits
+DISPARITY_SCALE = 16
+
+class DepthFrame:
+    def __init__(self, depth, camera=0, timestamp=0.0, scale_mm=1.0, fx=0.0, fy=0.0, cx=0.0, cy=0.0,
+                 baseline_mm=0.0):
+        self.depth = depth
+        self.camera = camera
+        self.timestamp = timestamp
+        self.scale_mm = scale_mm
+        self.fx = fx
+        self.fy = fy
+        self.cx = cx
+        self.cy = cy
+        self.baseline_mm = baseline_mm
+
+    def intrinsic_matrix(self):
+        return np.array([[self.fx, 0, self.cx], [0, self.fy, self.cy], [0, 0, 1]], dtype=np.float64)
+
+    def encode(self):
+        height, width = self.depth.shape
+        header = HEADER.pack(MAGIC, VERSION, width, height, self.camera, self.timestamp, self.scale_mm,
+                             self.fx, self.fy, self.cx, self.cy, self.baseline_mm)
+        return header + self.depth.astype('<u2', copy=False).tobytes()
+
+def decode_depth_frame(buffer):
+    magic, version, width, height, camera, timestamp, scale_mm, fx, fy, cx, cy, baseline_mm = \
+        HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a depth frame")
+    depth = np.frombuffer(buffer, dtype='<u2', count=width * height, offset=HEADER.size).reshape(height, width)
+    return DepthFrame(depth, camera, timestamp, scale_mm, fx, fy, cx, cy, baseline_mm)
+
+def read_depth_header(path):
+    # Camera and capture timestamp without reading the depth payload
+    with open(path, 'rb') as file:
+        buffer = file.read(HEADER.size)
+    if len(buffer) < HEADER.size:
+        raise ValueError("Not a depth frame")
+    magic, version, _, _, camera, timestamp = HEADER.unpack(buffer)[:6]
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a depth frame")
+    return camera, timestamp
+
+def save_depth_frame(path, frame):
+    # Write then rename so folder watchers never see a half-written file
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(frame.encode())
+    os.replace(temp_path, path)
+
+def load_depth_frame(path):
+    with open(path, 'rb') as file:
+        return decode_depth_frame(file.read())
+
+class DisparityConverter:
+    def __init__(self, projection, baseline_mm, scale_mm=1.0, max_depth_mm=20000.0):
+        projection = np.asarray(projection, dtype=np.float64)
+        self.fx = projection[0, 0]
+        self.fy = projection[1, 1]
+        self.cx = projection[0, 2]
+        self.cy = projection[1, 2]
+        self.baseline_mm = baseline_mm
+        self.scale_mm = scale_mm
+
+        # One entry per non-negative int16 disparity, so conversion is a single
+        # table lookup with no per-frame min/max or division
+        raw = np.arange(np.iinfo(np.int16).max + 1, dtype=np.float64)
+        with np.errstate(divide='ignore'):
+            depth_mm = self.fx * baseline_mm * DISPARITY_SCALE / raw
+        depth_mm[0] = 0.0
+        depth_mm[depth_mm > min(max_depth_mm, 65535 * scale_mm)] = 0.0
+        self.table = np.round(depth_mm / scale_mm).astype(np.uint16)
+
+    def convert(self, disparity, camera=0, timestamp=0.0, out=None):
+        # Negative (invalid) disparities clip onto entry 0, which is "no depth"
+        depth = np.take(self.table, disparity, mode='clip', out=out)
+        return DepthFrame(depth, camera, timestamp, self.scale_mm, self.fx, self.fy, self.cx, self.cy,
+                          self.baseline_mm)
@@ -1,74 +1,98 @@
 import cv2
 import numpy as np
 import open3d as o3d
+import functools
+import os
+import sys
 import threading
-import queue
-
-# Global variables
-images_queue = queue.Queue()
-depth_maps_queue = queue.Queue()
-camera_intrinsics_queue = queue.Queue()
-
-def capture_images(camera_ports):
-    # Open the cameras
-    cameras = [cv2.VideoCapture(port) for port in camera_ports]
-
-    while True:
-        # Read frames from the cameras
-        frames = [camera.read()[1] for camera in cameras]
-
-        # Add the captured frames to the images queue
-        images_queue.put(frames)
-
-def compute_depth_maps(baseline, focal_length):
-    while True:
-        # Get the latest frames from the images queue
-        frames = images_queue.get()
-
-        # Measure depth for each camera pair
-        depth_maps = []
-        for i in range(0, len(frames), 2):
-            left_frame = frames[i]
-            right_frame = frames[i+1]
-            depth_map = measure_depth(left_frame, right_frame, baseline, focal_length)
-            depth_maps.append(depth_map)
-
-        # Add the computed depth maps to the depth maps queue
-        depth_maps_queue.put(depth_maps)
-
-def create_3d_model():
-    while True:
-        # Get the latest depth maps and camera intrinsics from the queues
-        depth_maps = depth_maps_queue.get()
-        camera_intrinsics = camera_intrinsics_queue.get()
-
-        # Create a point cloud from depth maps and camera intrinsics
-        point_cloud = o3d.geometry.PointCloud()
-        for depth_map, intrinsic in zip(depth_maps, camera_intrinsics):
-            depth_image = o3d.geometry.Image(depth_map)
-            intrinsic_matrix = o3d.camera.PinholeCameraIntrinsic()
-            intrinsic_matrix.intrinsic_matrix = intrinsic
-            pcd = o3d.geometry.PointCloud.create_from_depth_image(depth_image, intrinsic_matrix)
-            point_cloud += pcd
-
-        # Estimate normals for the point cloud
-        point_cloud.estimate_normals()
-
-        # Create a mesh from the point cloud using Poisson Surface Reconstruction
-        mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(point_cloud, depth=8, width=0, scale=1.1, linear_fit=False)[0]
-
-        # Assign texture coordinates to the mesh vertices
-        mesh.textures = []
-        for image in images_queue.get():
-            mesh.textures.append(o3d.geometry.Image(image))
-
-        # Create a texture map for the mesh
-        mesh.compute_vertex_normals()
-        mesh.compute_triangle_normals()
-        mesh.compute_triangle_texture_coordinates()
-
-        # Save the textured 3D mesh to a file
-        o3d.io.write_triangle_mesh("output_3d_model.obj", mesh)
+import time
+import yaml
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_dir)
+
+from compact_mesh import save_compact_mesh
+from frame_broadcast import FrameBroadcast
+from frame_source import is_exhausted, make_source_factory
+from pipeline import StageSpec, build_pipeline
+
+with open(os.path.join(project_dir, 'config.yaml'), 'r') as file:
+    config = yaml.safe_load(file)
+
+def make_capture(camera_ports, broadcast, capture_config=None, ended=None):
+    # Open the cameras, or a recorded session when capture_config asks for
+    # replay; ended is set once a replay has run out
+    open_source = make_source_factory(capture_config)
+    cameras = [open_source(port) for port in camera_ports]
+
+    def capture_images():
+        # Read frames from the cameras and hand the same set to every subscriber
+        frames = []
+        for camera in cameras:
+            ret, frame = camera.read()
+            if not ret:
+                if is_exhausted(camera) and ended is not None:
+                    ended.set()
+                return
+            frames.append(frame)
+        broadcast.publish(frames)
+    return capture_images
+
+def compute_depth_maps(frame_set, baseline, focal_length):
+    # Measure depth for each camera pair
+    frames = frame_set.frames
+    depth_maps = []
+    for i in range(0, len(frames), 2):
+        left_frame = frames[i]
+        right_frame = frames[i+1]
+        depth_map = measure_depth(left_frame, right_frame, baseline, focal_length)
+        depth_maps.append(depth_map)
+    # A reference of its own travels on with the depth maps, so the images
+    # stay alive however long the model stage takes; the pipeline releases
+    # the one it delivered as soon as this returns
+    return frame_set.acquire(), depth_maps
+
+def release_depth_set(depth_set):
+    # The model queue dropped it, or still held it when the pipeline stopped
+    depth_set[0].release()
+
+def create_3d_model(depth_set, camera_intrinsics):
+    frame_set, depth_maps = depth_set
+    # Texture from the exact images the depth maps came from
+    with frame_set:
+        build_3d_model(frame_set.frames, depth_maps, camera_intrinsics)
+
+def build_3d_model(frames, depth_maps, camera_intrinsics):
+    # Create a point cloud from depth maps and camera intrinsics
+    point_cloud = o3d.geometry.PointCloud()
+    for depth_map, intrinsic in zip(depth_maps, camera_intrinsics):
+        depth_image = o3d.geometry.Image(depth_map)
+        intrinsic_matrix = o3d.camera.PinholeCameraIntrinsic()
+        intrinsic_matrix.intrinsic_matrix = intrinsic
+        pcd = o3d.geometry.PointCloud.create_from_depth_image(depth_image, intrinsic_matrix)
+        point_cloud += pcd
+
+    # Estimate normals for the point cloud
+    point_cloud.estimate_normals()
+
+    # Create a mesh from the point cloud using Poisson Surface Reconstruction
+    mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(point_cloud, depth=8, width=0, scale=1.1, linear_fit=False)[0]
+
+    # Assign texture coordinates to the mesh vertices
+    mesh.textures = []
+    for image in frames:
+        mesh.textures.append(o3d.geometry.Image(image))
+
+    # Create a texture map for the mesh
+    mesh.compute_vertex_normals()
+    mesh.compute_triangle_normals()
+    mesh.compute_triangle_texture_coordinates()
+
+    # Save the textured 3D mesh to a file
+    o3d.io.write_triangle_mesh("output_3d_model.obj", mesh)
+    # Compact binary copy for the web viewer
+    save_compact_mesh("output_3d_model.cmsh", np.asarray(mesh.vertices), np.asarray(mesh.vertex_normals),
+                      np.asarray(mesh.triangles))
 
 def measure_depth(left_image, right_image, baseline, focal_length):
     # Perform depth measurement using stereo images
@@ -77,29 +101,37 @@ def measure_depth(left_image, right_image, baseline, focal_length):
 
     return depth_map
 
-# Example usage
-camera_ports = [0, 1, 2, 3, 4, 5, 6, 7]  # Update with the correct camera ports
-baseline = 10.0  # Distance between the cameras in centimeters
-focal_length = 500.0  # Focal length of the cameras in pixels
-camera_intrinsics = [...]  # List of camera intrinsic matrices
-
-# Start the image capture thread
-capture_thread = threading.Thread(target=capture_images, args=(camera_ports,))
-capture_thread.start()
-
-# Start the depth map computation thread
-depth_thread = threading.Thread(target=compute_depth_maps, args=(baseline, focal_length))
-depth_thread.start()
-
-# Start the 3D model creation thread
-model_thread = threading.Thread(target=create_3d_model)
-model_thread.start()
-
-# Add camera intrinsic matrices to the queue
-for intrinsic in camera_intrinsics:
-    camera_intrinsics_queue.put(intrinsic)
-
-# Wait for the threads to complete (optional)
-capture_thread.join()
-depth_thread.join()
-model_thread.join()
+def main():
+    camera_ports = [0, 1, 2, 3, 4, 5, 6, 7]  # Update with the correct camera ports
+    baseline = 10.0  # Distance between the cameras in centimeters
+    focal_length = 500.0  # Focal length of the cameras in pixels
+    camera_intrinsics = [...]  # List of camera intrinsic matrices
+
+    # Stage hand-offs are bounded: if depth or meshing falls behind, frames are
+    # dropped instead of piling up in memory. Workers, executors and queue
+    # bounds can be changed per stage under pipeline.depth_mapping in config.yaml
+    pipeline_config = config.get('pipeline', {}).get('depth_mapping')
+    broadcast = FrameBroadcast(config.get('capture', {}).get('frame_history', 8))
+    ended = threading.Event()
+    stages = [
+        StageSpec('capture', make_capture(camera_ports, broadcast, config.get('capture'), ended)),
+        StageSpec('depth', functools.partial(compute_depth_maps, baseline=baseline, focal_length=focal_length),
+                  input=broadcast.subscribe('depth', pipeline_config, maxsize=2, policy='keep_latest')),
+        # Depth and model pass frame set references on, so both stay thread stages
+        StageSpec('model', functools.partial(create_3d_model, camera_intrinsics=camera_intrinsics),
+                  input='depth', maxsize=2, policy='drop_oldest', on_drop=release_depth_set),
+    ]
+    pipeline = build_pipeline(stages, pipeline_config)
+    pipeline.start()
+    try:
+        # Live cameras run until interrupted; a replay stops at its end
+        while not ended.wait(10):
+            print(f'Pipeline: {pipeline.get_stats()}')
+            print(f'Frame sets: {broadcast.get_stats()}')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,11 @@
 import cv2
-import numpy as np
+from projection import ProjectionEngine
 
-def cylindrical_projection(frame, fov_degrees):
-    height, width, _ = frame.shape
-    fov_radians = np.radians(fov_degrees)
+# Remap tables are built on the first frame of each size and FOV, then reused
+projection_engine = ProjectionEngine(interpolation=cv2.INTER_NEAREST)
 
-    projected_width = int(width * fov_radians / (2 * np.pi))
-    projected_height = height
-
-    projected_img = np.zeros((projected_height, projected_width, 3), dtype=np.uint8)
-
-    center_x = width // 2
-    center_y = height // 2
-
-    for i in range(projected_width):
-        theta = i * (2 * np.pi) / projected_width
-        sin_theta = np.sin(theta)
-        cos_theta = np.cos(theta)
-
-        for j in range(projected_height):
-            x = int(center_x + (j - center_y) * sin_theta)
-            y = int(center_y + (j - center_y) * cos_theta)
-
-            if 0 <= x < width and 0 <= y < height:
-                projected_img[j, i] = frame[y, x]
-
-    return projected_img
+def cylindrical_projection(frame, fov_degrees, interpolation=None):
+    return projection_engine.cylindrical(frame, fov_degrees, interpolation)
 
 # Open the 360° video file
 video = cv2.VideoCapture('360_video.mp4')
@@ -0,0 +1,272 @@
+import os
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+# Every message: magic, type, item count, batch id (or session id), payload length
+MESSAGE = struct.Struct('<4sBxHQI')
+MAGIC = b'DTP1'
+HELLO = 1
+BATCH = 2
+ACK = 3
+
+# Batch payloads are a run of items: stream (camera), frame set id, length, bytes
+ITEM = struct.Struct('<HQI')
+
+def recv_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Connection closed")
+        received += count
+    return buffer
+
+def read_message(sock):
+    magic, message_type, count, batch_id, length = MESSAGE.unpack(recv_exactly(sock, MESSAGE.size))
+    if magic != MAGIC:
+        raise ConnectionError("Bad message header")
+    payload = recv_exactly(sock, length) if length else b''
+    return message_type, count, batch_id, payload
+
+def encode_batch(batch_id, items):
+    parts = []
+    for stream, frame_set_id, payload in items:
+        parts.append(ITEM.pack(stream, frame_set_id, len(payload)))
+        parts.append(payload)
+    body = b''.join(parts)
+    return MESSAGE.pack(MAGIC, BATCH, len(items), batch_id, len(body)) + body
+
+def decode_batch(count, payload):
+    view = memoryview(payload)
+    offset = 0
+    items = []
+    for _ in range(count):
+        stream, frame_set_id, length = ITEM.unpack_from(view, offset)
+        offset += ITEM.size
+        items.append((stream, frame_set_id, view[offset:offset + length]))
+        offset += length
+    return items
+
+class TransportStats:
+    def __init__(self):
+        self.items = 0
+        self.batches = 0
+        self.bytes = 0
+        self.acked = 0
+        self.resent = 0
+        self.reconnects = 0
+
+    def report(self):
+        return dict(vars(self))
+
+class DepthSender:
+    # One persistent connection from Pi1 to Pi2. Frames from all cameras are
+    # batched onto it; batches stay buffered until acknowledged and are resent
+    # after a reconnect, and send() blocks once max_unacked batches are pending.
+    def __init__(self, host, port, batch_size=4, flush_interval=0.05, max_unacked=8, reconnect_delay=1.0):
+        self.address = (host, port)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_unacked = max_unacked
+        self.reconnect_delay = reconnect_delay
+        self.session_id = int.from_bytes(os.urandom(8), 'little')
+        self.pending = []
+        self.pending_since = None
+        self.unacked = OrderedDict()
+        self.next_batch_id = 1
+        self.sock = None
+        self.stats = TransportStats()
+        self.condition = threading.Condition()
+        self.is_running = False
+        self.flush_thread = None
+
+    def start(self):
+        self.is_running = True
+        self.connect()
+        self.flush_thread = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flush_thread.start()
+
+    def connect(self):
+        while self.is_running:
+            try:
+                sock = socket.create_connection(self.address)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.sendall(MESSAGE.pack(MAGIC, HELLO, 0, self.session_id, 0))
+                with self.condition:
+                    self.sock = sock
+                    # Anything not acknowledged on the old connection goes again, in order
+                    for message in self.unacked.values():
+                        sock.sendall(message)
+                        self.stats.resent += 1
+                threading.Thread(target=self.ack_loop, args=(sock,), daemon=True).start()
+                return
+            except OSError:
+                time.sleep(self.reconnect_delay)
+
+    def ack_loop(self, sock):
+        try:
+            while True:
+                message_type, _, batch_id, _ = read_message(sock)
+                if message_type != ACK:
+                    continue
+                with self.condition:
+                    # Acks are cumulative: everything up to batch_id has been handled
+                    while self.unacked and next(iter(self.unacked)) <= batch_id:
+                        self.unacked.popitem(last=False)
+                        self.stats.acked += 1
+                    self.condition.notify_all()
+        except (OSError, ConnectionError):
+            self.reconnect(sock)
+
+    def reconnect(self, sock):
+        with self.condition:
+            if self.sock is not sock:
+                return
+            self.sock = None
+        sock.close()
+        if self.is_running:
+            self.stats.reconnects += 1
+            self.connect()
+
+    def send(self, stream, frame_set_id, payload):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.unacked) < self.max_unacked or not self.is_running)
+            if not self.pending:
+                self.pending_since = time.monotonic()
+            self.pending.append((stream, frame_set_id, bytes(payload)))
+            self.stats.items += 1
+            if len(self.pending) >= self.batch_size:
+                self.flush_locked()
+
+    def flush_locked(self):
+        if not self.pending:
+            return
+        batch_id = self.next_batch_id
+        self.next_batch_id += 1
+        message = encode_batch(batch_id, self.pending)
+        self.pending = []
+        self.unacked[batch_id] = message
+        self.stats.batches += 1
+        self.stats.bytes += len(message)
+        if self.sock is not None:
+            try:
+                self.sock.sendall(message)
+            except OSError:
+                # The ack thread notices the broken connection and resends
+                pass
+
+    def flush(self):
+        with self.condition:
+            self.flush_locked()
+
+    def flush_loop(self):
+        # Sends partial batches that have waited longer than flush_interval
+        while self.is_running:
+            time.sleep(self.flush_interval)
+            with self.condition:
+                if self.pending and time.monotonic() - self.pending_since >= self.flush_interval:
+                    self.flush_locked()
+
+    def wait_for_acks(self, timeout=None):
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.unacked, timeout)
+
+    def close(self, timeout=5.0):
+        self.flush()
+        self.wait_for_acks(timeout)
+        self.is_running = False
+        with self.condition:
+            sock = self.sock
+            self.sock = None
+            self.condition.notify_all()
+        if sock is not None:
+            sock.close()
+
+class DepthReceiver:
+    # Pi2 side. Calls handler(stream, frame_set_id, payload) for every item in
+    # arrival order, then acknowledges the batch. Batches replayed after a
+    # reconnect are recognised by session and batch id and not handled twice.
+    def __init__(self, host, port, handler):
+        self.address = (host, port)
+        self.handler = handler
+        self.handled = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.is_running = False
+
+    def start(self):
+        self.server = socket.create_server(self.address)
+        self.address = self.server.getsockname()[:2]
+        self.is_running = True
+        self.thread = threading.Thread(target=self.accept_loop, daemon=True)
+        self.thread.start()
+
+    def accept_loop(self):
+        while self.is_running:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self.serve, args=(sock,), daemon=True).start()
+
+    def serve(self, sock):
+        session_id = None
+        try:
+            while self.is_running:
+                message_type, count, batch_id, payload = read_message(sock)
+                if message_type == HELLO:
+                    session_id = batch_id
+                    continue
+                if message_type != BATCH:
+                    continue
+                with self.lock:
+                    if batch_id > self.handled.get(session_id, 0):
+                        for stream, frame_set_id, item in decode_batch(count, payload):
+                            self.handler(stream, frame_set_id, item)
+                        self.handled[session_id] = batch_id
+                sock.sendall(MESSAGE.pack(MAGIC, ACK, 0, batch_id, 0))
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            sock.close()
+
+    def wait(self, timeout=None):
+        # Blocks until the receiver is closed or its listening socket fails
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def close(self):
+        self.is_running = False
+        if self.server is not None:
+            # close() alone does not wake a thread blocked in accept()
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.server.close()
+
+class FrameSetAssembler:
+    # Groups per-camera items by frame set id and hands over complete sets
+    def __init__(self, frames_per_set, on_frame_set, max_pending=16):
+        self.frames_per_set = frames_per_set
+        self.on_frame_set = on_frame_set
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.dropped = 0
+
+    def add(self, stream, frame_set_id, frame):
+        frames = self.pending.setdefault(frame_set_id, {})
+        frames[stream] = frame
+        if len(frames) == self.frames_per_set:
+            del self.pending[frame_set_id]
+            self.on_frame_set(frame_set_id, [frames[key] for key in sorted(frames)])
+        while len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
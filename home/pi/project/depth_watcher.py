@@ -0,0 +1,122 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from depth_format import EXTENSION, read_depth_header
+
+# Linux inotify constants (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = 0o2000000
+EVENT = struct.Struct('iIII')
+
+class Inotify:
+    def __init__(self, path, mask=IN_CLOSE_WRITE | IN_MOVED_TO):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch failed for {path}')
+
+    def read(self, timeout):
+        # Returns the names of files that finished writing or were moved in;
+        # None in the list means events were lost and the folder needs a rescan
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                names.append(None)
+            else:
+                names.append(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class DepthMapWatcher:
+    # Registers arriving depth maps in a FrameSetManifest and calls
+    # on_frame_set(record) whenever one completes a frame set
+    def __init__(self, folder, manifest, on_frame_set, poll_interval=1.0, use_inotify=True):
+        self.folder = folder
+        self.manifest = manifest
+        self.on_frame_set = on_frame_set
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.seen = set()
+        self.inotify = None
+        self.thread = None
+        self.is_running = False
+
+    def start(self):
+        # Watch before the first scan so nothing written in between is missed
+        if self.use_inotify:
+            try:
+                self.inotify = Inotify(self.folder)
+            except (OSError, AttributeError):
+                # Not Linux, or inotify unavailable: fall back to polling
+                self.inotify = None
+        self.is_running = True
+        self.scan()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join()
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+    def run(self):
+        while self.is_running:
+            if self.inotify is not None:
+                names = self.inotify.read(self.poll_interval)
+                if None in names:
+                    self.scan()
+                for filename in names:
+                    if filename is not None:
+                        self.add(filename)
+            else:
+                time.sleep(self.poll_interval)
+                self.scan()
+
+    def scan(self):
+        with os.scandir(self.folder) as entries:
+            names = [entry.name for entry in entries]
+        # Forget files that were consumed and removed since the last scan
+        self.seen.intersection_update(names)
+        for filename in names:
+            self.add(filename)
+
+    def add(self, filename):
+        if filename in self.seen or not filename.endswith(EXTENSION):
+            return
+        path = os.path.join(self.folder, filename)
+        try:
+            # The capture timestamp in the header, not the filename, decides the frame set
+            camera, timestamp = read_depth_header(path)
+        except (OSError, ValueError):
+            return
+        self.seen.add(filename)
+        record = self.manifest.add(camera, timestamp, path)
+        if record is not None:
+            if self.inotify is not None:
+                # Events only arrive for new writes, so the names can be reused
+                for path in record.paths.values():
+                    self.seen.discard(os.path.basename(path))
+            self.on_frame_set(record)
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from stage_queue import BLOCK, make_stage_queue
+
+class FrameSetRef:
+    # One reference to a published frame set: one capture of every camera.
+    # The arrays are shared by every holder and marked read-only, so nobody
+    # has to copy them defensively. The set stays alive until every
+    # reference is released; release() is idempotent, and acquire() takes
+    # another reference, e.g. to hand the set on to a later stage.
+    def __init__(self, broadcast, frame_set_id, frames, timestamp):
+        self.broadcast = broadcast
+        self.frame_set_id = frame_set_id
+        self.frames = frames
+        self.timestamp = timestamp
+
+    def acquire(self):
+        if self.frames is None:
+            raise ValueError(f"Frame set {self.frame_set_id} reference already released")
+        return self.broadcast.acquire(self.frame_set_id)
+
+    def release(self):
+        if self.frames is not None:
+            self.frames = None
+            self.broadcast.release(self.frame_set_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __reduce__(self):
+        # A copy in another process could not release the original
+        raise TypeError("Frame set references stay in the process that took them; use a thread stage")
+
+class BroadcastStats:
+    def __init__(self):
+        self.published = 0
+        self.freed = 0
+        self.lookups = 0
+        self.lookup_misses = 0
+
+    def report(self, live):
+        return {'published': self.published, 'freed': self.freed, 'live': live,
+                'lookups': self.lookups, 'lookup_misses': self.lookup_misses}
+
+class Subscription:
+    # A subscriber's bounded queue of FrameSetRefs, usable as a pipeline
+    # stage input. Each delivered reference is released by done(); those the
+    # queue drops are released straight away.
+    def __init__(self, broadcast, stage_queue):
+        self.broadcast = broadcast
+        self.queue = stage_queue
+        self.name = stage_queue.name
+
+    def get(self, timeout=None):
+        return self.queue.get(timeout)
+
+    def done(self, frame_set):
+        frame_set.release()
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def get_stats(self):
+        return self.queue.get_stats()
+
+    def close(self):
+        self.queue.close()
+
+class FrameBroadcast:
+    # Fan-out channel: every frame set is delivered to every subscriber,
+    # without copies. A set lives while any subscriber still holds it or it
+    # is among the last `history` published, and can be looked up by ID for
+    # that long, e.g. to fetch the images a depth set was computed from.
+    # on_free(frame_set_id, frames) is called once the last reference goes,
+    # so the capture side may recycle the buffers.
+    def __init__(self, history=4, on_free=None):
+        self.history = deque()
+        self.history_size = max(1, history)
+        self.on_free = on_free
+        self.subscriptions = []
+        self.live = {}
+        self.next_id = 0
+        self.stats = BroadcastStats()
+        self.lock = threading.Lock()
+
+    def subscribe(self, name, queue_config=None, maxsize=2, policy=BLOCK):
+        # queue_config: {name: {maxsize, policy}}, as for make_stage_queue
+        subscription = Subscription(self, make_stage_queue(name, queue_config, maxsize, policy, FrameSetRef.release))
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def publish(self, frames, timestamp=None):
+        # Returns the new set's ID
+        for frame in frames:
+            if isinstance(frame, np.ndarray):
+                frame.flags.writeable = False
+        with self.lock:
+            frame_set_id = self.next_id
+            self.next_id += 1
+            timestamp = time.time() if timestamp is None else timestamp
+            subscriptions = list(self.subscriptions)
+            # One reference for the history, one per subscriber, taken before
+            # any delivery so an early release cannot free the set
+            self.live[frame_set_id] = [frames, timestamp, 1 + len(subscriptions)]
+            self.history.append(FrameSetRef(self, frame_set_id, frames, timestamp))
+            expired = self.history.popleft() if len(self.history) > self.history_size else None
+            self.stats.published += 1
+        if expired is not None:
+            expired.release()
+        for subscription in subscriptions:
+            subscription.queue.put(FrameSetRef(self, frame_set_id, frames, timestamp))
+        return frame_set_id
+
+    def acquire(self, frame_set_id):
+        # A new reference to the live set with this ID, or None once freed
+        with self.lock:
+            self.stats.lookups += 1
+            entry = self.live.get(frame_set_id)
+            if entry is None:
+                self.stats.lookup_misses += 1
+                return None
+            entry[2] += 1
+            return FrameSetRef(self, frame_set_id, entry[0], entry[1])
+
+    def release(self, frame_set_id):
+        # Called by FrameSetRef.release
+        with self.lock:
+            entry = self.live[frame_set_id]
+            entry[2] -= 1
+            if entry[2] > 0:
+                return
+            del self.live[frame_set_id]
+            self.stats.freed += 1
+        if self.on_free is not None:
+            self.on_free(frame_set_id, entry[0])
+
+    def get_stats(self):
+        with self.lock:
+            stats = self.stats.report(len(self.live))
+            subscriptions = list(self.subscriptions)
+        stats['subscribers'] = {subscription.name: subscription.get_stats() for subscription in subscriptions}
+        return stats
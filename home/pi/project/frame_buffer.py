@@ -0,0 +1,65 @@
+import threading
+import numpy as np
+
+class FrameRingBuffer:
+    def __init__(self, depth=4):
+        if depth < 2:
+            raise ValueError("Ring buffer depth must be at least 2")
+        self.depth = depth
+        self.slots = None
+        self.sequences = [-1] * depth
+        self.timestamps = [0.0] * depth
+        self.sequence = -1
+        self.lock = threading.Lock()
+
+    def allocate(self, shape, dtype=np.uint8):
+        # Slots are allocated once and reused for the lifetime of the buffer
+        with self.lock:
+            self.slots = [np.empty(shape, dtype=dtype) for _ in range(self.depth)]
+            self.sequences = [-1] * self.depth
+            self.sequence = -1
+
+    def is_allocated(self):
+        return self.slots is not None
+
+    def write_slot(self):
+        # The slot after the newest one is never handed to readers as "latest",
+        # so the producer can fill it in place while consumers read the others
+        with self.lock:
+            return self.slots[(self.sequence + 1) % self.depth]
+
+    def commit(self, timestamp=0.0):
+        with self.lock:
+            self.sequence += 1
+            index = self.sequence % self.depth
+            self.sequences[index] = self.sequence
+            self.timestamps[index] = timestamp
+            return self.sequence
+
+    def latest(self, n=0):
+        # Returns (sequence, timestamp, read-only view) of the Nth-latest frame
+        if n < 0 or n >= self.depth - 1:
+            raise IndexError(f"Only the {self.depth - 1} latest frames are readable")
+        with self.lock:
+            sequence = self.sequence - n
+            if sequence < 0:
+                return None
+            index = sequence % self.depth
+            view = self.slots[index].view()
+            view.flags.writeable = False
+            return sequence, self.timestamps[index], view
+
+    def get(self, sequence):
+        # Returns the frame with the given sequence number, or None once recycled
+        with self.lock:
+            if sequence < 0 or sequence > self.sequence or self.sequence - sequence >= self.depth - 1:
+                return None
+            index = sequence % self.depth
+            view = self.slots[index].view()
+            view.flags.writeable = False
+            return self.timestamps[index], view
+
+    def nbytes(self):
+        if self.slots is None:
+            return 0
+        return sum(slot.nbytes for slot in self.slots)
@@ -0,0 +1,299 @@
+import cv2
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from frame_source import is_exhausted, make_source_factory
+
+# Per-slot metadata columns
+SEQUENCE = 0
+REFS = 1
+TIMESTAMP = 2
+META_FIELDS = 3
+
+# Slot states stored in the REFS column besides a reader count
+FREE = 0
+WRITING = -1
+
+class FrameRef:
+    def __init__(self, bus, camera, slot, sequence, timestamp, frame):
+        self.bus = bus
+        self.camera = camera
+        self.slot = slot
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.frame = frame
+
+    def release(self):
+        if self.frame is not None:
+            self.frame = None
+            self.bus.release(self.camera, self.slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+class FrameBus:
+    def __init__(self, spec, create=False):
+        self.spec = spec
+        self.cameras = spec['cameras']
+        self.slots = spec['slots']
+        self.shape = tuple(spec['shape'])
+        self.dtype = np.dtype(spec['dtype'])
+        self.condition = spec['condition']
+        self.owner = create
+
+        meta_size = self.cameras * self.slots * META_FIELDS * 8
+        counters_size = self.cameras * 3 * 8
+        header_size = (meta_size + counters_size + 63) // 64 * 64
+        frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        total_size = header_size + self.cameras * self.slots * frame_size
+
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=total_size)
+            spec['name'] = self.shm.name
+        else:
+            self.shm = shared_memory.SharedMemory(name=spec['name'])
+
+        buf = self.shm.buf
+        self.meta = np.ndarray((self.cameras, self.slots, META_FIELDS), dtype=np.int64, buffer=buf)
+        # Per camera: latest slot, next sequence number, dropped publishes
+        self.counters = np.ndarray((self.cameras, 3), dtype=np.int64, buffer=buf, offset=meta_size)
+        self.frames = np.ndarray((self.cameras, self.slots) + self.shape, dtype=self.dtype,
+                                 buffer=buf, offset=header_size)
+
+        if create:
+            self.meta[:] = 0
+            self.meta[:, :, SEQUENCE] = -1
+            self.counters[:, 0] = -1
+            self.counters[:, 1:] = 0
+
+    @classmethod
+    def create(cls, cameras, shape, dtype='uint8', slots=6):
+        # Slots per camera must cover one writer, the latest frame and every
+        # frame a consumer may still be holding
+        if slots < 3:
+            raise ValueError("Frame bus needs at least 3 slots per camera")
+        spec = {
+            'name': None,
+            'cameras': cameras,
+            'slots': slots,
+            'shape': tuple(shape),
+            'dtype': np.dtype(dtype).str,
+            'condition': mp.Condition(),
+        }
+        return cls(spec, create=True)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(spec)
+
+    def reserve(self, camera):
+        # Hands the producer a free slot to decode into, or None if every slot is busy
+        with self.condition:
+            latest = self.counters[camera, 0]
+            candidates = [slot for slot in range(self.slots)
+                          if slot != latest and self.meta[camera, slot, REFS] == FREE]
+            if not candidates:
+                self.counters[camera, 2] += 1
+                return None
+            slot = min(candidates, key=lambda s: self.meta[camera, s, SEQUENCE])
+            self.meta[camera, slot, REFS] = WRITING
+            return slot, self.frames[camera, slot]
+
+    def commit(self, camera, slot, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.condition:
+            sequence = int(self.counters[camera, 1])
+            self.counters[camera, 1] += 1
+            self.meta[camera, slot, SEQUENCE] = sequence
+            self.meta[camera, slot, TIMESTAMP] = int(timestamp * 1e9)
+            self.meta[camera, slot, REFS] = FREE
+            self.counters[camera, 0] = slot
+            self.condition.notify_all()
+            return sequence
+
+    def abort(self, camera, slot):
+        with self.condition:
+            self.meta[camera, slot, REFS] = FREE
+
+    def publish(self, camera, frame, timestamp=None):
+        reserved = self.reserve(camera)
+        if reserved is None:
+            return -1
+        slot, buffer = reserved
+        buffer[...] = frame
+        return self.commit(camera, slot, timestamp)
+
+    def acquire(self, camera, after=-1, timeout=None):
+        # Pins the newest frame newer than `after`; the caller must release it
+        with self.condition:
+            def ready():
+                slot = self.counters[camera, 0]
+                return slot >= 0 and self.meta[camera, slot, SEQUENCE] > after
+
+            if not self.condition.wait_for(ready, timeout):
+                return None
+            slot = int(self.counters[camera, 0])
+            self.meta[camera, slot, REFS] += 1
+            sequence = int(self.meta[camera, slot, SEQUENCE])
+            timestamp = self.meta[camera, slot, TIMESTAMP] / 1e9
+
+        frame = self.frames[camera, slot].view()
+        frame.flags.writeable = False
+        return FrameRef(self, camera, slot, sequence, timestamp, frame)
+
+    def latest_sequence(self, camera):
+        slot = self.counters[camera, 0]
+        return -1 if slot < 0 else int(self.meta[camera, slot, SEQUENCE])
+
+    def wait_for_new(self, after, timeout=None):
+        # Blocks until any camera has a frame newer than after[camera]
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: any(self.latest_sequence(camera) > after.get(camera, -1) for camera in range(self.cameras)),
+                timeout)
+
+    def release(self, camera, slot):
+        with self.condition:
+            self.meta[camera, slot, REFS] -= 1
+
+    def dropped(self, camera):
+        return int(self.counters[camera, 2])
+
+    def close(self):
+        self.meta = None
+        self.counters = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def capture_process(spec, camera, camera_index, running, capture_config=None):
+    # Decodes straight into shared slots so frames are never copied on publish
+    bus = FrameBus.attach(spec)
+    source = make_source_factory(capture_config)(camera_index)
+    try:
+        while running.is_set():
+            reserved = bus.reserve(camera)
+            if reserved is None:
+                source.grab()
+                continue
+            slot, buffer = reserved
+            ret, frame = source.read(buffer)
+            if ret and frame is not buffer:
+                if frame.shape != buffer.shape:
+                    bus.abort(camera, slot)
+                    raise ValueError(f"Camera {camera_index} delivers {frame.shape} frames, the bus holds "
+                                     f"{buffer.shape}; set capture.frame_shape")
+                buffer[...] = frame
+            if ret:
+                bus.commit(camera, slot)
+            else:
+                bus.abort(camera, slot)
+                if is_exhausted(source):
+                    break
+    finally:
+        source.release()
+        bus.close()
+
+class BusCapture:
+    # CameraCapture's interface over a FrameBus: every camera is read and
+    # decoded in its own capture_process, so decoding never competes with the
+    # consumer for the GIL. Frames handed out are read-only views of pinned
+    # slots, valid until the next get_frames() call.
+    def __init__(self, camera_indices, shape, capture_config=None, slots=6):
+        self.camera_indices = camera_indices
+        self.shape = tuple(shape)
+        self.capture_config = capture_config
+        self.slots = slots
+        self.bus = None
+        self.running = mp.Event()
+        self.processes = []
+        self.held = []
+
+    def start_capture(self):
+        self.bus = FrameBus.create(len(self.camera_indices), self.shape, slots=self.slots)
+        self.running.set()
+        for camera, index in enumerate(self.camera_indices):
+            process = mp.Process(target=capture_process,
+                                 args=(self.bus.spec, camera, index, self.running, self.capture_config),
+                                 daemon=True)
+            process.start()
+            self.processes.append(process)
+
+    def stop_capture(self):
+        self.running.clear()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.release_held()
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+
+    def release_held(self):
+        for ref in self.held:
+            ref.release()
+        self.held = []
+
+    def acquire_latest(self):
+        # Newest frame of every camera that has published one
+        self.release_held()
+        sequences = {}
+        frames = {}
+        for camera, index in enumerate(self.camera_indices):
+            ref = self.bus.acquire(camera, timeout=0)
+            if ref is not None:
+                self.held.append(ref)
+                sequences[index] = ref.sequence
+                frames[index] = ref.frame
+        return sequences, frames
+
+    def get_frames(self):
+        return self.acquire_latest()[1]
+
+    def get_new_frames(self, after, timeout=None):
+        # As CameraCapture.get_new_frames: ({index: sequence}, {index: frame})
+        # once any camera has a frame newer than after[index], None on timeout
+        waiting = {camera: after.get(index, -1) for camera, index in enumerate(self.camera_indices)}
+        if not self.bus.wait_for_new(waiting, timeout):
+            return None
+        return self.acquire_latest()
+
+def main():
+    camera_indices = [0, 1, 2, 3]  # Adjust the indices based on your camera setup
+    bus = FrameBus.create(len(camera_indices), (480, 640, 3))
+    running = mp.Event()
+    running.set()
+
+    processes = [mp.Process(target=capture_process, args=(bus.spec, camera, index, running))
+                 for camera, index in enumerate(camera_indices)]
+    for process in processes:
+        process.start()
+
+    try:
+        sequences = [-1] * len(camera_indices)
+        while True:
+            for camera in range(len(camera_indices)):
+                ref = bus.acquire(camera, after=sequences[camera], timeout=0.1)
+                if ref is None:
+                    continue
+                with ref:
+                    sequences[camera] = ref.sequence
+                    cv2.imshow(f"Camera {camera_indices[camera]}", ref.frame)
+
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    finally:
+        running.clear()
+        for process in processes:
+            process.join()
+        bus.close()
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
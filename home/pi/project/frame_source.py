@@ -0,0 +1,180 @@
+import cv2
+import os
+import sys
+import threading
+import time
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+
+class ReplayClock:
+    # Shared by every source of a session so all cameras replay in step.
+    # speed is a multiple of real time; 0 replays as fast as possible.
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.origin = None
+        self.start = None
+        self.lock = threading.Lock()
+
+    def wait_until(self, timestamp):
+        if self.speed <= 0:
+            return
+        with self.lock:
+            if self.origin is None:
+                self.origin = timestamp
+                self.start = time.monotonic()
+            target = self.start + (timestamp - self.origin) / self.speed
+        delay = target - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def read_timestamps(path):
+    with open(path, 'r') as file:
+        return [float(line) for line in file if line.strip() and not line.startswith('#')]
+
+class ReplaySource:
+    # Duck-types the parts of cv2.VideoCapture the pipeline uses (isOpened,
+    # grab, retrieve, read, release), so it can stand in for a camera anywhere
+    # one is opened. Without loop, exhausted is set once the last frame has
+    # been read; capture loops check it to end instead of retrying.
+    def __init__(self, path, clock=None, fps=30.0, loop=False):
+        self.path = path
+        self.clock = clock or ReplayClock()
+        self.loop = loop
+        self.video = None
+        self.images = None
+        self.index = -1
+        self.offset = 0.0
+        self.exhausted = False
+
+        if os.path.isdir(path):
+            self.images = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith(IMAGE_EXTENSIONS))
+            count = len(self.images)
+            timestamps_path = os.path.join(path, 'timestamps.txt')
+        else:
+            self.video = cv2.VideoCapture(path)
+            fps = self.video.get(cv2.CAP_PROP_FPS) or fps
+            count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
+            timestamps_path = os.path.splitext(path)[0] + '.txt'
+
+        if os.path.exists(timestamps_path):
+            # Extra timestamp lines would index past the last frame
+            self.timestamps = read_timestamps(timestamps_path)
+            if self.images is not None or count > 0:
+                self.timestamps = self.timestamps[:count]
+        else:
+            self.timestamps = [i / fps for i in range(count)]
+        self.period = 1.0 / fps
+
+    def isOpened(self):
+        if self.video is not None:
+            return self.video.isOpened()
+        return len(self.images) > 0
+
+    def rewind(self):
+        # Keep timestamps increasing across loops so pacing stays continuous
+        self.offset += self.timestamps[-1] - self.timestamps[0] + self.period
+        self.index = -1
+        if self.video is not None:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def grab(self):
+        if self.index + 1 >= len(self.timestamps):
+            if not self.loop or not self.timestamps:
+                self.exhausted = True
+                return False
+            self.rewind()
+        self.index += 1
+        self.clock.wait_until(self.timestamp())
+        if self.video is not None:
+            return self.video.grab()
+        return True
+
+    def retrieve(self, image=None):
+        if self.video is not None:
+            return self.video.retrieve(image)
+        frame = cv2.imread(self.images[self.index], cv2.IMREAD_COLOR)
+        if frame is None:
+            return False, image
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, image
+        return self.retrieve(image)
+
+    def timestamp(self):
+        return self.timestamps[self.index] + self.offset
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+
+def is_exhausted(source):
+    # Live cameras only ever fail a grab transiently; a replay can run out
+    return getattr(source, 'exhausted', False)
+
+def find_recording(session_path, camera_index):
+    # A session holds cam<N>.<video ext> files or cam<N>/ image directories
+    base = os.path.join(session_path, f'cam{camera_index}')
+    if os.path.isdir(base):
+        return base
+    for extension in VIDEO_EXTENSIONS:
+        if os.path.exists(base + extension):
+            return base + extension
+    raise RuntimeError(f"No recording for camera {camera_index} in {session_path}")
+
+def make_source_factory(capture_config=None):
+    # Returns a callable that opens a camera index the way capture_config asks
+    capture_config = capture_config or {}
+    if capture_config.get('source', 'camera') != 'replay':
+        return cv2.VideoCapture
+
+    session_path = capture_config['replay_path']
+    clock = ReplayClock(capture_config.get('replay_speed', 1.0))
+    loop = capture_config.get('replay_loop', False)
+    fps = capture_config.get('replay_fps', 30.0)
+
+    def open_source(camera_index):
+        return ReplaySource(find_recording(session_path, camera_index), clock, fps=fps, loop=loop)
+
+    return open_source
+
+def record_session(camera_indices, session_path, duration):
+    # Writes one image directory plus timestamps.txt per camera
+    cameras = [cv2.VideoCapture(index) for index in camera_indices]
+    directories = [os.path.join(session_path, f'cam{index}') for index in camera_indices]
+    timestamp_files = []
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+        timestamp_files.append(open(os.path.join(directory, 'timestamps.txt'), 'w'))
+
+    frame_number = 0
+    start_time = time.monotonic()
+    try:
+        while time.monotonic() - start_time < duration:
+            stamps = []
+            for camera in cameras:
+                camera.grab()
+                stamps.append(time.monotonic() - start_time)
+            for camera, directory, timestamps, stamp in zip(cameras, directories, timestamp_files, stamps):
+                ret, frame = camera.retrieve()
+                if ret:
+                    cv2.imwrite(os.path.join(directory, f'{frame_number:06d}.png'), frame)
+                    timestamps.write(f'{stamp:.6f}\n')
+            frame_number += 1
+    finally:
+        for camera in cameras:
+            camera.release()
+        for timestamps in timestamp_files:
+            timestamps.close()
+
+    print(f'Recorded {frame_number} frame sets to {session_path}.')
+
+if __name__ == '__main__':
+    # Usage: python frame_source.py <session_path> <duration_seconds>
+    record_session([0, 1, 2, 3], sys.argv[1], float(sys.argv[2]))
@@ -0,0 +1,196 @@
+import cv2
+import threading
+import time
+from collections import deque
+import numpy as np
+from frame_buffer import FrameRingBuffer
+from frame_source import is_exhausted
+
+class FrameSet:
+    def __init__(self, sequence, timestamps, frames, skew):
+        self.sequence = sequence
+        self.timestamps = timestamps
+        self.frames = frames
+        self.skew = skew
+
+class SkewStats:
+    def __init__(self, window=300):
+        self.recent = deque(maxlen=window)
+        self.attempts = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.max_skew = 0.0
+        self.total_skew = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, skew, accepted):
+        with self.lock:
+            self.attempts += 1
+            if accepted:
+                self.accepted += 1
+            else:
+                self.rejected += 1
+            self.recent.append(skew)
+            self.total_skew += skew
+            self.max_skew = max(self.max_skew, skew)
+
+    def report(self):
+        # Skews are reported in milliseconds
+        with self.lock:
+            recent = np.array(self.recent) * 1000.0 if self.recent else np.zeros(1)
+            return {
+                'attempts': self.attempts,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'mean_skew_ms': self.total_skew * 1000.0 / max(self.attempts, 1),
+                'max_skew_ms': self.max_skew * 1000.0,
+                'recent_p50_ms': float(np.percentile(recent, 50)),
+                'recent_p95_ms': float(np.percentile(recent, 95)),
+            }
+
+class SynchronizedCapture:
+    def __init__(self, camera_indices, max_skew_ms=5.0, buffer_depth=4, open_source=None):
+        self.camera_indices = camera_indices
+        self.open_source = open_source or cv2.VideoCapture
+        self.max_skew = max_skew_ms / 1000.0
+        self.cameras = []
+        self.buffers = [FrameRingBuffer(buffer_depth) for _ in camera_indices]
+        self.stats = SkewStats()
+        self.frame_set = None
+        self.handed_out = None
+        self.sequence = -1
+        self.condition = threading.Condition()
+        self.capture_thread = None
+        self.is_capturing = False
+        # Set when a source ran out, e.g. the end of a non-looping replay
+        self.ended = False
+
+    def start_capture(self):
+        for index in self.camera_indices:
+            camera = self.open_source(index)
+            if not camera.isOpened():
+                raise RuntimeError(f"Failed to open camera {index}")
+            self.cameras.append(camera)
+
+        self.is_capturing = True
+        self.capture_thread = threading.Thread(target=self.capture_frame_sets)
+        self.capture_thread.start()
+
+    def stop_capture(self):
+        self.is_capturing = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.capture_thread is not None:
+            self.capture_thread.join()
+            self.capture_thread = None
+
+        for camera in self.cameras:
+            camera.release()
+        self.cameras = []
+
+    def grab_all(self):
+        # Phase one: latch a frame on every camera as close together as possible
+        timestamps = []
+        for camera in self.cameras:
+            if not camera.grab():
+                return None
+            timestamps.append(time.monotonic())
+        return timestamps
+
+    def retrieve_all(self, timestamps):
+        # Phase two: decode the latched frames into the ring buffers
+        frames = []
+        for camera, buffer, timestamp in zip(self.cameras, self.buffers, timestamps):
+            if buffer.is_allocated():
+                slot = buffer.write_slot()
+                ret, frame = camera.retrieve(slot)
+            else:
+                ret, frame = camera.retrieve()
+                slot = None
+            if not ret:
+                return None
+            if frame is not slot:
+                if slot is None or frame.shape != slot.shape:
+                    buffer.allocate(frame.shape, frame.dtype)
+                buffer.write_slot()[...] = frame
+            frames.append(buffer.get(buffer.commit(timestamp))[1])
+        return frames
+
+    def end_of_stream(self):
+        with self.condition:
+            self.ended = True
+            self.is_capturing = False
+            self.condition.notify_all()
+
+    def capture_frame_sets(self):
+        while self.is_capturing:
+            timestamps = self.grab_all()
+            if timestamps is None:
+                if any(is_exhausted(camera) for camera in self.cameras):
+                    self.end_of_stream()
+                continue
+
+            skew = max(timestamps) - min(timestamps)
+            accepted = skew <= self.max_skew
+            self.stats.record(skew, accepted)
+            if not accepted:
+                # Skip decoding entirely; the next grab brings fresher frames
+                continue
+
+            frames = self.retrieve_all(timestamps)
+            if frames is None:
+                if any(is_exhausted(camera) for camera in self.cameras):
+                    self.end_of_stream()
+                continue
+
+            with self.condition:
+                self.sequence += 1
+                self.frame_set = FrameSet(self.sequence, timestamps, frames, skew)
+                self.condition.notify_all()
+
+    def get_frame_set(self, after=-1, timeout=None):
+        # Blocks until a frame set newer than `after` is available; None on
+        # timeout, or at once after the stream has ended (check ended). Ring slots
+        # are recycled after depth - 1 captures, so consumers get a copy, made
+        # once per set and shared read-only by everyone who asks for it
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > after or not self.is_capturing, timeout)
+            if self.sequence <= after:
+                return None
+            if self.handed_out is None or self.handed_out.sequence != self.sequence:
+                frame_set = self.frame_set
+                frames = [frame.copy() for frame in frame_set.frames]
+                for frame in frames:
+                    frame.flags.writeable = False
+                self.handed_out = FrameSet(frame_set.sequence, frame_set.timestamps, frames, frame_set.skew)
+            return self.handed_out
+
+    def get_skew_stats(self):
+        return self.stats.report()
+
+def main():
+    camera_indices = [0, 1, 2, 3]  # Adjust the indices based on your camera setup
+    capture = SynchronizedCapture(camera_indices, max_skew_ms=5.0)
+
+    try:
+        capture.start_capture()
+        last_sequence = -1
+        while True:
+            frame_set = capture.get_frame_set(after=last_sequence, timeout=1.0)
+            if frame_set is None:
+                if capture.ended:
+                    break
+                continue
+            last_sequence = frame_set.sequence
+            for index, frame in zip(camera_indices, frame_set.frames):
+                cv2.imshow(f"Camera {index}", frame)
+
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    finally:
+        capture.stop_capture()
+        cv2.destroyAllWindows()
+        print(capture.get_skew_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+from point_cloud import back_project
+
+def grid_mesh(depth_frame, stride=1, max_depth_jump=0.05, camera_pose=None):
+    # Triangulate the depth map over its own pixel grid: two triangles per
+    # pixel quad, dropped when a corner has no depth or the corners' depths
+    # differ by more than max_depth_jump of the nearest one (an occlusion edge).
+    # Returns float32 vertices and normals in metres and int32 triangles.
+    points, mask = back_project(depth_frame.depth, depth_frame.intrinsic_matrix(), depth_frame.scale_mm,
+                                stride=stride, return_mask=True, organized=True)
+    height, width = mask.shape
+    z = points[..., 2]
+    index = np.arange(height * width, dtype=np.int32).reshape(height, width)
+
+    # Corners of every quad; (a, c, b) and (b, c, d) wind towards the camera
+    corners = [(index[:-1, :-1], z[:-1, :-1]), (index[:-1, 1:], z[:-1, 1:]),
+               (index[1:, :-1], z[1:, :-1]), (index[1:, 1:], z[1:, 1:])]
+    triangles = []
+    for first, second, third in ((0, 2, 1), (1, 2, 3)):
+        depths = np.stack([corners[first][1], corners[second][1], corners[third][1]])
+        nearest = depths.min(axis=0)
+        valid = (nearest > 0) & (depths.max(axis=0) - nearest <= max_depth_jump * nearest)
+        triangles.append(np.stack([corners[first][0][valid], corners[second][0][valid],
+                                   corners[third][0][valid]], axis=1))
+    triangles = np.concatenate(triangles, axis=0)
+
+    # Normals from image-space gradients: cross of the row and column tangents
+    normals = np.cross(np.gradient(points, axis=0), np.gradient(points, axis=1))
+    lengths = np.linalg.norm(normals, axis=-1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+
+    # Keep only vertices that some triangle uses and renumber them
+    used = np.zeros(height * width, dtype=bool)
+    used[triangles.reshape(-1)] = True
+    renumber = np.cumsum(used, dtype=np.int32) - 1
+    vertices = points.reshape(-1, 3)[used]
+    normals = normals.reshape(-1, 3)[used].astype(np.float32)
+    triangles = renumber[triangles]
+
+    if camera_pose is not None:
+        # camera_pose is world-to-camera; vertices go back to the rig frame
+        camera_to_world = np.linalg.inv(np.asarray(camera_pose, dtype=np.float64))
+        rotation = camera_to_world[:3, :3].astype(np.float32)
+        vertices = vertices @ rotation.T + camera_to_world[:3, 3].astype(np.float32)
+        normals = normals @ rotation.T
+    return vertices, normals, triangles
+
+def merge_meshes(meshes):
+    # Concatenate per-view meshes, offsetting each view's triangle indices
+    offsets = np.cumsum([0] + [len(vertices) for vertices, _, _ in meshes[:-1]])
+    vertices = np.concatenate([mesh[0] for mesh in meshes], axis=0)
+    normals = np.concatenate([mesh[1] for mesh in meshes], axis=0)
+    triangles = np.concatenate([mesh[2] + np.int32(offset) for mesh, offset in zip(meshes, offsets)], axis=0)
+    return vertices, normals, triangles
@@ -0,0 +1,166 @@
+import bisect
+import json
+import os
+import threading
+
+class FrameSetRecord:
+    def __init__(self, frame_set_id, timestamp):
+        self.frame_set_id = frame_set_id
+        # Capture timestamp of the first depth map; later ones join within tolerance
+        self.timestamp = timestamp
+        self.paths = {}
+
+    def sorted_paths(self):
+        return [self.paths[camera] for camera in sorted(self.paths)]
+
+class FrameSetManifest:
+    # Maps frame set ids to per-camera depth map files. Every change is
+    # appended to a JSON-lines log and replayed on start, so the index
+    # survives restarts without re-reading the depth maps themselves.
+    def __init__(self, path, frames_per_set, tolerance_ms=20.0, compact_after=1000):
+        self.path = path
+        self.frames_per_set = frames_per_set
+        self.tolerance = tolerance_ms / 1000.0
+        self.compact_after = compact_after
+        self.sets = {}
+        self.by_path = {}
+        # (timestamp, frame_set_id) of incomplete sets, sorted for nearest-neighbour joins
+        self.open_sets = []
+        self.latest = None
+        self.next_id = 1
+        self.dead_records = 0
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self.replay()
+        self.log = open(path, 'a')
+
+    def replay(self):
+        with open(self.path, 'r') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-write leaves at most one torn line at the end
+                    continue
+                if 'next_id' in record:
+                    self.next_id = max(self.next_id, record['next_id'])
+                elif 'add' in record:
+                    self.apply_add(record['add'], record['camera'], record['timestamp'], record['path'])
+                elif 'consume' in record:
+                    self.apply_consume(record['consume'])
+
+    def write(self, record):
+        self.log.write(json.dumps(record) + '\n')
+        self.log.flush()
+
+    def find_open_set(self, camera, timestamp):
+        # Nearest incomplete set within tolerance that is still missing this camera
+        position = bisect.bisect_left(self.open_sets, (timestamp, 0))
+        best = None
+        for step in (-1, 1):
+            index = position if step == 1 else position - 1
+            while 0 <= index < len(self.open_sets):
+                set_timestamp, frame_set_id = self.open_sets[index]
+                distance = abs(set_timestamp - timestamp)
+                if distance > self.tolerance:
+                    break
+                if camera not in self.sets[frame_set_id].paths and (best is None or distance < best[0]):
+                    best = (distance, frame_set_id)
+                index += step
+        return None if best is None else best[1]
+
+    def apply_add(self, frame_set_id, camera, timestamp, path):
+        record = self.sets.get(frame_set_id)
+        if record is None:
+            record = FrameSetRecord(frame_set_id, timestamp)
+            self.sets[frame_set_id] = record
+            bisect.insort(self.open_sets, (timestamp, frame_set_id))
+            self.next_id = max(self.next_id, frame_set_id + 1)
+        record.paths[camera] = path
+        self.by_path[path] = frame_set_id
+        if len(record.paths) < self.frames_per_set:
+            return None
+        self.open_sets.remove((record.timestamp, frame_set_id))
+        if self.latest is None or record.timestamp >= self.sets[self.latest].timestamp:
+            self.latest = frame_set_id
+        return record
+
+    def add(self, camera, timestamp, path):
+        # Returns the frame set if this depth map completed it
+        with self.lock:
+            if path in self.by_path:
+                return None
+            frame_set_id = self.find_open_set(camera, timestamp)
+            if frame_set_id is None:
+                frame_set_id = self.next_id
+                self.next_id += 1
+            self.write({'add': frame_set_id, 'camera': camera, 'timestamp': timestamp, 'path': path})
+            return self.apply_add(frame_set_id, camera, timestamp, path)
+
+    def latest_complete(self):
+        with self.lock:
+            return None if self.latest is None else self.sets[self.latest]
+
+    def apply_consume(self, frame_set_id):
+        # Drops the set and everything captured before it, complete or not,
+        # plus open sets older than the newest complete one: a set that lost
+        # a camera's file never completes, and builds only take the newest.
+        # Returns the paths that are no longer referenced. Deterministic, so
+        # replaying the log's consume records expires the same sets.
+        consumed = self.sets.get(frame_set_id)
+        if consumed is None:
+            return []
+        stale = [record for record in self.sets.values() if record.timestamp <= consumed.timestamp]
+        paths = self.drop(stale)
+        if self.latest not in self.sets:
+            complete = [record for record in self.sets.values() if len(record.paths) >= self.frames_per_set]
+            self.latest = max(complete, key=lambda record: record.timestamp).frame_set_id if complete else None
+        if self.latest is not None:
+            newest_complete = self.sets[self.latest].timestamp
+            paths += self.drop([self.sets[open_id] for timestamp, open_id in self.open_sets
+                                if timestamp < newest_complete])
+        return paths
+
+    def drop(self, records):
+        paths = []
+        for record in records:
+            del self.sets[record.frame_set_id]
+            for path in record.paths.values():
+                del self.by_path[path]
+                paths.append(path)
+            self.dead_records += len(record.paths)
+        self.open_sets = [entry for entry in self.open_sets if entry[1] in self.sets]
+        return paths
+
+    def consume(self, frame_set_id):
+        with self.lock:
+            paths = self.apply_consume(frame_set_id)
+            if paths:
+                self.write({'consume': frame_set_id})
+                self.dead_records += 1
+                if self.dead_records >= self.compact_after:
+                    self.compact()
+            return paths
+
+    def compact(self):
+        # Rewrite the log with only the live sets, then swap it in atomically
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            # Ids are never reused, even once every set has been consumed
+            file.write(json.dumps({'next_id': self.next_id}) + '\n')
+            for record in self.sets.values():
+                for camera, path in record.paths.items():
+                    file.write(json.dumps({'add': record.frame_set_id, 'camera': camera,
+                                           'timestamp': record.timestamp, 'path': path}) + '\n')
+        self.log.close()
+        os.replace(temp_path, self.path)
+        self.log = open(self.path, 'a')
+        self.dead_records = 0
+
+    def pending(self):
+        with self.lock:
+            return len(self.open_sets)
+
+    def close(self):
+        with self.lock:
+            self.log.close()
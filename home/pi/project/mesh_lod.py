@@ -0,0 +1,51 @@
+import json
+import os
+import time
+import numpy as np
+import open3d as o3d
+from compact_mesh import EXTENSION, save_compact_mesh
+
+MANIFEST_NAME = 'latest.json'
+
+def decimate_chain(mesh, budgets):
+    # Each level is decimated from the previous one rather than from the full
+    # mesh, so every step works on an already reduced input
+    levels = [mesh]
+    for budget in sorted(budgets, reverse=True):
+        if budget >= len(levels[-1].triangles):
+            continue
+        levels.append(levels[-1].simplify_quadric_decimation(target_number_of_triangles=int(budget)))
+    return levels
+
+def export_lods(mesh, output_folder, basename, budgets=(200000, 50000, 10000), compact=False):
+    # Writes <basename>.ply at full resolution plus <basename>_lod<N>.ply per
+    # triangle budget, then a <basename>.json manifest listing every level.
+    # With compact=True every level is also written as a quantized .cmsh for
+    # the web viewer. latest.json is replaced last, so readers never see a
+    # partial export.
+    levels = []
+    for level, lod in enumerate(decimate_chain(mesh, budgets)):
+        filename = f'{basename}.ply' if level == 0 else f'{basename}_lod{level}.ply'
+        path = os.path.join(output_folder, filename)
+        o3d.io.write_triangle_mesh(path, lod)
+        entry = {'level': level, 'file': filename, 'triangles': len(lod.triangles),
+                 'vertices': len(lod.vertices), 'bytes': os.path.getsize(path)}
+        if compact:
+            entry['compact'] = filename[:-len('.ply')] + EXTENSION
+            compact_path = os.path.join(output_folder, entry['compact'])
+            normals = np.asarray(lod.vertex_normals) if lod.has_vertex_normals() else None
+            save_compact_mesh(compact_path, np.asarray(lod.vertices), normals, np.asarray(lod.triangles))
+            entry['compact_bytes'] = os.path.getsize(compact_path)
+        levels.append(entry)
+
+    manifest = {'model': basename, 'created': time.time(), 'levels': levels,
+                'full': levels[0]['file'], 'preview': levels[-1]['file']}
+    write_manifest(os.path.join(output_folder, f'{basename}.json'), manifest)
+    write_manifest(os.path.join(output_folder, MANIFEST_NAME), manifest)
+    return manifest
+
+def write_manifest(path, manifest):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temp_path, path)
@@ -2,6 +2,11 @@ import socket
 import struct
 import pickle
 import threading
+import time
+import yaml
+from camera_capture import make_camera_capture
+from pipeline import StageSpec, build_pipeline
+from video_stitching import VideoStitching
 
 class NetworkCommunication:
     def __init__(self, server_ip, server_port):
@@ -26,32 +31,50 @@ def main():
     server_ip = "192.168.0.2"  # IP address of Raspberry Pi 2
     server_port = 8000  # Port number for communication
 
+    with open('config.yaml', 'r') as file:
+        config = yaml.safe_load(file)
+
     camera_indices = [0, 1, 2, 3]  # Adjust the indices based on your camera setup
-    capture = CameraCapture(camera_indices)
+    capture = make_camera_capture(camera_indices, config.get('capture'))
     stitching = VideoStitching(camera_indices)
     communication = NetworkCommunication(server_ip, server_port)
 
-    def stitch_and_send_thread():
-        while True:
-            frames = capture.get_frames()
-            frame_list = [frames[i] for i in camera_indices]
-            stitching.stitch_frames(frame_list)
-            stitched_frame = stitching.get_stitched_frame()
-            if stitched_frame is not None:
-                communication.send_frame(stitched_frame)
+    last_sequences = {}
+
+    def stitch():
+        # Waits for a new frame on some camera, so an unchanged set of frames
+        # is never stitched and sent twice
+        new_frames = capture.get_new_frames(last_sequences, timeout=0.1)
+        if new_frames is None:
+            return None
+        sequences, frames = new_frames
+        last_sequences.update(sequences)
+        if len(frames) < len(camera_indices):
+            return None
+        stitching.stitch_frames([frames[i] for i in camera_indices])
+        return stitching.get_stitched_frame()
+
+    # The sender only ever needs the newest panorama; a slow link drops frames
+    stages = [
+        StageSpec('stitch', stitch),
+        StageSpec('send', communication.send_frame, input='stitch', maxsize=1, policy='keep_latest'),
+    ]
+    pipeline = build_pipeline(stages, config.get('pipeline', {}).get('streaming'))
 
     try:
         communication.connect()
         capture.start_capture()
-        threading.Thread(target=stitch_and_send_thread, daemon=True).start()
+        pipeline.start()
 
         while True:
             # You can perform other tasks or monitoring here
-            pass
+            time.sleep(10)
+            print(f"Pipeline: {pipeline.get_stats()}")
 
     except KeyboardInterrupt:
         print("Keyboard interrupt received. Shutting down.")
     finally:
+        pipeline.stop()
         capture.stop_capture()
         communication.close()
 
@@ -0,0 +1,117 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from rectification import RectificationEngine
+from stereo_matchers import MatcherPool
+
+# Per-process matcher pool used by the process executor
+worker_matchers = None
+worker_config_path = None
+
+def init_worker(stereo_config, pair_count, config_path):
+    global worker_matchers, worker_config_path
+    worker_matchers = MatcherPool(stereo_config, pair_count)
+    worker_config_path = config_path
+
+def compute_in_worker(pair, left, right):
+    if worker_config_path:
+        worker_matchers.reload_if_changed(worker_config_path)
+    # The pool's output buffer can't leave the process, so hand back a copy
+    return worker_matchers.compute(pair, left, right).copy()
+
+class DepthStats:
+    def __init__(self):
+        self.frame_sets = 0
+        self.rectify_time = 0.0
+        self.started = None
+        self.finished = None
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        return {
+            'frame_sets': self.frame_sets,
+            'elapsed_s': elapsed,
+            'frame_sets_per_s': self.frame_sets / elapsed if elapsed > 0 else 0.0,
+            'mean_rectify_ms': self.rectify_time * 1000.0 / max(self.frame_sets, 1),
+        }
+
+class ParallelDepthStage:
+    def __init__(self, calibration_data, stereo_config=None, executor='thread', workers=4, max_in_flight=2,
+                 cache_dir=None, config_path=None):
+        self.rectifier = RectificationEngine(calibration_data, cache_dir=cache_dir)
+        self.pair_count = len(self.rectifier.pairs)
+        self.executor_type = executor
+        self.max_in_flight = max_in_flight
+        self.config_path = config_path
+        # Rectify buffers cycle through one more slot than can be in flight, so the
+        # set being rectified never overwrites one whose disparities are pending
+        self.slots = max_in_flight + 1
+        self.next_slot = 0
+        self.in_flight = deque()
+        self.stats = DepthStats()
+
+        if executor == 'process':
+            self.matchers = None
+            self.pool = ProcessPoolExecutor(workers, initializer=init_worker,
+                                            initargs=(stereo_config or {}, self.pair_count, config_path))
+        elif executor == 'thread':
+            # OpenCV releases the GIL inside remap and the matchers
+            self.matchers = MatcherPool(stereo_config, self.pair_count)
+            self.pool = ThreadPoolExecutor(workers)
+        else:
+            raise ValueError(f"Unknown depth executor {executor}")
+
+    def compute_pair(self, pair, left, right, slot):
+        return self.matchers.compute(pair, left, right, slot)
+
+    def submit(self, gray_frames, tag=None):
+        # Rectifies on the caller's thread while earlier sets are still in the pool,
+        # then fans the pairs out. Returns (tag, disparities) for every set that
+        # has finished, oldest first, blocking only to stay within max_in_flight.
+        if self.stats.started is None:
+            self.stats.started = time.perf_counter()
+        if self.matchers is not None and self.config_path:
+            self.matchers.reload_if_changed(self.config_path)
+
+        slot = self.next_slot
+        self.next_slot = (self.next_slot + 1) % self.slots
+        start_time = time.perf_counter()
+        rectified = self.rectifier.rectify_frame_set(gray_frames, slot)
+        self.stats.rectify_time += time.perf_counter() - start_time
+
+        if self.matchers is None:
+            futures = [self.pool.submit(compute_in_worker, pair, left, right)
+                       for pair, (left, right) in enumerate(rectified)]
+        else:
+            futures = [self.pool.submit(self.compute_pair, pair, left, right, slot)
+                       for pair, (left, right) in enumerate(rectified)]
+        self.in_flight.append((tag, futures))
+
+        completed = []
+        while self.in_flight and (len(self.in_flight) > self.max_in_flight
+                                  or all(future.done() for future in self.in_flight[0][1])):
+            completed.append(self.collect())
+        return completed
+
+    def collect(self):
+        tag, futures = self.in_flight.popleft()
+        disparities = [future.result() for future in futures]
+        self.stats.frame_sets += 1
+        self.stats.finished = time.perf_counter()
+        return tag, disparities
+
+    def drain(self):
+        completed = []
+        while self.in_flight:
+            completed.append(self.collect())
+        return completed
+
+    def get_stats(self):
+        report = self.stats.report()
+        report['executor'] = self.executor_type
+        if self.matchers is not None:
+            report['pairs'] = self.matchers.get_timings()
+        return report
+
+    def close(self):
+        self.pool.shutdown()
@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from stage_queue import StageQueue
+
+THREAD = 'thread'
+PROCESS = 'process'
+
+class StageSpec:
+    # One node of the graph. A stage without an input is a source: function()
+    # is called in a loop and each non-None result is passed on. Other stages
+    # get function(item) for every item from their input, which is either the
+    # name of another stage or a queue fed from outside the graph, such as a
+    # FrameBroadcast subscription. A None result is dropped. Process stages
+    # need a picklable function. on_drop(item) is called for every item the
+    # stage's own input queue discards, or still holds at stop(), e.g. to
+    # release a reference the item carries; such items need a single consumer.
+    def __init__(self, name, function, input=None, workers=1, executor=THREAD, maxsize=2, policy='block',
+                 on_drop=None):
+        self.name = name
+        self.function = function
+        self.input = input
+        self.workers = workers
+        self.executor = executor
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_drop = on_drop
+
+    def configure(self, stage_config):
+        # Settings from config.yaml win over the defaults declared in code
+        for key in ('input', 'workers', 'executor', 'maxsize', 'policy'):
+            if key in stage_config:
+                setattr(self, key, stage_config[key])
+        return self
+
+class StageTiming:
+    def __init__(self):
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds):
+        self.items += 1
+        self.busy_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def report(self):
+        return {'items': self.items, 'errors': self.errors,
+                'mean_ms': 1000.0 * self.busy_seconds / max(self.items, 1), 'max_ms': 1000.0 * self.max_seconds}
+
+class Pipeline:
+    # Runs a graph of stages. Every non-source stage reads from its own
+    # bounded StageQueue and runs on `workers` threads; process stages hand
+    # each call to a pool of that many processes. Outputs fan out to every
+    # stage that names this one as its input. With several workers, items may
+    # leave a stage out of order.
+    def __init__(self, stages, poll_interval=0.1):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            if isinstance(stage.input, str) and stage.input not in self.stages:
+                raise ValueError(f"Stage {stage.name} reads from unknown stage {stage.input}")
+        self.poll_interval = poll_interval
+        # External inputs bring their own bounds
+        self.queues = {stage.name: StageQueue(stage.maxsize, stage.policy, stage.name, stage.on_drop)
+                       if isinstance(stage.input, str) else stage.input
+                       for stage in stages if stage.input is not None}
+        self.outputs = {name: [self.queues[stage.name] for stage in stages if stage.input == name]
+                        for name in self.stages}
+        self.timings = {name: StageTiming() for name in self.stages}
+        self.pools = {}
+        # Worker threads per stage name
+        self.threads = {}
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+
+    def start(self):
+        self.running.set()
+        # Consumers first, so sources never produce into a stage that isn't running
+        order = sorted(self.stages.values(), key=lambda stage: stage.input is None)
+        for stage in order:
+            if stage.executor == PROCESS:
+                self.pools[stage.name] = ProcessPoolExecutor(stage.workers)
+            for worker in range(stage.workers):
+                thread = threading.Thread(target=self.run_stage, args=(stage,), name=f'{stage.name}-{worker}',
+                                          daemon=True)
+                thread.start()
+                self.threads.setdefault(stage.name, []).append(thread)
+
+    def call(self, stage, *args):
+        pool = self.pools.get(stage.name)
+        if pool is None:
+            return stage.function(*args)
+        return pool.submit(stage.function, *args).result()
+
+    def run_stage(self, stage):
+        source = stage.input is None
+        # An input with done(item) is told when the stage has finished with each item
+        done = getattr(self.queues.get(stage.name), 'done', None)
+        while self.running.is_set():
+            if source:
+                args = ()
+            else:
+                try:
+                    args = (self.queues[stage.name].get(timeout=self.poll_interval),)
+                except queue.Empty:
+                    continue
+            start_time = time.perf_counter()
+            try:
+                result = self.call(stage, *args)
+            except Exception:
+                with self.lock:
+                    self.timings[stage.name].errors += 1
+                traceback.print_exc()
+                if source:
+                    # A failing source would otherwise spin on the error
+                    time.sleep(self.poll_interval)
+                continue
+            finally:
+                if done is not None:
+                    done(*args)
+            with self.lock:
+                self.timings[stage.name].record(time.perf_counter() - start_time)
+            if result is None:
+                continue
+            # Blocking outputs wait for room; stop() closes the queues to release them
+            for output in self.outputs[stage.name]:
+                output.put(result)
+
+    def get_stats(self):
+        with self.lock:
+            stats = {name: timing.report() for name, timing in self.timings.items()}
+        for name, stage_queue in self.queues.items():
+            stats[name]['queue'] = stage_queue.get_stats()
+        return stats
+
+    def stop(self, timeout=5.0):
+        self.running.clear()
+        for stage_queue in self.queues.values():
+            stage_queue.close()
+        for threads in self.threads.values():
+            for thread in threads:
+                thread.join(timeout)
+        # Items still queued never reach their stage; external inputs are
+        # told they are done with them and internal queues drop them, so
+        # references they carry, e.g. to broadcast frame sets, are released.
+        # A stage still busy past the timeout may yet take an item, so its
+        # queue is left alone rather than releasing an item twice
+        for name, stage_queue in self.queues.items():
+            if any(thread.is_alive() for thread in self.threads.get(name, [])):
+                continue
+            done = getattr(stage_queue, 'done', None) or getattr(stage_queue, 'on_drop', None)
+            while True:
+                try:
+                    item = stage_queue.get(timeout=0)
+                except queue.Empty:
+                    break
+                if done is not None:
+                    done(item)
+        for pool in self.pools.values():
+            pool.shutdown(cancel_futures=True)
+        self.threads = {}
+        self.pools = {}
+
+def build_pipeline(stages, pipeline_config=None):
+    # pipeline_config: {stage name: {input, workers, executor, maxsize, policy}}
+    pipeline_config = pipeline_config or {}
+    return Pipeline([stage.configure(pipeline_config.get(stage.name, {})) for stage in stages])
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# (fx, fy, cx, cy, height, width, stride) -> per-column and per-row ray factors
+ray_cache = OrderedDict()
+ray_cache_lock = threading.Lock()
+RAY_CACHE_SIZE = 16
+
+def ray_grid(intrinsic, shape, stride=1):
+    # (u - cx) / fx depends only on the column and (v - cy) / fy only on the row,
+    # so the grid is stored as a row vector and a column vector that broadcast
+    intrinsic = np.asarray(intrinsic)
+    fx, fy = float(intrinsic[0, 0]), float(intrinsic[1, 1])
+    cx, cy = float(intrinsic[0, 2]), float(intrinsic[1, 2])
+    height, width = shape[:2]
+    key = (fx, fy, cx, cy, height, width, stride)
+
+    with ray_cache_lock:
+        rays = ray_cache.get(key)
+        if rays is not None:
+            ray_cache.move_to_end(key)
+            return rays
+
+    x_rays = ((np.arange(0, width, stride, dtype=np.float32) - cx) / fx)[np.newaxis, :]
+    y_rays = ((np.arange(0, height, stride, dtype=np.float32) - cy) / fy)[:, np.newaxis]
+    x_rays.flags.writeable = False
+    y_rays.flags.writeable = False
+
+    with ray_cache_lock:
+        ray_cache[key] = (x_rays, y_rays)
+        if len(ray_cache) > RAY_CACHE_SIZE:
+            ray_cache.popitem(last=False)
+    return x_rays, y_rays
+
+def back_project(depth_map, intrinsic, scale_mm=1.0, stride=1, return_mask=False, organized=False):
+    # Depth units * scale_mm give millimetres; points come out in metres as float32.
+    # organized=True keeps the (rows, cols, 3) layout with zeros where depth is missing.
+    x_rays, y_rays = ray_grid(intrinsic, depth_map.shape, stride)
+    depth = depth_map[::stride, ::stride] if stride > 1 else depth_map
+    z = depth.astype(np.float32)
+    z *= np.float32(scale_mm / 1000.0)
+
+    if organized:
+        points = np.empty(depth.shape + (3,), dtype=np.float32)
+        np.multiply(x_rays, z, out=points[..., 0])
+        np.multiply(y_rays, z, out=points[..., 1])
+        points[..., 2] = z
+        return (points, depth > 0) if return_mask else points
+
+    mask = depth > 0
+    z_valid = z[mask]
+    points = np.empty((z_valid.shape[0], 3), dtype=np.float32)
+    np.multiply(np.broadcast_to(x_rays, depth.shape)[mask], z_valid, out=points[:, 0])
+    np.multiply(np.broadcast_to(y_rays, depth.shape)[mask], z_valid, out=points[:, 1])
+    points[:, 2] = z_valid
+    return (points, mask) if return_mask else points
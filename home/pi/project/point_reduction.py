@@ -0,0 +1,141 @@
+import time
+import numpy as np
+
+DEFAULT_PARAMS = {
+    # Metres; 0 disables the step
+    'dedup_radius': 0.005,
+    'voxel_size': 0.01,
+    # none, statistical or radius
+    'outliers': 'statistical',
+    'nb_neighbors': 20,
+    'std_ratio': 2.0,
+    'outlier_radius': 0.05,
+    'min_neighbors': 8,
+    # Hard cap on points passed to meshing; 0 means no cap
+    'max_points': 500000,
+}
+
+# Voxel coordinates are packed 21 bits per axis into one int64 key
+KEY_BITS = 21
+KEY_BIAS = 1 << (KEY_BITS - 1)
+KEY_MASK = (1 << KEY_BITS) - 1
+
+def voxel_keys(points, voxel_size):
+    cells = np.floor(points / voxel_size).astype(np.int64)
+    cells += KEY_BIAS
+    np.clip(cells, 0, KEY_MASK, out=cells)
+    return (cells[:, 0] << (2 * KEY_BITS)) | (cells[:, 1] << KEY_BITS) | cells[:, 2]
+
+def voxel_downsample(points, voxel_size):
+    # One point per occupied voxel: the centroid of the points that fell in it
+    if len(points) == 0:
+        return points
+    _, inverse, counts = np.unique(voxel_keys(points, voxel_size), return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    centroids = np.empty((len(counts), 3), dtype=np.float32)
+    for axis in range(3):
+        centroids[:, axis] = np.bincount(inverse, weights=points[:, axis], minlength=len(counts)) / counts
+    return centroids
+
+class VoxelAccumulator:
+    # voxel_downsample over points that arrive in chunks: keeps per-voxel sums
+    # and counts, so memory follows the occupied volume, not the point count
+    def __init__(self, voxel_size):
+        self.voxel_size = voxel_size
+        self.keys = np.empty(0, dtype=np.int64)
+        self.sums = np.empty((0, 3), dtype=np.float64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def add(self, points):
+        if len(points) == 0:
+            return
+        keys = np.concatenate((self.keys, voxel_keys(points, self.voxel_size)))
+        unique, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        old, new = inverse[:len(self.keys)], inverse[len(self.keys):]
+        sums = np.zeros((len(unique), 3), dtype=np.float64)
+        counts = np.zeros(len(unique), dtype=np.int64)
+        # Existing keys are unique, so their totals carry over directly
+        sums[old] = self.sums
+        counts[old] = self.counts
+        for axis in range(3):
+            sums[:, axis] += np.bincount(new, weights=points[:, axis], minlength=len(unique))
+        counts += np.bincount(new, minlength=len(unique))
+        self.keys, self.sums, self.counts = unique, sums, counts
+
+    def centroids(self):
+        return (self.sums / self.counts[:, np.newaxis]).astype(np.float32)
+
+def dedup_views(clouds, radius):
+    # A hash cell belongs to the first view that put a point in it; later
+    # views drop their points there, since overlapping ring pairs otherwise
+    # contribute the same surface twice
+    if not clouds:
+        return np.empty((0, 3), dtype=np.float32)
+    points = np.concatenate(clouds, axis=0)
+    views = np.repeat(np.arange(len(clouds)), [len(cloud) for cloud in clouds])
+    _, first, inverse = np.unique(voxel_keys(points, radius), return_index=True, return_inverse=True)
+    return points[views == views[first][inverse.reshape(-1)]]
+
+def remove_outliers(points, params):
+    # open3d is only needed for this step
+    import open3d as o3d
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points.astype(np.float64))
+    if params['outliers'] == 'radius':
+        _, indices = pcd.remove_radius_outlier(nb_points=params['min_neighbors'], radius=params['outlier_radius'])
+    else:
+        _, indices = pcd.remove_statistical_outlier(nb_neighbors=params['nb_neighbors'],
+                                                    std_ratio=params['std_ratio'])
+    return points[np.asarray(indices, dtype=np.int64)]
+
+def cap_points(points, max_points):
+    # Evenly spaced subsample, so the budget holds whatever the earlier steps left
+    if len(points) <= max_points:
+        return points
+    return points[np.linspace(0, len(points) - 1, max_points).astype(np.int64)]
+
+class ReductionStats:
+    def __init__(self):
+        self.steps = []
+
+    def record(self, name, points_in, points_out, seconds):
+        self.steps.append({'step': name, 'points_in': points_in, 'points_out': points_out,
+                           'ms': 1000.0 * seconds})
+
+    def report(self):
+        return list(self.steps)
+
+class PointReducer:
+    # Bounds the cloud handed to normal estimation and Poisson: cross-view
+    # dedup, voxel downsampling, outlier removal, then a hard point cap
+    def __init__(self, reduction_config=None):
+        self.params = dict(DEFAULT_PARAMS)
+        self.params.update(reduction_config or {})
+        self.stats = ReductionStats()
+
+    def step(self, name, points_in, function):
+        start = time.perf_counter()
+        points = function()
+        self.stats.record(name, points_in, len(points), time.perf_counter() - start)
+        return points
+
+    def reduce(self, clouds):
+        # clouds: one (N, 3) float32 array per view
+        self.stats = ReductionStats()
+        params = self.params
+        total = sum(len(cloud) for cloud in clouds)
+        if params['dedup_radius'] > 0:
+            points = self.step('dedup', total, lambda: dedup_views(clouds, params['dedup_radius']))
+        else:
+            points = np.concatenate(clouds, axis=0)
+        if params['voxel_size'] > 0:
+            points = self.step('voxel', len(points), lambda: voxel_downsample(points, params['voxel_size']))
+        if params['outliers'] != 'none' and len(points) > 0:
+            points = self.step('outliers', len(points), lambda: remove_outliers(points, params))
+        if params['max_points'] > 0:
+            points = self.step('cap', len(points), lambda: cap_points(points, params['max_points']))
+        return points
+
+    def get_stats(self):
+        return self.stats.report()
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import numpy as np
+from point_reduction import VoxelAccumulator
+
+INDEX_NAME = 'index.json'
+POINT_BYTES = 12
+
+class PointStore:
+    # Points on disk, bucketed by a bucket_size grid. Each bucket is one
+    # append-only file of float32 xyz rows, read back through memmap. The
+    # index holds the committed row count per bucket and is replaced
+    # atomically after every append, so rows written by an interrupted append
+    # are ignored and cut off the next time the store is opened. Appends may
+    # come from several threads; reads see the counts committed so far.
+    def __init__(self, root, bucket_size=2.0):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_NAME)
+        os.makedirs(root, exist_ok=True)
+        self.bucket_size = bucket_size
+        self.counts = {}
+        self.lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as file:
+                index = json.load(file)
+            # Buckets already on disk fix the grid
+            self.bucket_size = index['bucket_size']
+            self.counts = {tuple(int(part) for part in key.split(',')): count
+                           for key, count in index['buckets'].items()}
+            self.repair()
+
+    def bucket_path(self, key):
+        return os.path.join(self.root, 'bucket_{}_{}_{}.f32'.format(*key))
+
+    def repair(self):
+        missing = []
+        for key, count in self.counts.items():
+            path = self.bucket_path(key)
+            if not os.path.exists(path):
+                # Deleted by hand or never flushed: the bucket starts over empty
+                missing.append(key)
+            elif os.path.getsize(path) > count * POINT_BYTES:
+                os.truncate(path, count * POINT_BYTES)
+        for key in missing:
+            del self.counts[key]
+        if missing:
+            self.write_index()
+
+    def write_index(self):
+        index = {'bucket_size': self.bucket_size,
+                 'buckets': {','.join(map(str, key)): count for key, count in self.counts.items()}}
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(index, file)
+        os.replace(temp_path, self.index_path)
+
+    def append(self, points):
+        points = np.ascontiguousarray(points, dtype='<f4').reshape(-1, 3)
+        if len(points) == 0:
+            return
+        cells = np.floor(points / self.bucket_size).astype(np.int64)
+        keys, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind='stable')
+        sizes = np.bincount(inverse, minlength=len(keys))
+        ends = np.cumsum(sizes)
+        starts = ends - sizes
+        with self.lock:
+            for bucket, key in enumerate(map(tuple, keys.tolist())):
+                rows = points[order[starts[bucket]:ends[bucket]]]
+                with open(self.bucket_path(key), 'ab') as file:
+                    file.write(rows.tobytes())
+                self.counts[key] = self.counts.get(key, 0) + len(rows)
+            self.write_index()
+
+    def keys(self):
+        # No lock: builds read from a forked copy, where it may be held forever
+        return sorted(self.counts)
+
+    def neighbours(self, key, margin=0.0):
+        # The buckets gather(key, margin) reads: the key alone, or with any
+        # margin its 26 neighbours too
+        if margin <= 0:
+            return [key]
+        return [tuple(part + step - 1 for part, step in zip(key, offset)) for offset in np.ndindex(3, 3, 3)]
+
+    def signature(self, key, margin=0.0):
+        # Committed row counts of those buckets; changes whenever points land
+        # in the bucket or within margin of it
+        return [self.counts.get(neighbour, 0) for neighbour in self.neighbours(key, margin)]
+
+    def total_points(self):
+        return sum(self.counts.values())
+
+    def bounds(self, key):
+        lower = np.array(key, dtype=np.float32) * np.float32(self.bucket_size)
+        return lower, lower + np.float32(self.bucket_size)
+
+    def load(self, key):
+        # Read-only memmap of the committed rows; later appends don't move it
+        count = self.counts.get(key, 0)
+        if count == 0:
+            return np.empty((0, 3), dtype=np.float32)
+        return np.memmap(self.bucket_path(key), dtype='<f4', mode='r', shape=(count, 3))
+
+    def gather(self, key, margin=0.0, voxel_size=0.0, chunk_points=1 << 18):
+        # The bucket's points plus neighbours' points within margin of it,
+        # streamed in chunks. With voxel_size the result is downsampled as it
+        # is read, so memory stays bounded however long the session ran.
+        lower, upper = self.bounds(key)
+        accumulator = VoxelAccumulator(voxel_size) if voxel_size > 0 else None
+        parts = []
+        for neighbour in self.neighbours(key, margin):
+            points = self.load(neighbour)
+            for start in range(0, len(points), chunk_points):
+                chunk = np.asarray(points[start:start + chunk_points])
+                if neighbour != key:
+                    chunk = chunk[((chunk >= lower - margin) & (chunk < upper + margin)).all(axis=1)]
+                if accumulator is not None:
+                    accumulator.add(chunk)
+                else:
+                    parts.append(chunk)
+        if accumulator is not None:
+            return accumulator.centroids()
+        return np.concatenate(parts, axis=0) if parts else np.empty((0, 3), dtype=np.float32)
@@ -0,0 +1,264 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+def cylindrical_maps(shape, fov_degrees, exact=True):
+    # Source coordinates for every output pixel of cylindrical_projection in
+    # depth_sensing.py: output column i sweeps theta over a full turn and row
+    # j walks the radius j - center_y from the frame centre. exact=True
+    # truncates like the original int() calls, so a nearest-neighbour remap
+    # reproduces it pixel for pixel; exact=False keeps the fractional part for
+    # smoother interpolation.
+    height, width = shape[:2]
+    projected_width = int(width * np.radians(fov_degrees) / (2 * np.pi))
+    center_x = width // 2
+    center_y = height // 2
+
+    theta = np.arange(projected_width) * (2 * np.pi) / projected_width
+    radius = (np.arange(height) - center_y)[:, np.newaxis]
+    map_x = center_x + radius * np.sin(theta)[np.newaxis, :]
+    map_y = center_y + radius * np.cos(theta)[np.newaxis, :]
+    if exact:
+        map_x = np.trunc(map_x)
+        map_y = np.trunc(map_y)
+    return map_x.astype(np.float32), map_y.astype(np.float32)
+
+# Directions are unit vectors with x right, y down and z forward. yaw turns
+# right about y and pitch looks up about x, in degrees. Every projection maps
+# output pixel centres to directions (unproject) and directions to source
+# pixel coordinates (project), so any pair converts through one table.
+# Direction grids are float32 to keep the one-off build small on the Pi.
+
+def rotation(yaw_degrees, pitch_degrees):
+    yaw = np.radians(yaw_degrees)
+    pitch = np.radians(pitch_degrees)
+    yaw_matrix = np.array([[np.cos(yaw), 0, np.sin(yaw)], [0, 1, 0], [-np.sin(yaw), 0, np.cos(yaw)]])
+    pitch_matrix = np.array([[1, 0, 0], [0, np.cos(pitch), -np.sin(pitch)], [0, np.sin(pitch), np.cos(pitch)]])
+    return (yaw_matrix @ pitch_matrix).astype(np.float32)
+
+def pixel_grid(shape):
+    # Pixel centres as float32 column and row vectors that broadcast
+    height, width = shape[:2]
+    u = np.arange(width, dtype=np.float32)[np.newaxis, :] + np.float32(0.5)
+    v = np.arange(height, dtype=np.float32)[:, np.newaxis] + np.float32(0.5)
+    return u, v
+
+class Equirectangular:
+    # Full sphere: longitude across the width, latitude down the height.
+    # This is what vr_viewer.html's a-sky expects.
+    border = cv2.BORDER_WRAP
+
+    def key(self):
+        return ('equirectangular',)
+
+    def unproject(self, shape):
+        height, width = shape[:2]
+        u, v = pixel_grid(shape)
+        longitude = (u / width - np.float32(0.5)) * np.float32(2 * np.pi)
+        latitude = (np.float32(0.5) - v / height) * np.float32(np.pi)
+        return np.stack(np.broadcast_arrays(np.cos(latitude) * np.sin(longitude), -np.sin(latitude),
+                                            np.cos(latitude) * np.cos(longitude)), axis=-1)
+
+    def project(self, directions, shape):
+        height, width = shape[:2]
+        x, y, z = directions[..., 0], directions[..., 1], directions[..., 2]
+        longitude = np.arctan2(x, z)
+        latitude = np.arcsin(np.clip(-y, -1, 1))
+        map_x = (longitude / (2 * np.pi) + 0.5) * width - 0.5
+        # The seam wraps horizontally; rows are clamped so the poles never blend across it
+        map_y = np.clip((0.5 - latitude / np.pi) * height - 0.5, 0, height - 1)
+        return map_x, map_y
+
+class Cylindrical:
+    # Longitude across the width over fov_degrees, height on the unit
+    # cylinder down the rows, at the same pixels per radian
+    border = cv2.BORDER_CONSTANT
+
+    def __init__(self, fov_degrees=360.0, yaw=0.0):
+        self.fov_degrees = float(fov_degrees)
+        self.yaw = float(yaw)
+
+    def key(self):
+        return ('cylindrical', self.fov_degrees, self.yaw)
+
+    def focal(self, shape):
+        return shape[1] / np.radians(self.fov_degrees)
+
+    def unproject(self, shape):
+        height, width = shape[:2]
+        focal = np.float32(self.focal(shape))
+        u, v = pixel_grid(shape)
+        longitude = (u - np.float32(width / 2)) / focal + np.float32(np.radians(self.yaw))
+        elevation = (v - np.float32(height / 2)) / focal
+        directions = np.stack(np.broadcast_arrays(np.sin(longitude), elevation, np.cos(longitude)), axis=-1)
+        return directions / np.linalg.norm(directions, axis=-1, keepdims=True)
+
+    def project(self, directions, shape):
+        height, width = shape[:2]
+        focal = self.focal(shape)
+        x, y, z = directions[..., 0], directions[..., 1], directions[..., 2]
+        longitude = np.arctan2(x, z) - np.radians(self.yaw)
+        longitude = (longitude + np.pi) % (2 * np.pi) - np.pi
+        map_x = longitude * focal + width / 2 - 0.5
+        map_y = y / np.maximum(np.hypot(x, z), 1e-6) * focal + height / 2 - 0.5
+        return map_x, map_y
+
+class Perspective:
+    # Pinhole viewport looking along (yaw, pitch); fov_degrees spans the width
+    border = cv2.BORDER_CONSTANT
+
+    def __init__(self, fov_degrees=90.0, yaw=0.0, pitch=0.0):
+        self.fov_degrees = float(fov_degrees)
+        self.yaw = float(yaw)
+        self.pitch = float(pitch)
+
+    def key(self):
+        return ('perspective', self.fov_degrees, self.yaw, self.pitch)
+
+    def focal(self, shape):
+        return shape[1] / 2 / np.tan(np.radians(self.fov_degrees) / 2)
+
+    def unproject(self, shape):
+        height, width = shape[:2]
+        focal = np.float32(self.focal(shape))
+        u, v = pixel_grid(shape)
+        rays = np.stack(np.broadcast_arrays((u - np.float32(width / 2)) / focal, (v - np.float32(height / 2)) / focal,
+                                            np.ones_like(u)), axis=-1)
+        directions = rays @ rotation(self.yaw, self.pitch).T
+        return directions / np.linalg.norm(directions, axis=-1, keepdims=True)
+
+    def project(self, directions, shape):
+        height, width = shape[:2]
+        focal = self.focal(shape)
+        rays = directions @ rotation(self.yaw, self.pitch)
+        z = rays[..., 2]
+        # Directions behind the viewport land outside the frame
+        in_front = z > 1e-6
+        z = np.where(in_front, z, 1.0)
+        map_x = np.where(in_front, rays[..., 0] / z * focal + width / 2 - 0.5, -1)
+        map_y = np.where(in_front, rays[..., 1] / z * focal + height / 2 - 0.5, -1)
+        return map_x, map_y
+
+# Cube faces as (yaw, pitch) of a 90 degree square viewport
+CUBE_FACES = {
+    'front': (0.0, 0.0),
+    'right': (90.0, 0.0),
+    'back': (180.0, 0.0),
+    'left': (-90.0, 0.0),
+    'up': (0.0, 90.0),
+    'down': (0.0, -90.0),
+}
+
+def cube_face(face):
+    yaw, pitch = CUBE_FACES[face]
+    return Perspective(90.0, yaw, pitch)
+
+def make_projection(spec):
+    # From a request or config dict, e.g. {'type': 'perspective', 'fov': 70,
+    # 'yaw': 30, 'pitch': -10} or {'type': 'cube_face', 'face': 'up'}
+    kind = spec['type']
+    if kind == 'equirectangular':
+        return Equirectangular()
+    if kind == 'cylindrical':
+        return Cylindrical(spec.get('fov', 360.0), spec.get('yaw', 0.0))
+    if kind == 'perspective':
+        return Perspective(spec.get('fov', 90.0), spec.get('yaw', 0.0), spec.get('pitch', 0.0))
+    if kind == 'cube_face':
+        return cube_face(spec['face'])
+    raise ValueError(f"Unknown projection: {kind}")
+
+def reprojection_maps(source, source_shape, target, target_shape):
+    map_x, map_y = source.project(target.unproject(target_shape), source_shape)
+    return map_x.astype(np.float32), map_y.astype(np.float32)
+
+def frame_shape(frames, batched=None):
+    # (batched, (height, width)) of one (H, W) or (H, W, C) frame, or of a
+    # batch given as a list or an (N, H, W, C) array. An (N, H, W) array is
+    # read as one colour frame unless batched=True says it is grayscale frames.
+    if batched is None:
+        batched = isinstance(frames, (list, tuple)) or frames.ndim == 4
+    return batched, (frames[0] if batched else frames).shape[:2]
+
+class ProjectionStats:
+    def __init__(self):
+        self.frames = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def report(self, cached):
+        return {'frames': self.frames, 'cached_maps': cached, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+class ProjectionEngine:
+    # Each projection is a cv2.remap through maps built once per (projection,
+    # input shape, parameters, interpolation) and kept in an LRU cache, so a
+    # frame costs one remap instead of per-pixel trigonometry. Maps are
+    # stored as fixed-point CV_16SC2, which remap reads fastest.
+    def __init__(self, cache_size=8, interpolation=cv2.INTER_NEAREST):
+        self.cache_size = cache_size
+        self.interpolation = interpolation
+        self.cache = OrderedDict()
+        self.stats = ProjectionStats()
+        self.lock = threading.Lock()
+
+    def maps(self, key, build, interpolation):
+        key = key + (interpolation,)
+        with self.lock:
+            maps = self.cache.get(key)
+            if maps is not None:
+                self.cache.move_to_end(key)
+                self.stats.hits += 1
+                return maps
+            self.stats.misses += 1
+
+        map_x, map_y = build(exact=interpolation == cv2.INTER_NEAREST)
+        maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2, nninterpolation=interpolation == cv2.INTER_NEAREST)
+
+        with self.lock:
+            self.cache[key] = maps
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+                self.stats.evictions += 1
+        return maps
+
+    def remap(self, frames, key, build, interpolation=None, border=cv2.BORDER_CONSTANT, batched=None):
+        # A batch shares one table and one output array
+        batched, _ = frame_shape(frames, batched)
+        interpolation = self.interpolation if interpolation is None else interpolation
+        map1, map2 = self.maps(key, build, interpolation)
+        with self.lock:
+            self.stats.frames += len(frames) if batched else 1
+        if not batched:
+            return cv2.remap(frames, map1, map2, interpolation, borderMode=border, borderValue=0)
+        output = np.empty((len(frames),) + map1.shape[:2] + frames[0].shape[2:], dtype=frames[0].dtype)
+        for frame, projected in zip(frames, output):
+            cv2.remap(frame, map1, map2, interpolation, dst=projected, borderMode=border, borderValue=0)
+        return output
+
+    def reproject(self, frames, source, target, size, interpolation=None, batched=None):
+        # Frames in the source projection to target's projection at size
+        # (width, height)
+        batched, source_shape = frame_shape(frames, batched)
+        target_shape = (size[1], size[0])
+        return self.remap(frames, ('reproject', source.key(), source_shape, target.key(), target_shape),
+                          lambda exact: reprojection_maps(source, source_shape, target, target_shape),
+                          interpolation, source.border, batched)
+
+    def viewport(self, frames, source, fov_degrees, yaw, pitch, size, interpolation=None, batched=None):
+        return self.reproject(frames, source, Perspective(fov_degrees, yaw, pitch), size, interpolation, batched)
+
+    def cubemap(self, frames, source, face_size, interpolation=None, batched=None):
+        return {face: self.reproject(frames, source, cube_face(face), (face_size, face_size), interpolation, batched)
+                for face in CUBE_FACES}
+
+    def cylindrical(self, frames, fov_degrees, interpolation=None, batched=None):
+        # The depth_sensing.py sweep; see Cylindrical for the true projection
+        batched, shape = frame_shape(frames, batched)
+        return self.remap(frames, ('cylindrical', shape, float(fov_degrees)),
+                          lambda exact: cylindrical_maps(shape, fov_degrees, exact), interpolation, batched=batched)
+
+    def get_stats(self):
+        with self.lock:
+            return self.stats.report(len(self.cache))
@@ -0,0 +1,154 @@
+import cv2
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+def ring_pairs(camera_count):
+    # Each camera is paired with its right-hand neighbour around the helmet
+    return [(i, (i + 1) % camera_count) for i in range(camera_count)]
+
+def calibration_key(*parts):
+    payload = json.dumps([np.asarray(part, dtype=np.float64).round(9).tolist() if not isinstance(part, str) else part
+                          for part in parts])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class RectificationEngine:
+    def __init__(self, calibration_data, cache_dir=None, alpha=0.0, interpolation=cv2.INTER_LINEAR):
+        self.camera_params = calibration_data['camera_params']
+        self.pairs = ring_pairs(len(self.camera_params))
+        # Optional extrinsics per ring pair: {left, right, rotation, translation}
+        self.extrinsics = {(pair['left'], pair['right']): pair
+                           for pair in calibration_data.get('stereo_pairs', [])}
+        self.cache_dir = cache_dir
+        self.alpha = alpha
+        self.interpolation = interpolation
+        self.maps = {}
+        # (kind, cameras, size) -> (key, maps), so frames skip hashing entirely
+        self.resolved = {}
+        self.outputs = {}
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def intrinsics(self, camera):
+        params = self.camera_params[camera]
+        camera_matrix = np.array(params['camera_matrix'], dtype=np.float64)
+        distortion_coeffs = np.array(params['distortion_coeffs'], dtype=np.float64).reshape(-1)
+        return camera_matrix, distortion_coeffs
+
+    def load_or_build(self, key, build):
+        with self.lock:
+            if key in self.maps:
+                return self.maps[key]
+
+        path = os.path.join(self.cache_dir, f'rectify_{key}.npz') if self.cache_dir else None
+        if path and os.path.exists(path):
+            with np.load(path) as data:
+                maps = {name: data[name] for name in data.files}
+        else:
+            maps = build()
+            if path:
+                # Write then rename so a crash never leaves a truncated table behind
+                temp_path = path + '.tmp.npz'
+                np.savez(temp_path, **maps)
+                os.replace(temp_path, path)
+
+        with self.lock:
+            self.maps[key] = maps
+        return maps
+
+    def camera_maps(self, camera, size):
+        # Undistort-only tables, shared by both ring pairs the camera sits in
+        resolved = self.resolved.get(('camera', camera, size))
+        if resolved is not None:
+            return resolved
+        camera_matrix, distortion_coeffs = self.intrinsics(camera)
+        key = calibration_key('undistort', camera_matrix, distortion_coeffs, size)
+
+        def build():
+            map1, map2 = cv2.initUndistortRectifyMap(camera_matrix, distortion_coeffs, None, camera_matrix,
+                                                     size, cv2.CV_16SC2)
+            return {'map1': map1, 'map2': map2, 'projection': camera_matrix}
+
+        resolved = key, self.load_or_build(key, build)
+        self.resolved[('camera', camera, size)] = resolved
+        return resolved
+
+    def pair_maps(self, left, right, size):
+        resolved = self.resolved.get(('pair', (left, right), size))
+        if resolved is not None:
+            return resolved
+        extrinsic = self.extrinsics[(left, right)]
+        left_matrix, left_coeffs = self.intrinsics(left)
+        right_matrix, right_coeffs = self.intrinsics(right)
+        rotation = np.array(extrinsic['rotation'], dtype=np.float64)
+        translation = np.array(extrinsic['translation'], dtype=np.float64).reshape(3, 1)
+        key = calibration_key('stereo', left_matrix, left_coeffs, right_matrix, right_coeffs,
+                              rotation, translation, size, [self.alpha])
+
+        def build():
+            R1, R2, P1, P2, Q, _, _ = cv2.stereoRectify(left_matrix, left_coeffs, right_matrix, right_coeffs,
+                                                        size, rotation, translation, alpha=self.alpha)
+            left_map1, left_map2 = cv2.initUndistortRectifyMap(left_matrix, left_coeffs, R1, P1, size, cv2.CV_16SC2)
+            right_map1, right_map2 = cv2.initUndistortRectifyMap(right_matrix, right_coeffs, R2, P2, size,
+                                                                 cv2.CV_16SC2)
+            return {'left_map1': left_map1, 'left_map2': left_map2, 'right_map1': right_map1,
+                    'right_map2': right_map2, 'left_projection': P1, 'right_projection': P2, 'Q': Q}
+
+        resolved = key, self.load_or_build(key, build)
+        self.resolved[('pair', (left, right), size)] = resolved
+        return resolved
+
+    def remap(self, image, map1, map2, output_key, slot):
+        # Reuse one output buffer per table, image shape and slot; callers that
+        # keep results across frame sets alternate slots
+        buffer_key = (output_key, image.shape, slot)
+        output = self.outputs.get(buffer_key)
+        if output is None:
+            output = np.empty(image.shape, dtype=image.dtype)
+            self.outputs[buffer_key] = output
+        cv2.remap(image, map1, map2, self.interpolation, dst=output)
+        return output
+
+    def undistort(self, camera, image, slot=0):
+        size = (image.shape[1], image.shape[0])
+        key, maps = self.camera_maps(camera, size)
+        return self.remap(image, maps['map1'], maps['map2'], key, slot)
+
+    def rectify_pair(self, left, right, left_image, right_image, slot=0):
+        if (left, right) not in self.extrinsics:
+            return self.undistort(left, left_image, slot), self.undistort(right, right_image, slot)
+        size = (left_image.shape[1], left_image.shape[0])
+        key, maps = self.pair_maps(left, right, size)
+        return (self.remap(left_image, maps['left_map1'], maps['left_map2'], key + 'L', slot),
+                self.remap(right_image, maps['right_map1'], maps['right_map2'], key + 'R', slot))
+
+    def rectify_frame_set(self, images, slot=0):
+        # Returns (left, right) per ring pair. Cameras without pair extrinsics are
+        # undistorted once and the result shared by both pairs they belong to.
+        undistorted = {}
+        rectified = []
+        for left, right in self.pairs:
+            if (left, right) in self.extrinsics:
+                rectified.append(self.rectify_pair(left, right, images[left], images[right], slot))
+                continue
+            for camera in (left, right):
+                if camera not in undistorted:
+                    undistorted[camera] = self.undistort(camera, images[camera], slot)
+            rectified.append((undistorted[left], undistorted[right]))
+        return rectified
+
+    def projection(self, left, right, size):
+        # Rectified projection of the left camera, for converting disparity to depth
+        if (left, right) in self.extrinsics:
+            return self.pair_maps(left, right, size)[1]['left_projection']
+        return self.camera_maps(left, size)[1]['projection']
+
+    def baseline(self, left, right, size):
+        # Rectified baseline in calibration units, or None without pair extrinsics
+        if (left, right) not in self.extrinsics:
+            return None
+        right_projection = self.pair_maps(left, right, size)[1]['right_projection']
+        return abs(right_projection[0, 3] / right_projection[0, 0])
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from collections import deque
+
+# Overflow policies, applied when put() finds the queue full
+BLOCK = 'block'              # wait for the consumer (backpressure)
+DROP_OLDEST = 'drop_oldest'  # evict the item that has waited longest
+DROP_NEWEST = 'drop_newest'  # discard the incoming item
+KEEP_LATEST = 'keep_latest'  # discard everything waiting; the consumer only ever sees the newest
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, KEEP_LATEST)
+
+class QueueStats:
+    def __init__(self):
+        self.put = 0
+        self.got = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.put_wait = 0.0
+        self.max_put_wait = 0.0
+        self.get_wait = 0.0
+        self.max_get_wait = 0.0
+
+    def report(self, depth):
+        return {
+            'depth': depth,
+            'max_depth': self.max_depth,
+            'put': self.put,
+            'got': self.got,
+            'dropped': self.dropped,
+            'mean_put_wait_ms': 1000.0 * self.put_wait / max(self.put, 1),
+            'max_put_wait_ms': 1000.0 * self.max_put_wait,
+            'mean_get_wait_ms': 1000.0 * self.get_wait / max(self.got, 1),
+            'max_get_wait_ms': 1000.0 * self.max_get_wait,
+        }
+
+class StageQueue:
+    # Bounded hand-off between pipeline stages with a queue.Queue-like
+    # put/get. A stage that falls behind costs frames, per the policy, instead
+    # of memory. on_drop(item) is called for every item the queue discards.
+    def __init__(self, maxsize=2, policy=BLOCK, name=None, on_drop=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.name = name
+        self.on_drop = on_drop
+        self.items = deque()
+        self.stats = QueueStats()
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, item, timeout=None):
+        # Returns False if the item was dropped (drop_newest, a block timeout, or close)
+        dropped = self.insert(item, timeout)
+        # Callbacks run outside the lock; they may touch other queues
+        if self.on_drop is not None:
+            for old_item in dropped:
+                self.on_drop(old_item)
+        return not any(old_item is item for old_item in dropped)
+
+    def insert(self, item, timeout):
+        # Returns the items dropped by this put, which may include item itself
+        start_time = time.perf_counter()
+        with self.condition:
+            if self.closed:
+                self.stats.dropped += 1
+                return [item]
+            dropped = []
+            if len(self.items) >= self.maxsize:
+                if self.policy == BLOCK:
+                    if not self.condition.wait_for(lambda: self.closed or len(self.items) < self.maxsize, timeout) \
+                            or self.closed:
+                        self.stats.dropped += 1
+                        return [item]
+                elif self.policy == DROP_NEWEST:
+                    self.stats.dropped += 1
+                    return [item]
+                elif self.policy == DROP_OLDEST:
+                    dropped = [self.items.popleft()]
+                    self.stats.dropped += 1
+            if self.policy == KEEP_LATEST and self.items:
+                dropped = list(self.items)
+                self.stats.dropped += len(self.items)
+                self.items.clear()
+            self.items.append(item)
+            waited = time.perf_counter() - start_time
+            self.stats.put += 1
+            self.stats.put_wait += waited
+            self.stats.max_put_wait = max(self.stats.max_put_wait, waited)
+            self.stats.max_depth = max(self.stats.max_depth, len(self.items))
+            self.condition.notify_all()
+            return dropped
+
+    def get(self, timeout=None):
+        # Raises queue.Empty on timeout, like queue.Queue
+        start_time = time.perf_counter()
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items, timeout):
+                raise queue.Empty
+            item = self.items.popleft()
+            waited = time.perf_counter() - start_time
+            self.stats.got += 1
+            self.stats.get_wait += waited
+            self.stats.max_get_wait = max(self.stats.max_get_wait, waited)
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        # Releases producers blocked in put() and turns away later puts;
+        # their items count as dropped
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def qsize(self):
+        with self.condition:
+            return len(self.items)
+
+    def get_stats(self):
+        with self.condition:
+            return self.stats.report(len(self.items))
+
+def make_stage_queue(name, queue_config=None, maxsize=2, policy=BLOCK, on_drop=None):
+    # queue_config: {name: {maxsize, policy}}, e.g. one of config.yaml's pipeline graphs
+    settings = (queue_config or {}).get(name, {})
+    return StageQueue(settings.get('maxsize', maxsize), settings.get('policy', policy), name, on_drop)
@@ -63,10 +63,21 @@ check_command_status
 
 echo "3D model creation started successfully on Raspberry Pi 2."
 
-# Retrieve the generated 3D model from the second Raspberry Pi
+# Retrieve the generated 3D model from the second Raspberry Pi. latest.json
+# names the full mesh and a decimated preview; the preview is fetched first
+# and the full mesh only when FETCH_FULL=1.
 echo "Retrieving the generated 3D model from Raspberry Pi 2..."
-scp pi@$PI2_IP:$PI2_OUTPUT_PATH/output_3d_model.obj ./
+scp pi@$PI2_IP:$PI2_OUTPUT_PATH/latest.json ./
 check_command_status
+PREVIEW_FILE=$(python -c "import json; print(json.load(open('latest.json'))['preview'])")
+scp pi@$PI2_IP:$PI2_OUTPUT_PATH/$PREVIEW_FILE ./
+check_command_status
+
+if [ "$FETCH_FULL" = "1" ]; then
+    FULL_FILE=$(python -c "import json; print(json.load(open('latest.json'))['full'])")
+    scp pi@$PI2_IP:$PI2_OUTPUT_PATH/$FULL_FILE ./
+    check_command_status
+fi
 
 echo "3D model retrieved successfully."
 
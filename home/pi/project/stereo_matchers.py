@@ -0,0 +1,173 @@
+import cv2
+import os
+import threading
+import time
+import numpy as np
+import yaml
+
+DEFAULT_PARAMS = {
+    'algorithm': 'bm',
+    'num_disparities': 16,
+    'block_size': 15,
+}
+
+# Config key -> setter name, shared by StereoBM and StereoSGBM
+COMMON_SETTERS = {
+    'num_disparities': 'setNumDisparities',
+    'block_size': 'setBlockSize',
+    'min_disparity': 'setMinDisparity',
+    'uniqueness_ratio': 'setUniquenessRatio',
+    'speckle_window_size': 'setSpeckleWindowSize',
+    'speckle_range': 'setSpeckleRange',
+    'pre_filter_cap': 'setPreFilterCap',
+    'disp12_max_diff': 'setDisp12MaxDiff',
+}
+
+ALGORITHM_SETTERS = {
+    'bm': {
+        'texture_threshold': 'setTextureThreshold',
+        'pre_filter_size': 'setPreFilterSize',
+    },
+    'sgbm': {
+        'p1': 'setP1',
+        'p2': 'setP2',
+        'mode': 'setMode',
+    },
+}
+
+def validate_params(params):
+    # cv2 only rejects most of these once compute() runs, deep in the depth
+    # loop, so settings are checked before a matcher is built from them
+    algorithm = params.get('algorithm')
+    if algorithm not in ALGORITHM_SETTERS:
+        raise ValueError(f"Unknown stereo algorithm {algorithm}")
+    known = set(COMMON_SETTERS) | set(ALGORITHM_SETTERS[algorithm]) | {'algorithm'}
+    unknown = sorted(set(params) - known)
+    if unknown:
+        raise ValueError(f"Unknown {algorithm} stereo settings: {', '.join(unknown)}")
+    if params['num_disparities'] <= 0 or params['num_disparities'] % 16:
+        raise ValueError(f"num_disparities must be a positive multiple of 16, not {params['num_disparities']}")
+    smallest = 5 if algorithm == 'bm' else 1
+    if params['block_size'] % 2 == 0 or not smallest <= params['block_size'] <= 255:
+        raise ValueError(f"block_size must be odd and between {smallest} and 255 for {algorithm}, "
+                         f"not {params['block_size']}")
+    pre_filter_size = params.get('pre_filter_size', 9)
+    if pre_filter_size % 2 == 0 or not 5 <= pre_filter_size <= 255:
+        raise ValueError(f"pre_filter_size must be odd and between 5 and 255, not {pre_filter_size}")
+
+class PairTiming:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.last = elapsed
+        self.max = max(self.max, elapsed)
+
+    def report(self):
+        return {
+            'frames': self.count,
+            'mean_ms': self.total * 1000.0 / max(self.count, 1),
+            'last_ms': self.last * 1000.0,
+            'max_ms': self.max * 1000.0,
+        }
+
+class MatcherPool:
+    def __init__(self, stereo_config=None, pair_count=4):
+        self.pair_count = pair_count
+        self.params = {}
+        self.matchers = {}
+        self.outputs = {}
+        self.timings = {pair: PairTiming() for pair in range(pair_count)}
+        self.locks = {pair: threading.Lock() for pair in range(pair_count)}
+        self.config_mtime = None
+        self.configure(stereo_config or {})
+
+    def pair_params(self, stereo_config, pair):
+        params = dict(DEFAULT_PARAMS)
+        params.update(stereo_config.get('default', {}))
+        params.update(stereo_config.get('pairs', {}).get(pair, {}))
+        return params
+
+    def configure(self, stereo_config):
+        # Every pair is rebuilt from the defaults plus the config's overrides,
+        # so a key removed from the config goes back to its default. All
+        # pairs are checked before any is swapped in; on a ValueError the
+        # previous matchers stay.
+        pairs = {pair: self.pair_params(stereo_config, pair) for pair in range(self.pair_count)}
+        matchers = {pair: self.build(params) for pair, params in pairs.items() if params != self.params.get(pair)}
+        for pair, matcher in matchers.items():
+            with self.locks[pair]:
+                self.matchers[pair] = matcher
+                self.params[pair] = pairs[pair]
+
+    def build(self, params):
+        validate_params(params)
+        if params['algorithm'] == 'sgbm':
+            matcher = cv2.StereoSGBM_create()
+        else:
+            matcher = cv2.StereoBM_create()
+        try:
+            self.apply(matcher, params)
+        except cv2.error as error:
+            raise ValueError(f"Invalid stereo settings {params}: {error}")
+        return matcher
+
+    def apply(self, matcher, params):
+        setters = dict(COMMON_SETTERS)
+        setters.update(ALGORITHM_SETTERS[params['algorithm']])
+        for key, value in params.items():
+            if key in setters:
+                getattr(matcher, setters[key])(value)
+
+    def update(self, pair, **params):
+        # Changes take effect on the pair's next frame; only an algorithm switch
+        # replaces the matcher, everything else goes through its setters
+        with self.locks[pair]:
+            current = self.params.get(pair)
+            merged = dict(current or DEFAULT_PARAMS)
+            merged.update(params)
+            validate_params(merged)
+            if current is None or merged['algorithm'] != current['algorithm']:
+                self.matchers[pair] = self.build(merged)
+            else:
+                changed = {key: value for key, value in merged.items() if current.get(key) != value}
+                changed['algorithm'] = merged['algorithm']
+                self.apply(self.matchers[pair], changed)
+            self.params[pair] = merged
+
+    def reload_if_changed(self, config_path):
+        # Cheap enough to call once per frame set: one stat() unless the file changed
+        mtime = os.stat(config_path).st_mtime
+        if mtime == self.config_mtime:
+            return False
+        self.config_mtime = mtime
+        try:
+            with open(config_path, 'r') as file:
+                config = yaml.safe_load(file)
+            self.configure(config.get('stereo', {}))
+        except (ValueError, yaml.YAMLError) as error:
+            # A bad edit must not stop the depth loop; the next save is tried again
+            print(f'Keeping the current stereo settings, {config_path} is invalid: {error}')
+            return False
+        return True
+
+    def compute(self, pair, left_gray, right_gray, slot=0):
+        # The disparity buffer is reused per pair and slot across frames
+        with self.locks[pair]:
+            key = (pair, slot, left_gray.shape)
+            output = self.outputs.get(key)
+            if output is None:
+                output = np.empty(left_gray.shape, dtype=np.int16)
+                self.outputs[key] = output
+            start_time = time.perf_counter()
+            disparity = self.matchers[pair].compute(left_gray, right_gray, output)
+            self.timings[pair].record(time.perf_counter() - start_time)
+            return disparity
+
+    def get_timings(self):
+        return {pair: timing.report() for pair, timing in self.timings.items()}
@@ -0,0 +1,201 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from grid_mesh import merge_meshes
+from point_reduction import cap_points
+
+def plan_tiles(points, tile_size, overlap, max_points):
+    # Occupied cells of a tile_size grid, split in half along their longest
+    # side while the cell plus its overlap margin holds more than max_points.
+    # Returns (core_lower, core_upper, indices of points within the margin).
+    if len(points) == 0:
+        return []
+    lower = points.min(axis=0)
+    cells = np.floor((points - lower) / tile_size).astype(np.int64)
+    keys, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    pending = [(lower + key * tile_size, lower + (key + 1) * tile_size) for key in keys]
+
+    tiles = []
+    while pending:
+        core_lower, core_upper = pending.pop()
+        inside = np.flatnonzero(((points >= core_lower - overlap) & (points < core_upper + overlap)).all(axis=1))
+        if not np.any(((points[inside] >= core_lower) & (points[inside] < core_upper)).all(axis=1)):
+            continue
+        extent = core_upper - core_lower
+        axis = int(np.argmax(extent))
+        # Tiles narrower than the margin stop splitting; the worker caps them instead
+        if len(inside) > max_points and extent[axis] > 2 * overlap:
+            middle = core_lower[axis] + extent[axis] / 2
+            left_upper = core_upper.copy()
+            left_upper[axis] = middle
+            right_lower = core_lower.copy()
+            right_lower[axis] = middle
+            pending.append((core_lower, left_upper))
+            pending.append((right_lower, core_upper))
+            continue
+        tiles.append((core_lower, core_upper, inside))
+    return tiles
+
+def crop_mesh(vertices, normals, triangles, core_lower, core_upper):
+    # Keep triangles whose centroid lies in the tile's half-open core box, so
+    # every triangle in the overlap belongs to exactly one tile
+    centroids = vertices[triangles].mean(axis=1)
+    keep = ((centroids >= core_lower) & (centroids < core_upper)).all(axis=1)
+    triangles = triangles[keep]
+    used = np.zeros(len(vertices), dtype=bool)
+    used[triangles.reshape(-1)] = True
+    renumber = np.cumsum(used, dtype=np.int32) - 1
+    return vertices[used], normals[used], renumber[triangles].astype(np.int32)
+
+def mesh_tile(points, core_lower, core_upper, poisson_depth, max_points):
+    # Runs in a pool worker; open3d is only needed here
+    import open3d as o3d
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(cap_points(points, max_points).astype(np.float64))
+    pcd.estimate_normals()
+    # Tiles are meshed independently, so normals must agree on a side: the rig
+    # sits at the origin and sees every surface from that side
+    pcd.orient_normals_towards_camera_location(np.zeros(3))
+    mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=poisson_depth, width=0, scale=1.1,
+                                                                     linear_fit=False)[0]
+    mesh.compute_vertex_normals()
+    return crop_mesh(np.asarray(mesh.vertices, dtype=np.float32), np.asarray(mesh.vertex_normals, dtype=np.float32),
+                     np.asarray(mesh.triangles), core_lower, core_upper)
+
+def empty_mesh():
+    return np.empty((0, 3), np.float32), np.empty((0, 3), np.float32), np.empty((0, 3), np.int32)
+
+def merge_tiles(meshes):
+    meshes = [mesh for mesh in meshes if len(mesh[2])]
+    if not meshes:
+        return empty_mesh()
+    return merge_meshes(meshes)
+
+class TileMeshCache:
+    # Cropped tile meshes on disk, each saved with the signature of what it
+    # was meshed from. Builds run in short-lived worker processes, so the
+    # cache has to outlive them; files are replaced atomically.
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, 'tile_{}_{}_{}.npz'.format(*key))
+
+    def load(self, key, signature):
+        # The cached mesh, or None if there is none or it is stale
+        try:
+            with np.load(self.path(key)) as data:
+                if str(data['signature']) != signature:
+                    return None
+                return data['vertices'], data['normals'], data['triangles']
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, key, signature, mesh):
+        temp_path = self.path(key) + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez(file, signature=np.array(signature), vertices=mesh[0], normals=mesh[1], triangles=mesh[2])
+        os.replace(temp_path, self.path(key))
+
+class TiledStats:
+    def __init__(self):
+        self.tiles = 0
+        self.cached_tiles = 0
+        self.largest_tile = 0
+        self.plan_seconds = 0.0
+        self.mesh_seconds = 0.0
+
+    def report(self):
+        return {'tiles': self.tiles, 'cached_tiles': self.cached_tiles, 'largest_tile_points': self.largest_tile,
+                'plan_ms': 1000.0 * self.plan_seconds, 'mesh_ms': 1000.0 * self.mesh_seconds}
+
+class TiledReconstructor:
+    # Poisson over overlapping spatial tiles in a process pool. The memory
+    # budget is shared by the workers and bounds the points per tile, so peak
+    # use stays near memory_budget_mb however large the cloud gets.
+    # bytes_per_point is the peak a worker needs per input point; see
+    # model.tiled.bytes_per_point in config.yaml.
+    def __init__(self, tile_size=2.0, overlap=0.2, workers=None, memory_budget_mb=512, bytes_per_point=1000,
+                 poisson_depth=8):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = workers or os.cpu_count() or 1
+        self.max_points = max(1000, int(memory_budget_mb * 1e6 / self.workers / bytes_per_point))
+        self.poisson_depth = poisson_depth
+        self.pool = None
+        self.stats = TiledStats()
+
+    def reconstruct(self, points):
+        # Returns merged float32 vertices and normals and int32 triangles
+        self.stats = TiledStats()
+        start_time = time.perf_counter()
+        tiles = plan_tiles(points, self.tile_size, self.overlap, self.max_points)
+        self.stats.plan_seconds = time.perf_counter() - start_time
+        self.stats.tiles = len(tiles)
+        self.stats.largest_tile = max((len(inside) for _, _, inside in tiles), default=0)
+        if not tiles:
+            return empty_mesh()
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        start_time = time.perf_counter()
+        futures = [self.pool.submit(mesh_tile, points[inside], core_lower, core_upper, self.poisson_depth,
+                                    self.max_points)
+                   for core_lower, core_upper, inside in tiles]
+        meshes = [future.result() for future in futures]
+        self.stats.mesh_seconds = time.perf_counter() - start_time
+        return merge_tiles(meshes)
+
+    def reconstruct_store(self, store, voxel_size, cache=None):
+        # One tile per PointStore bucket, read with its overlap margin and
+        # downsampled while streaming; at most two tiles per worker are in
+        # memory at once, so the session length does not change peak use.
+        # With a TileMeshCache only tiles whose points changed since they
+        # were last meshed go to the pool; the rest are read back.
+        self.stats = TiledStats()
+        start_time = time.perf_counter()
+        in_flight = deque()
+        meshes = []
+        for key in store.keys():
+            signature = json.dumps([store.signature(key, self.overlap), voxel_size, self.overlap,
+                                    self.poisson_depth, self.max_points])
+            mesh = cache.load(key, signature) if cache is not None else None
+            if mesh is not None:
+                self.stats.cached_tiles += 1
+                meshes.append(mesh)
+                continue
+            points = store.gather(key, self.overlap, voxel_size)
+            if len(points) == 0:
+                continue
+            core_lower, core_upper = store.bounds(key)
+            self.stats.tiles += 1
+            self.stats.largest_tile = max(self.stats.largest_tile, len(points))
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers)
+            in_flight.append((key, signature, self.pool.submit(mesh_tile, points, core_lower, core_upper,
+                                                               self.poisson_depth, self.max_points)))
+            while len(in_flight) > 2 * self.workers:
+                meshes.append(self.collect(in_flight.popleft(), cache))
+        meshes.extend(self.collect(tile, cache) for tile in in_flight)
+        self.stats.mesh_seconds = time.perf_counter() - start_time
+        return merge_tiles(meshes)
+
+    def collect(self, tile, cache):
+        key, signature, future = tile
+        mesh = future.result()
+        if cache is not None:
+            cache.save(key, signature, mesh)
+        return mesh
+
+    def get_stats(self):
+        return self.stats.report()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
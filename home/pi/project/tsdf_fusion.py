@@ -0,0 +1,124 @@
+import time
+import numpy as np
+
+class FusionStats:
+    def __init__(self):
+        self.frame_sets = 0
+        self.frames = 0
+        self.skipped_frames = 0
+        self.integrate_seconds = 0.0
+        self.meshes = 0
+        self.extract_seconds = 0.0
+
+    def report(self):
+        return {
+            'frame_sets': self.frame_sets,
+            'frames': self.frames,
+            'skipped_frames': self.skipped_frames,
+            'integrate_ms_per_set': 1000.0 * self.integrate_seconds / max(self.frame_sets, 1),
+            'meshes': self.meshes,
+            'extract_ms_per_mesh': 1000.0 * self.extract_seconds / max(self.meshes, 1),
+        }
+
+class TSDFFusion:
+    # Integrates every frame set into one persistent scalable TSDF volume, so
+    # the cost per frame set depends on the image size rather than on how
+    # much has been captured. Meshes are extracted on demand or every
+    # mesh_interval seconds. open3d is only imported once a posed frame
+    # arrives, so the bookkeeping works without it.
+    def __init__(self, voxel_length=0.01, sdf_trunc=0.04, depth_trunc=10.0, camera_poses=None, mesh_interval=10.0):
+        if not camera_poses:
+            raise ValueError("TSDF fusion needs model.camera_poses; without a pose every frame would be skipped")
+        self.voxel_length = voxel_length
+        self.sdf_trunc = sdf_trunc
+        self.depth_trunc = depth_trunc
+        # Camera -> 4x4 world-to-camera transform. Cameras without one are
+        # skipped: fusing them all at the origin would overwrite one frustum
+        self.extrinsics = {int(camera): np.array(pose, dtype=np.float64)
+                           for camera, pose in (camera_poses or {}).items()}
+        self.mesh_interval = mesh_interval
+        self.last_mesh_time = None
+        self.intrinsics = {}
+        self.unposed = set()
+        self.blank_colors = {}
+        self.stats = FusionStats()
+        self.volume = None
+        self.reset()
+
+    def reset(self):
+        # The volume is created with the first posed frame
+        self.volume = None
+        self.last_mesh_time = None
+        # Frames integrated when the last mesh was extracted
+        self.meshed_frames = self.stats.frames
+
+    def create_volume(self):
+        import open3d as o3d
+        return o3d.pipelines.integration.ScalableTSDFVolume(
+            voxel_length=self.voxel_length, sdf_trunc=self.sdf_trunc,
+            color_type=o3d.pipelines.integration.TSDFVolumeColorType.NoColor)
+
+    def intrinsic(self, depth_frame):
+        import open3d as o3d
+        height, width = depth_frame.depth.shape
+        key = (width, height, depth_frame.fx, depth_frame.fy, depth_frame.cx, depth_frame.cy)
+        intrinsic = self.intrinsics.get(key)
+        if intrinsic is None:
+            intrinsic = o3d.camera.PinholeCameraIntrinsic(width, height, depth_frame.fx, depth_frame.fy,
+                                                          depth_frame.cx, depth_frame.cy)
+            self.intrinsics[key] = intrinsic
+        return intrinsic
+
+    def blank_color(self, shape):
+        # The volume stores no colour, but RGBDImage still wants an image
+        import open3d as o3d
+        color = self.blank_colors.get(shape)
+        if color is None:
+            color = o3d.geometry.Image(np.zeros(shape + (3,), dtype=np.uint8))
+            self.blank_colors[shape] = color
+        return color
+
+    def integrate(self, depth_frames):
+        start = time.perf_counter()
+        for depth_frame in depth_frames:
+            extrinsic = self.extrinsics.get(depth_frame.camera)
+            if extrinsic is None:
+                if depth_frame.camera not in self.unposed:
+                    self.unposed.add(depth_frame.camera)
+                    print(f'TSDF fusion: no pose for camera {depth_frame.camera} in model.camera_poses; '
+                          f'skipping its frames')
+                self.stats.skipped_frames += 1
+                continue
+            import open3d as o3d
+            if self.volume is None:
+                self.volume = self.create_volume()
+            depth = o3d.geometry.Image(np.ascontiguousarray(depth_frame.depth))
+            # Depth units per metre: depth_mm = value * scale_mm
+            rgbd = o3d.geometry.RGBDImage.create_from_color_and_depth(
+                self.blank_color(depth_frame.depth.shape), depth, depth_scale=1000.0 / depth_frame.scale_mm,
+                depth_trunc=self.depth_trunc, convert_rgb_to_intensity=False)
+            self.volume.integrate(rgbd, self.intrinsic(depth_frame), extrinsic)
+            self.stats.frames += 1
+        self.stats.frame_sets += 1
+        self.stats.integrate_seconds += time.perf_counter() - start
+
+    def extract_mesh(self):
+        if self.volume is None:
+            raise ValueError("Nothing has been integrated into the TSDF volume yet")
+        start = time.perf_counter()
+        mesh = self.volume.extract_triangle_mesh()
+        mesh.compute_vertex_normals()
+        self.last_mesh_time = time.monotonic()
+        self.meshed_frames = self.stats.frames
+        self.stats.meshes += 1
+        self.stats.extract_seconds += time.perf_counter() - start
+        return mesh
+
+    def mesh_due(self):
+        # Never for an unchanged volume, e.g. when every frame since was skipped
+        if self.stats.frames == self.meshed_frames:
+            return False
+        return self.last_mesh_time is None or time.monotonic() - self.last_mesh_time >= self.mesh_interval
+
+    def get_stats(self):
+        return self.stats.report()
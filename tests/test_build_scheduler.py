@@ -0,0 +1,47 @@
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from build_scheduler import BuildScheduler
+
+
+def run_scheduler(build, submissions, **kwargs):
+    finished = queue.Queue()
+    scheduler = BuildScheduler(build, on_finished=lambda job_id, status: finished.put((job_id, status)),
+                               poll_interval=0.01, **kwargs)
+    scheduler.start()
+    try:
+        for job_id, argument in submissions:
+            scheduler.submit(job_id, argument)
+            # Let the first build start before the rest queue up behind it
+            while not scheduler.get_stats()["started"]:
+                time.sleep(0.01)
+        results = [finished.get(timeout=10)]
+        while scheduler.queue_depth():
+            results.append(finished.get(timeout=10))
+        return results, scheduler.get_stats()
+    finally:
+        scheduler.close()
+
+
+def test_pending_builds_are_replaced_by_newer_ones():
+    results, stats = run_scheduler(time.sleep, [(1, 0.3), (2, 0.0), (3, 0.0)])
+
+    assert results == [(1, "completed"), (3, "completed")]
+    assert stats["dropped"] == 1 and stats["completed"] == 2 and stats["queue_depth"] == 0
+
+
+def test_running_build_is_cancelled_or_times_out():
+    results, stats = run_scheduler(time.sleep, [(1, 30.0), (2, 0.0)], cancel_running=True)
+    assert results == [(1, "cancelled"), (2, "completed")]
+
+    results, stats = run_scheduler(time.sleep, [(1, 30.0)], time_budget=0.2)
+    assert results == [(1, "timed_out")] and stats["timed_out"] == 1
+
+    results, stats = run_scheduler(os._exit, [(1, 3)])
+    assert results == [(1, "failed")] and stats["failed"] == 1
@@ -0,0 +1,91 @@
+import io
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+PROJECT = Path(__file__).resolve().parents[1] / "home" / "pi" / "project"
+sys.path.append(str(PROJECT))
+
+from compact_mesh import (CompactMeshReader, decode_mesh, decode_varints, encode_mesh, encode_varints,
+                          load_compact_mesh, save_compact_mesh)
+
+
+def random_mesh(rng, vertex_count=500, triangle_count=900):
+    vertices = rng.uniform(-2.0, 3.0, (vertex_count, 3)).astype(np.float32)
+    normals = rng.normal(size=(vertex_count, 3)).astype(np.float32)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    triangles = rng.integers(0, vertex_count, (triangle_count, 3))
+    return vertices, normals, triangles
+
+
+def test_varints_round_trip_across_byte_lengths():
+    values = np.array([0, 1, 127, 128, 16383, 16384, 2**32 - 1, 2**35], dtype=np.uint64)
+    data = encode_varints(values)
+
+    assert len(data) == 1 + 1 + 1 + 2 + 2 + 3 + 5 + 6
+    decoded, used = decode_varints(data.tobytes() + b"\x80")  # trailing partial value is left over
+    np.testing.assert_array_equal(decoded, values)
+    assert used == len(data)
+
+
+def test_mesh_round_trip_within_quantization_error(tmp_path):
+    vertices, normals, triangles = random_mesh(np.random.default_rng(1))
+    path = str(tmp_path / "model.cmsh")
+
+    save_compact_mesh(path, vertices, normals, triangles)
+    decoded_vertices, decoded_normals, decoded_triangles = load_compact_mesh(path)
+
+    np.testing.assert_array_equal(decoded_triangles, triangles)
+    assert np.abs(decoded_vertices - vertices).max() <= 5.0 / 65535
+    angles = np.degrees(np.arccos(np.clip((decoded_normals * normals).sum(axis=1), -1, 1)))
+    assert angles.max() < 1.5
+    assert decode_mesh(encode_mesh(vertices, None, triangles))[1] is None
+
+
+def test_streaming_reader_matches_whole_decode():
+    vertices, normals, triangles = random_mesh(np.random.default_rng(2))
+    data = encode_mesh(vertices, normals, triangles)
+    expected = decode_mesh(data)
+
+    # Tiny chunks split varints and triangles across reads
+    reader = CompactMeshReader(io.BytesIO(data), chunk_vertices=64, chunk_bytes=7)
+    positions = list(reader.iter_positions())
+    normal_chunks = list(reader.iter_normals())
+    triangle_chunks = list(reader.iter_triangles())
+
+    assert len(positions) == 8 and len(triangle_chunks) > 1
+    np.testing.assert_array_equal(np.concatenate(positions), expected[0])
+    np.testing.assert_array_equal(np.concatenate(normal_chunks), expected[1])
+    np.testing.assert_array_equal(np.concatenate(triangle_chunks), expected[2])
+    with pytest.raises(ValueError):
+        decode_mesh(data[:-1])
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_browser_decoder_matches_python(tmp_path):
+    vertices, normals, triangles = random_mesh(np.random.default_rng(3))
+    # Large jumps give multi-byte varints, including negative deltas
+    triangles[::7] += 70000
+    vertices = np.concatenate((vertices, np.zeros((70500, 3), dtype=np.float32)))
+    normals = np.concatenate((normals, np.tile([[0.0, 0.0, -1.0]], (70500, 1)).astype(np.float32)))
+    path = tmp_path / "model.cmsh"
+    save_compact_mesh(str(path), vertices, normals, triangles)
+    script = (f"const {{decodeCompactMesh}} = require({json.dumps(str(PROJECT / 'compact_mesh.js'))});"
+              f"const data = require('fs').readFileSync({json.dumps(str(path))});"
+              "const mesh = decodeCompactMesh(data.buffer.slice(data.byteOffset, data.byteOffset + data.length));"
+              "console.log(JSON.stringify([Array.from(mesh.vertices), Array.from(mesh.normals), "
+              "Array.from(mesh.triangles)]));")
+
+    decoded = json.loads(subprocess.run(["node", "-e", script], capture_output=True, check=True, text=True).stdout)
+
+    expected = load_compact_mesh(str(path))
+    np.testing.assert_allclose(np.reshape(decoded[0], (-1, 3)), expected[0], atol=1e-5)
+    np.testing.assert_allclose(np.reshape(decoded[1], (-1, 3)), expected[1], atol=1e-5)
+    np.testing.assert_array_equal(np.reshape(decoded[2], (-1, 3)), expected[2])
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from depth_format import DisparityConverter, decode_depth_frame, load_depth_frame, save_depth_frame
+
+PROJECTION = [[500.0, 0, 320.0, 0], [0, 510.0, 240.0, 0], [0, 0, 1, 0]]
+
+
+def test_disparity_lut_gives_fixed_scale_millimetres():
+    converter = DisparityConverter(PROJECTION, baseline_mm=100.0, max_depth_mm=10000.0)
+    # 16ths of a pixel: 10 px, 50 px, invalid, and a disparity too small to trust
+    disparity = np.array([[160, 800], [-16, 1]], dtype=np.int16)
+
+    frame = converter.convert(disparity, camera=2, timestamp=12.5)
+
+    assert frame.depth.dtype == np.uint16
+    np.testing.assert_array_equal(frame.depth, [[5000, 1000], [0, 0]])
+    assert (frame.fx, frame.fy, frame.cx, frame.cy) == (500.0, 510.0, 320.0, 240.0)
+
+
+def test_depth_frame_round_trips_with_header(tmp_path):
+    converter = DisparityConverter(PROJECTION, baseline_mm=60.0, scale_mm=0.5)
+    frame = converter.convert(np.full((3, 4), 320, dtype=np.int16), camera=1, timestamp=3.25)
+    path = tmp_path / "depth_map_1_3.d16"
+
+    save_depth_frame(str(path), frame)
+    loaded = load_depth_frame(str(path))
+
+    np.testing.assert_array_equal(loaded.depth, frame.depth)
+    assert loaded.depth[0, 0] * loaded.scale_mm == pytest.approx(1500.0)
+    assert (loaded.camera, loaded.timestamp, loaded.baseline_mm) == (1, 3.25, 60.0)
+    np.testing.assert_allclose(loaded.intrinsic_matrix(), [[500, 0, 320], [0, 510, 240], [0, 0, 1]])
+
+    with pytest.raises(ValueError):
+        decode_depth_frame(b"PNG!" + frame.encode()[4:])
@@ -0,0 +1,55 @@
+import sys
+import threading
+from pathlib import Path
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from depth_transport import DepthReceiver, DepthSender, FrameSetAssembler
+
+
+def test_depth_frames_stream_over_one_connection_with_acks():
+    received = []
+    complete = threading.Event()
+
+    def on_frame_set(frame_set_id, frames):
+        received.append((frame_set_id, [bytes(frame) for frame in frames]))
+        if len(received) == 3:
+            complete.set()
+
+    assembler = FrameSetAssembler(4, on_frame_set)
+    receiver = DepthReceiver("127.0.0.1", 0, assembler.add)
+    receiver.start()
+    sender = DepthSender(*receiver.address, batch_size=3, max_unacked=2)
+    sender.start()
+    try:
+        for frame_set_id in range(3):
+            # Cameras may arrive out of order; the assembler sorts them
+            for camera in (2, 0, 3, 1):
+                sender.send(camera, frame_set_id, f"{frame_set_id}:{camera}".encode())
+        sender.flush()
+        assert complete.wait(5)
+        assert sender.wait_for_acks(5)
+    finally:
+        sender.close()
+        receiver.close()
+    receiver.wait(5)
+    assert not receiver.thread.is_alive()
+
+    assert received == [(i, [f"{i}:{camera}".encode() for camera in range(4)]) for i in range(3)]
+    stats = sender.stats.report()
+    assert stats["items"] == 12
+    assert stats["batches"] == 4
+    assert stats["acked"] == 4
+
+
+def test_frame_set_assembler_bounds_partial_sets():
+    completed = []
+    assembler = FrameSetAssembler(2, lambda frame_set_id, frames: completed.append(frame_set_id), max_pending=2)
+    for frame_set_id in range(4):
+        assembler.add(0, frame_set_id, b"")
+    assembler.add(1, 3, b"")
+    assembler.add(1, 0, b"")
+
+    assert completed == [3]
+    assert assembler.dropped == 2
@@ -0,0 +1,47 @@
+import queue
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from depth_format import DepthFrame, save_depth_frame
+from depth_watcher import DepthMapWatcher
+from manifest import FrameSetManifest
+
+
+def write_depth_map(folder, camera, timestamp):
+    # Filenames only need the extension; camera and timestamp come from the header
+    path = folder / f"depth_map_{camera}_{int(timestamp * 1e6)}.d16"
+    save_depth_frame(str(path), DepthFrame(np.ones((2, 3), dtype=np.uint16), camera, timestamp))
+    return str(path)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_reports_complete_sets(tmp_path, use_inotify):
+    folder = tmp_path / "depth_maps"
+    folder.mkdir()
+    manifest = FrameSetManifest(str(tmp_path / "manifest.jsonl"), frames_per_set=2, tolerance_ms=5.0)
+    frame_sets = queue.Queue()
+    # Written before start: picked up by the initial scan
+    existing = [write_depth_map(folder, camera, 5.0) for camera in range(2)]
+    watcher = DepthMapWatcher(str(folder), manifest, lambda record: frame_sets.put(record.sorted_paths()),
+                              poll_interval=0.05, use_inotify=use_inotify)
+    watcher.start()
+    try:
+        assert frame_sets.get(timeout=5) == existing
+
+        second = write_depth_map(folder, 1, 7.002)
+        (folder / "notes.txt").write_text("ignored")
+        first = write_depth_map(folder, 0, 7.0)
+
+        assert frame_sets.get(timeout=5) == [first, second]
+        assert frame_sets.empty()
+        assert manifest.latest_complete().timestamp == pytest.approx(7.0, abs=0.005)
+    finally:
+        watcher.stop()
+        manifest.close()
@@ -0,0 +1,157 @@
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from frame_broadcast import FrameBroadcast
+from pipeline import StageSpec, build_pipeline
+
+
+def make_frames(value):
+    return [np.full((4, 6, 3), value, dtype=np.uint8) for _ in range(2)]
+
+
+def test_every_subscriber_gets_the_same_read_only_set():
+    broadcast = FrameBroadcast(history=1)
+    depth = broadcast.subscribe("depth", maxsize=2)
+    preview = broadcast.subscribe("preview", maxsize=2)
+    frames = make_frames(7)
+
+    frame_set_id = broadcast.publish(frames, timestamp=1.5)
+
+    received = [depth.get(timeout=1), preview.get(timeout=1)]
+    assert all(frame_set.frame_set_id == frame_set_id for frame_set in received)
+    assert all(frame_set.frames is frames and frame_set.timestamp == 1.5 for frame_set in received)
+    assert not frames[0].flags.writeable
+    with pytest.raises(ValueError):
+        received[0].frames[0][0, 0, 0] = 1
+
+
+def test_sets_are_freed_after_history_and_subscribers_let_go():
+    freed = []
+    broadcast = FrameBroadcast(history=2, on_free=lambda frame_set_id, frames: freed.append(frame_set_id))
+    depth = broadcast.subscribe("depth", maxsize=8)
+
+    ids = [broadcast.publish(make_frames(value)) for value in range(3)]
+    # The first set has left the history but depth still holds it
+    assert freed == []
+    first = broadcast.acquire(ids[0])
+    assert first.frame_set_id == ids[0]
+    for _ in range(3):
+        depth.done(depth.get(timeout=1))
+    with first:
+        assert freed == []
+    # Releasing a reference twice does not take another one's
+    first.release()
+
+    assert freed == [ids[0]]
+    assert first.frames is None
+    assert broadcast.acquire(ids[0]) is None
+    broadcast.acquire(ids[2]).release()
+    stats = broadcast.get_stats()
+    assert (stats["published"], stats["freed"], stats["live"], stats["lookup_misses"]) == (3, 1, 2, 1)
+
+
+def test_sets_dropped_by_a_slow_subscriber_are_released():
+    freed = []
+    broadcast = FrameBroadcast(history=1, on_free=lambda frame_set_id, frames: freed.append(frame_set_id))
+    broadcast.subscribe("preview", maxsize=1, policy="keep_latest")
+
+    ids = [broadcast.publish(make_frames(value)) for value in range(4)]
+
+    assert freed == ids[:3]
+    assert broadcast.get_stats()["subscribers"]["preview"]["dropped"] == 3
+
+
+def test_pipeline_stage_reads_a_subscription_and_releases_each_set():
+    freed = []
+    broadcast = FrameBroadcast(history=1, on_free=lambda frame_set_id, frames: freed.append(frame_set_id))
+    done = threading.Event()
+    ids = []
+
+    def sink(frame_set_id):
+        ids.append(frame_set_id)
+        if len(ids) == 5:
+            done.set()
+
+    stages = [
+        StageSpec("ids", lambda frame_set: frame_set.frame_set_id,
+                  input=broadcast.subscribe("ids", maxsize=8)),
+        StageSpec("sink", sink, input="ids", maxsize=8),
+    ]
+    pipeline = build_pipeline(stages)
+    pipeline.start()
+    try:
+        for value in range(5):
+            broadcast.publish(make_frames(value))
+        assert done.wait(10)
+    finally:
+        pipeline.stop()
+
+    assert ids == list(range(5))
+    # Only the newest set is still held, by the history
+    assert sorted(freed) == list(range(4))
+    assert pipeline.get_stats()["ids"]["queue"]["got"] == 5
+
+
+def test_a_slow_model_stage_keeps_the_sets_it_was_handed():
+    # As in depth_mapping.py: depth hands its own reference on with the
+    # result, and the model stage takes longer than history x capture period
+    broadcast = FrameBroadcast(history=2)
+    published = []
+    built = []
+    finished = threading.Event()
+
+    def capture():
+        if len(published) < 20:
+            published.append(broadcast.publish(make_frames(len(published))))
+        time.sleep(0.01)
+
+    def depth(frame_set):
+        return frame_set.acquire(), frame_set.frames[0][0, 0, 0]
+
+    def model(depth_set):
+        frame_set, value = depth_set
+        with frame_set:
+            time.sleep(0.1)
+            # Still the images the depth stage saw, long after they left the history
+            built.append((frame_set.frame_set_id, int(frame_set.frames[0][0, 0, 0]), int(value)))
+        if len(built) == 3:
+            finished.set()
+
+    stages = [
+        StageSpec("capture", capture),
+        StageSpec("depth", depth, input=broadcast.subscribe("depth", maxsize=2, policy="keep_latest")),
+        StageSpec("model", model, input="depth", maxsize=1, policy="drop_oldest",
+                  on_drop=lambda depth_set: depth_set[0].release()),
+    ]
+    pipeline = build_pipeline(stages)
+    pipeline.start()
+    try:
+        assert finished.wait(10)
+    finally:
+        pipeline.stop()
+
+    assert all(frame_set_id == value == seen for frame_set_id, value, seen in built)
+    # The model queue dropped results, each carrying a reference
+    assert pipeline.get_stats()["model"]["queue"]["dropped"] > 0
+    stats = broadcast.get_stats()
+    # Dropped, drained and finished sets were all released; only the history remains
+    assert stats["live"] == 2
+    assert stats["freed"] == len(published) - 2
+
+
+def test_references_do_not_cross_processes():
+    broadcast = FrameBroadcast()
+    broadcast.subscribe("depth")
+    broadcast.publish(make_frames(1))
+    with pytest.raises(TypeError):
+        pickle.dumps(broadcast.acquire(0))
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from frame_buffer import FrameRingBuffer
+
+
+def test_ring_buffer_reuses_slots_and_returns_read_only_views():
+    buffer = FrameRingBuffer(depth=3)
+    buffer.allocate((2, 2, 3))
+    slot_ids = {id(slot) for slot in buffer.slots}
+
+    for value in range(5):
+        buffer.write_slot()[...] = value
+        buffer.commit(timestamp=float(value))
+
+    assert {id(slot) for slot in buffer.slots} == slot_ids
+    sequence, timestamp, frame = buffer.latest()
+    assert sequence == 4 and timestamp == 4.0
+    assert frame[0, 0, 0] == 4
+    assert not frame.flags.writeable
+    assert np.shares_memory(frame, buffer.slots[4 % 3])
+
+    assert buffer.latest(1)[2][0, 0, 0] == 3
+    with pytest.raises(IndexError):
+        buffer.latest(2)
+
+
+def test_ring_buffer_get_returns_none_for_recycled_sequences():
+    buffer = FrameRingBuffer(depth=3)
+    assert buffer.latest() is None
+    buffer.allocate((1,))
+    for value in range(4):
+        buffer.write_slot()[...] = value
+        buffer.commit()
+
+    assert buffer.get(3)[1][0] == 3
+    assert buffer.get(2)[1][0] == 2
+    assert buffer.get(1) is None
+    assert buffer.get(4) is None
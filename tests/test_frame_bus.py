@@ -0,0 +1,88 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from camera_capture import make_camera_capture
+from frame_bus import BusCapture, FrameBus
+
+
+def test_frame_bus_recycles_only_unreferenced_slots():
+    bus = FrameBus.create(1, (2, 2), slots=3)
+    try:
+        assert bus.publish(0, np.full((2, 2), 1)) == 0
+        pinned = bus.acquire(0)
+        assert pinned.frame[0, 0] == 1
+        assert not pinned.frame.flags.writeable
+
+        # The pinned slot survives any number of later publishes
+        for value in range(2, 8):
+            bus.publish(0, np.full((2, 2), value))
+        assert pinned.frame[0, 0] == 1
+
+        latest = bus.acquire(0, after=pinned.sequence)
+        assert latest.frame[0, 0] == 7
+        assert bus.publish(0, np.full((2, 2), 8)) == 7
+        assert bus.publish(0, np.full((2, 2), 9)) == -1
+        assert bus.dropped(0) == 1
+
+        pinned.release()
+        latest.release()
+        assert bus.publish(0, np.full((2, 2), 10)) == 8
+        assert bus.acquire(0, after=8, timeout=0) is None
+    finally:
+        bus.close()
+
+
+
+def test_wait_for_new_wakes_only_for_unseen_frames():
+    bus = FrameBus.create(2, (2, 2), slots=3)
+    try:
+        assert not bus.wait_for_new({}, timeout=0)
+        sequence = bus.publish(1, np.zeros((2, 2)))
+        assert bus.wait_for_new({}, timeout=0)
+        assert not bus.wait_for_new({1: sequence}, timeout=0.01)
+        bus.publish(0, np.zeros((2, 2)))
+        assert bus.wait_for_new({1: sequence}, timeout=0)
+    finally:
+        bus.close()
+
+
+def test_bus_capture_streams_replayed_cameras_from_their_own_processes(tmp_path):
+    for camera in range(2):
+        directory = tmp_path / f"cam{camera}"
+        directory.mkdir()
+        for index in range(3):
+            cv2.imwrite(str(directory / f"{index:06d}.png"), np.full((4, 6, 3), 10 * camera + index, dtype=np.uint8))
+    capture_config = {"source": "replay", "replay_path": str(tmp_path), "replay_speed": 0, "replay_loop": True,
+                      "frame_bus": True, "frame_shape": [4, 6, 3], "frame_bus_slots": 3}
+    capture = make_camera_capture([0, 1], capture_config)
+    assert isinstance(capture, BusCapture)
+
+    capture.start_capture()
+    try:
+        deadline = time.monotonic() + 10
+        frames = {}
+        while len(frames) < 2 and time.monotonic() < deadline:
+            frames = capture.get_frames()
+            time.sleep(0.01)
+        assert sorted(frames) == [0, 1]
+        assert all(not frame.flags.writeable for frame in frames.values())
+        assert int(frames[0][0, 0, 0]) in (0, 1, 2) and int(frames[1][0, 0, 0]) in (10, 11, 12)
+        assert all(process.pid != capture.processes[0].pid for process in capture.processes[1:])
+
+        # Every call hands back something newer than what the caller has seen
+        sequences, frames = capture.get_new_frames({}, timeout=5)
+        newer, frames = capture.get_new_frames(sequences, timeout=5)
+        assert sorted(frames) == [0, 1]
+        assert any(newer[index] > sequences[index] for index in (0, 1))
+    finally:
+        capture.stop_capture()
+    assert capture.processes == [] and capture.bus is None
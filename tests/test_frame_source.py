@@ -0,0 +1,102 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from camera_capture import CameraCapture
+from frame_source import ReplayClock, ReplaySource, make_source_factory
+from frame_sync import SynchronizedCapture
+
+
+def write_session(session, cameras=2, frames=3):
+    for camera in range(cameras):
+        directory = session / f"cam{camera}"
+        directory.mkdir(parents=True)
+        for index in range(frames):
+            cv2.imwrite(str(directory / f"{index:06d}.png"), np.full((4, 6, 3), index, dtype=np.uint8))
+        (directory / "timestamps.txt").write_text("".join(f"{index * 0.5}\n" for index in range(frames)))
+
+
+def test_replay_source_reads_image_directories_in_order(tmp_path):
+    write_session(tmp_path)
+    source = ReplaySource(str(tmp_path / "cam0"), ReplayClock(speed=0))
+    buffer = np.zeros((4, 6, 3), dtype=np.uint8)
+
+    values = []
+    while True:
+        ret, frame = source.read(buffer)
+        if not ret:
+            break
+        assert frame is buffer
+        values.append((int(frame[0, 0, 0]), source.timestamp()))
+
+    assert values == [(0, 0.0), (1, 0.5), (2, 1.0)]
+
+
+def test_replay_factory_loops_with_increasing_timestamps(tmp_path):
+    write_session(tmp_path)
+    open_source = make_source_factory({
+        "source": "replay",
+        "replay_path": str(tmp_path),
+        "replay_speed": 0,
+        "replay_loop": True,
+        "replay_fps": 2.0,
+    })
+    source = open_source(1)
+    assert source.isOpened()
+
+    stamps = []
+    for _ in range(5):
+        assert source.grab()
+        stamps.append(source.timestamp())
+
+    assert stamps == [0.0, 0.5, 1.0, 1.5, 2.0]
+    with pytest.raises(RuntimeError):
+        open_source(7)
+
+
+def test_extra_timestamp_lines_stop_at_the_last_image(tmp_path):
+    write_session(tmp_path, cameras=1)
+    (tmp_path / "cam0" / "timestamps.txt").write_text("0.0\n0.5\n1.0\n1.5\n2.0\n")
+    source = ReplaySource(str(tmp_path / "cam0"), ReplayClock(speed=0))
+
+    frames = 0
+    while source.read()[0]:
+        frames += 1
+
+    assert frames == 3
+
+
+def test_a_non_looping_replay_ends_the_capture_threads(tmp_path):
+    write_session(tmp_path, cameras=2, frames=3)
+    capture_config = {"source": "replay", "replay_path": str(tmp_path), "replay_speed": 0}
+
+    synchronized = SynchronizedCapture([0, 1], max_skew_ms=1000.0, open_source=make_source_factory(capture_config))
+    synchronized.start_capture()
+    thread = synchronized.capture_thread
+    thread.join(5)
+    assert not thread.is_alive()
+    assert synchronized.ended
+    # Consumers see the end of the stream at once instead of waiting on it
+    last = synchronized.get_frame_set(timeout=0).sequence
+    assert synchronized.get_frame_set(after=last, timeout=10) is None
+    synchronized.stop_capture()
+
+    threaded = CameraCapture([0, 1], open_source=make_source_factory(capture_config))
+    threaded.start_capture()
+    for thread in threaded.capture_threads:
+        thread.join(5)
+        assert not thread.is_alive()
+    assert threaded.ended
+    assert [int(threaded.get_frame(index)[0, 0, 0]) for index in (0, 1)] == [2, 2]
+    # The last frames are handed out once; nothing newer ever arrives
+    sequences, frames = threaded.get_new_frames({}, timeout=0)
+    assert sequences == {0: 2, 1: 2} and sorted(frames) == [0, 1]
+    assert threaded.get_new_frames(sequences, timeout=0.05) is None
+    threaded.stop_capture()
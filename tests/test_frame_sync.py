@@ -0,0 +1,93 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+import frame_sync
+
+
+class FakeCamera:
+    def __init__(self, index, grab_delays=()):
+        self.index = index
+        self.grab_delays = list(grab_delays)
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        if self.grab_delays:
+            time.sleep(self.grab_delays.pop(0))
+        return True
+
+    def retrieve(self, image=None):
+        frame = np.full((2, 2, 3), self.index, dtype=np.uint8)
+        if image is not None:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def test_synchronized_capture_drops_sets_above_skew_bound(monkeypatch):
+    cameras = {0: FakeCamera(0), 1: FakeCamera(1, grab_delays=[0.05, 0.05])}
+    monkeypatch.setattr(frame_sync.cv2, "VideoCapture", lambda index: cameras[index])
+    capture = frame_sync.SynchronizedCapture([0, 1], max_skew_ms=20.0)
+
+    capture.start_capture()
+    try:
+        frame_set = capture.get_frame_set(timeout=2.0)
+    finally:
+        capture.stop_capture()
+
+    assert frame_set is not None
+    assert frame_set.skew <= 0.02
+    assert [frame[0, 0, 0] for frame in frame_set.frames] == [0, 1]
+    assert not frame_set.frames[0].flags.writeable
+
+    report = capture.get_skew_stats()
+    assert report["rejected"] == 2
+    assert report["accepted"] >= 1
+    assert report["max_skew_ms"] >= 50.0
+
+
+class CountingCamera(FakeCamera):
+    # Every retrieve decodes a new value, like a live camera
+    def __init__(self, index):
+        super().__init__(index)
+        self.count = 0
+
+    def retrieve(self, image=None):
+        self.count += 1
+        frame = np.full((2, 2, 3), self.count % 256, dtype=np.uint8)
+        if image is not None:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+
+def test_frame_sets_survive_a_slow_consumer(monkeypatch):
+    cameras = {0: CountingCamera(0), 1: CountingCamera(1)}
+    monkeypatch.setattr(frame_sync.cv2, "VideoCapture", lambda index: cameras[index])
+    capture = frame_sync.SynchronizedCapture([0, 1], max_skew_ms=50.0, buffer_depth=2)
+
+    capture.start_capture()
+    try:
+        frame_set = capture.get_frame_set(timeout=2.0)
+        values = [int(frame[0, 0, 0]) for frame in frame_set.frames]
+        # Well past depth - 1 further captures
+        later = capture.get_frame_set(after=frame_set.sequence + 10, timeout=2.0)
+    finally:
+        capture.stop_capture()
+
+    assert later is not None
+    assert [int(frame[0, 0, 0]) for frame in frame_set.frames] == values
+    assert capture.get_frame_set(after=-1) is capture.get_frame_set(after=-1)
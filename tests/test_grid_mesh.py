@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from depth_format import DepthFrame
+from grid_mesh import grid_mesh, merge_meshes
+
+
+def make_frame(depth):
+    return DepthFrame(np.asarray(depth, dtype=np.uint16), 0, 0.0, 1.0, 100.0, 100.0, 1.5, 1.5)
+
+
+def test_plane_is_fully_triangulated_facing_the_camera():
+    vertices, normals, triangles = grid_mesh(make_frame(np.full((4, 4), 2000)))
+
+    assert len(vertices) == 16 and len(triangles) == 2 * 3 * 3
+    np.testing.assert_allclose(vertices[:, 2], 2.0)
+    np.testing.assert_allclose(normals, np.tile([0.0, 0.0, -1.0], (16, 1)), atol=1e-6)
+    # Winding agrees with the gradient normals
+    a, b, c = (vertices[triangles[:, k]] for k in range(3))
+    assert (np.cross(b - a, c - a)[:, 2] < 0).all()
+
+
+def test_depth_jumps_and_holes_are_not_bridged():
+    depth = np.full((3, 4), 1000)
+    depth[:, 2:] = 3000  # occlusion edge between columns 1 and 2
+    depth[0, 0] = 0
+
+    vertices, normals, triangles = grid_mesh(make_frame(depth))
+
+    # Left strip loses the triangle touching the hole, right strip is intact
+    assert len(triangles) == 3 + 4
+    assert len(vertices) == 5 + 6
+    for triangle in vertices[triangles]:
+        assert np.ptp(triangle[:, 2]) == 0
+
+    merged_vertices, _, merged_triangles = merge_meshes([(vertices, normals, triangles)] * 2)
+    assert len(merged_vertices) == 22
+    assert merged_triangles.max() == 21 and merged_triangles[7:].min() == 11
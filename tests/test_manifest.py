@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from manifest import FrameSetManifest
+
+
+def test_joins_nearest_set_within_tolerance(tmp_path):
+    manifest = FrameSetManifest(str(tmp_path / "manifest.jsonl"), frames_per_set=2, tolerance_ms=10.0)
+
+    assert manifest.add(0, 100.000, "a0") is None
+    assert manifest.add(0, 100.004, "b0") is None  # same camera again: a new set
+    assert manifest.add(1, 100.050, "c1") is None  # outside tolerance of both
+    record = manifest.add(1, 100.003, "b1")  # nearest is the set started by b0
+
+    assert record.sorted_paths() == ["b0", "b1"]
+    assert manifest.latest_complete() is record
+    assert manifest.pending() == 2
+    manifest.close()
+
+
+def test_consume_drops_older_sets_and_survives_restart(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = FrameSetManifest(path, frames_per_set=2, tolerance_ms=5.0, compact_after=4)
+    manifest.add(0, 1.0, "old0")
+    for camera in range(2):
+        manifest.add(camera, 2.0, f"first{camera}")
+        manifest.add(camera, 3.0, f"second{camera}")
+    manifest.add(0, 4.0, "next0")
+
+    latest = manifest.latest_complete()
+    assert latest.sorted_paths() == ["second0", "second1"]
+    assert sorted(manifest.consume(latest.frame_set_id)) == ["first0", "first1", "old0", "second0", "second1"]
+    assert manifest.latest_complete() is None
+    manifest.close()
+
+    # The consume pushed the log past compact_after, so only the open set is left
+    assert len(Path(path).read_text().splitlines()) == 2
+    reopened = FrameSetManifest(path, frames_per_set=2, tolerance_ms=5.0)
+    record = reopened.add(1, 4.001, "next1")
+    assert record.sorted_paths() == ["next0", "next1"]
+    assert record.frame_set_id > latest.frame_set_id
+    reopened.close()
+
+
+def test_open_sets_older_than_the_newest_complete_set_expire(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = FrameSetManifest(path, frames_per_set=2, tolerance_ms=5.0)
+    for camera in range(2):
+        manifest.add(camera, 1.0, f"built{camera}")
+    built = manifest.latest_complete()
+    # Camera 1's file for 2.0 and 3.0 was lost while the build ran
+    manifest.add(0, 2.0, "lost2")
+    manifest.add(0, 3.0, "lost3")
+    for camera in range(2):
+        manifest.add(camera, 4.0, f"newer{camera}")
+    manifest.add(0, 5.0, "open5")
+    assert manifest.pending() == 3
+
+    assert sorted(manifest.consume(built.frame_set_id)) == ["built0", "built1", "lost2", "lost3"]
+    # The set still being filled after the newest complete one stays open
+    assert manifest.pending() == 1
+    assert manifest.latest_complete().sorted_paths() == ["newer0", "newer1"]
+    manifest.close()
+
+    reopened = FrameSetManifest(path, frames_per_set=2, tolerance_ms=5.0)
+    assert reopened.pending() == 1
+    assert reopened.latest_complete().sorted_paths() == ["newer0", "newer1"]
+    reopened.close()
@@ -0,0 +1,27 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+o3d = pytest.importorskip("open3d", exc_type=ImportError)
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from mesh_lod import export_lods
+
+
+def test_lod_chain_and_manifest(tmp_path):
+    mesh = o3d.geometry.TriangleMesh.create_sphere(radius=1.0, resolution=40)
+    full_triangles = len(mesh.triangles)
+
+    manifest = export_lods(mesh, str(tmp_path), "3d_model_1", budgets=[500, 2000, full_triangles * 2])
+
+    triangles = [level["triangles"] for level in manifest["levels"]]
+    assert triangles[0] == full_triangles
+    assert triangles[1] <= 2000 and triangles[2] <= 500
+    assert manifest["full"] == "3d_model_1.ply" and manifest["preview"] == "3d_model_1_lod2.ply"
+    for level in manifest["levels"]:
+        assert (tmp_path / level["file"]).stat().st_size == level["bytes"]
+    assert json.loads((tmp_path / "latest.json").read_text()) == manifest
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from parallel_depth import ParallelDepthStage
+from rectification import RectificationEngine
+from stereo_matchers import MatcherPool
+
+CALIBRATION = {
+    "camera_params": [
+        {"camera_matrix": [[60.0, 0, 40.0], [0, 60.0, 30.0], [0, 0, 1]], "distortion_coeffs": [[-0.1, 0, 0, 0, 0]]}
+        for _ in range(4)
+    ],
+}
+
+
+def test_parallel_stage_matches_serial_results_in_order():
+    rng = np.random.default_rng(3)
+    frame_sets = [[cv2.GaussianBlur(rng.integers(0, 255, (60, 80), dtype=np.uint8), (3, 3), 0) for _ in range(4)]
+                  for _ in range(5)]
+
+    rectifier = RectificationEngine(CALIBRATION)
+    matchers = MatcherPool(pair_count=4)
+    expected = [[matchers.compute(pair, left, right).copy()
+                 for pair, (left, right) in enumerate(rectifier.rectify_frame_set(frames))]
+                for frames in frame_sets]
+
+    stage = ParallelDepthStage(CALIBRATION, executor="thread", workers=4, max_in_flight=2)
+    results = []
+    for tag, frames in enumerate(frame_sets):
+        for done_tag, disparities in stage.submit(frames, tag):
+            # Results are only valid until their slot comes round again
+            results.append((done_tag, [disparity.copy() for disparity in disparities]))
+        assert len(stage.in_flight) <= 2
+    results.extend(stage.drain())
+    stage.close()
+
+    assert [tag for tag, _ in results] == list(range(5))
+    for (_, disparities), serial in zip(results, expected):
+        for disparity, reference in zip(disparities, serial):
+            np.testing.assert_array_equal(disparity, reference)
+    assert stage.get_stats()["frame_sets"] == 5
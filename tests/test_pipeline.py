@@ -0,0 +1,180 @@
+import operator
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from pipeline import Pipeline, StageSpec, build_pipeline
+from stage_queue import StageQueue
+
+
+def counting_source(count):
+    items = iter(range(count))
+
+    def source():
+        item = next(items, None)
+        if item is None:
+            time.sleep(0.01)
+        return item
+    return source
+
+
+def collector(count):
+    collected = []
+    done = threading.Event()
+
+    def sink(item):
+        collected.append(item)
+        if len(collected) == count:
+            done.set()
+    return collected, done, sink
+
+
+def run_until(pipeline, *events):
+    pipeline.start()
+    try:
+        for done in events:
+            assert done.wait(10)
+    finally:
+        pipeline.stop()
+
+
+def test_items_flow_through_every_stage_and_fan_out():
+    doubled, doubled_done, doubled_sink = collector(20)
+    raw, raw_done, raw_sink = collector(20)
+    stages = [
+        StageSpec("source", counting_source(20)),
+        StageSpec("double", lambda item: 2 * item, input="source", workers=2, maxsize=4),
+        StageSpec("store", doubled_sink, input="double", maxsize=4),
+        StageSpec("audit", raw_sink, input="source", maxsize=4),
+    ]
+    pipeline = build_pipeline(stages)
+    run_until(pipeline, doubled_done, raw_done)
+
+    assert sorted(doubled) == [2 * item for item in range(20)]
+    assert raw == list(range(20))
+    stats = pipeline.get_stats()
+    assert stats["double"]["items"] == 20
+    assert stats["double"]["queue"]["dropped"] == 0
+    assert "queue" not in stats["source"]
+
+
+def test_errors_are_counted_and_none_results_dropped():
+    kept, done, sink = collector(5)
+
+    def odd_only(item):
+        if item == 3:
+            raise ValueError("bad frame")
+        return item if item % 2 else None
+
+    stages = [
+        StageSpec("source", counting_source(12)),
+        StageSpec("filter", odd_only, input="source", maxsize=12),
+        StageSpec("sink", sink, input="filter"),
+    ]
+    pipeline = build_pipeline(stages)
+    run_until(pipeline, done)
+
+    assert kept == [1, 5, 7, 9, 11]
+    assert pipeline.get_stats()["filter"]["errors"] == 1
+
+
+def test_a_failing_source_backs_off():
+    calls = []
+
+    def broken_camera():
+        calls.append(time.perf_counter())
+        raise OSError("camera unplugged")
+
+    pipeline = Pipeline([StageSpec("source", broken_camera)], poll_interval=0.05)
+    pipeline.start()
+    time.sleep(0.3)
+    pipeline.stop()
+
+    # One attempt per poll interval, not a busy loop
+    assert 2 <= len(calls) <= 8
+    assert pipeline.get_stats()["source"]["errors"] == len(calls)
+
+
+class TrackedInput(StageQueue):
+    # An external input that records which items it was told are done
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.finished = []
+
+    def done(self, item):
+        self.finished.append(item)
+
+
+def test_stop_hands_back_items_still_queued_on_external_inputs():
+    external = TrackedInput(10)
+    for item in range(6):
+        external.put(item)
+    started = threading.Event()
+
+    def slow(item):
+        started.set()
+        time.sleep(0.1)
+
+    pipeline = Pipeline([StageSpec("slow", slow, input=external)], poll_interval=0.01)
+    pipeline.start()
+    assert started.wait(5)
+    pipeline.stop()
+
+    # Each item was either processed or drained, and done() ran exactly once for it
+    assert sorted(external.finished) == list(range(6))
+    assert external.qsize() == 0
+    # The queue is closed, so later deliveries are turned away
+    assert not external.put(6)
+
+
+
+def test_stop_leaves_the_queue_of_a_stage_still_running_alone():
+    external = TrackedInput(10)
+    for item in range(3):
+        external.put(item)
+    started = threading.Event()
+    release = threading.Event()
+
+    def stuck(item):
+        started.set()
+        release.wait(10)
+
+    pipeline = Pipeline([StageSpec("stuck", stuck, input=external)], poll_interval=0.01)
+    pipeline.start()
+    assert started.wait(5)
+    pipeline.stop(timeout=0.05)
+
+    # The worker outlived the timeout, so nothing was drained behind its back
+    assert external.finished == []
+    assert external.qsize() == 2
+    release.set()
+    deadline = time.monotonic() + 5
+    while external.finished != [0] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert external.finished == [0]
+
+
+def test_config_overrides_and_process_executor():
+    results, done, sink = collector(6)
+    stages = [
+        StageSpec("source", counting_source(6)),
+        StageSpec("negate", operator.neg, input="source"),
+        StageSpec("sink", sink, input="negate"),
+    ]
+    pipeline = build_pipeline(stages, {"negate": {"executor": "process", "workers": 2, "maxsize": 6}})
+    assert stages[1].executor == "process"
+    assert stages[1].workers == 2
+    run_until(pipeline, done)
+
+    assert sorted(results) == sorted(-item for item in range(6))
+
+
+def test_unknown_input_is_rejected():
+    with pytest.raises(ValueError):
+        build_pipeline([StageSpec("sink", print, input="missing")])
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from point_reduction import PointReducer, dedup_views, voxel_downsample
+
+
+def test_voxel_downsample_keeps_centroids():
+    points = np.array([[0.001, 0.001, 0.001], [0.003, 0.005, 0.007], [0.5, 0.5, 0.5]], dtype=np.float32)
+
+    reduced = voxel_downsample(points, 0.01)
+
+    assert reduced.dtype == np.float32
+    np.testing.assert_allclose(sorted(reduced.tolist()), [[0.002, 0.003, 0.004], [0.5, 0.5, 0.5]], atol=1e-6)
+
+
+def test_dedup_drops_overlap_from_later_views():
+    first = np.array([[0.0, 0.0, 1.0], [0.1, 0.0, 1.0]], dtype=np.float32)
+    second = np.array([[0.0001, 0.0, 1.0], [0.3, 0.0, 1.0]], dtype=np.float32)
+
+    np.testing.assert_array_equal(dedup_views([first, second], 0.005), np.vstack([first, second[1:]]))
+
+
+def test_reducer_reports_each_step_and_caps_points():
+    rng = np.random.default_rng(0)
+    view = rng.random((5000, 3), dtype=np.float32)
+    reducer = PointReducer({"voxel_size": 0.05, "outliers": "none", "max_points": 100})
+
+    points = reducer.reduce([view, view])
+
+    assert len(points) == 100
+    stats = reducer.get_stats()
+    assert [step["step"] for step in stats] == ["dedup", "voxel", "cap"]
+    assert stats[0]["points_in"] == 10000 and stats[0]["points_out"] == 5000
+    assert stats[1]["points_in"] == 5000 and stats[2]["points_out"] == 100
@@ -0,0 +1,66 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from point_reduction import VoxelAccumulator, voxel_downsample
+from point_store import PointStore
+
+
+def test_appends_are_bucketed_and_survive_reopening(tmp_path):
+    root = str(tmp_path / "points")
+    store = PointStore(root, bucket_size=1.0)
+    store.append(np.array([[0.5, 0.5, 0.5], [1.5, 0.5, 0.5], [-0.5, 0.2, 0.1]], dtype=np.float32))
+    store.append(np.array([[0.25, 0.75, 0.5]], dtype=np.float32))
+
+    # An append that wrote rows but never updated the index is discarded on open
+    with open(store.bucket_path((0, 0, 0)), "ab") as file:
+        file.write(np.zeros((5, 3), dtype=np.float32).tobytes())
+    reopened = PointStore(root, bucket_size=99.0)
+
+    assert reopened.bucket_size == 1.0
+    assert reopened.keys() == [(-1, 0, 0), (0, 0, 0), (1, 0, 0)]
+    assert reopened.total_points() == 4
+    np.testing.assert_array_equal(reopened.load((0, 0, 0)), [[0.5, 0.5, 0.5], [0.25, 0.75, 0.5]])
+    assert os.path.getsize(reopened.bucket_path((0, 0, 0))) == 2 * 12
+
+
+def test_gather_includes_margin_and_streams_downsampled(tmp_path):
+    store = PointStore(str(tmp_path), bucket_size=1.0)
+    store.append(np.array([[0.5, 0.5, 0.5], [1.05, 0.5, 0.5], [1.5, 0.5, 0.5]], dtype=np.float32))
+
+    gathered = store.gather((0, 0, 0), margin=0.1)
+    np.testing.assert_array_equal(sorted(gathered[:, 0].tolist()), np.float32([0.5, 1.05]))
+
+    rng = np.random.default_rng(0)
+    points = rng.random((20000, 3), dtype=np.float32)
+    store.append(points + np.float32(4.0))
+    streamed = store.gather((4, 4, 4), voxel_size=0.1, chunk_points=1000)
+    expected = voxel_downsample(points + np.float32(4.0), 0.1)
+    np.testing.assert_allclose(sorted(streamed.tolist()), sorted(expected.tolist()), atol=1e-5)
+
+    accumulator = VoxelAccumulator(0.5)
+    accumulator.add(np.zeros((0, 3), dtype=np.float32))
+    accumulator.add(np.float32([[0.1, 0.1, 0.1]]))
+    accumulator.add(np.float32([[0.3, 0.3, 0.3], [0.9, 0.9, 0.9]]))
+    np.testing.assert_allclose(sorted(accumulator.centroids().tolist()), [[0.2, 0.2, 0.2], [0.9, 0.9, 0.9]])
+
+
+def test_a_missing_bucket_file_counts_as_empty(tmp_path):
+    root = str(tmp_path / "points")
+    store = PointStore(root, bucket_size=1.0)
+    store.append(np.array([[0.5, 0.5, 0.5], [1.5, 0.5, 0.5]], dtype=np.float32))
+    os.remove(store.bucket_path((1, 0, 0)))
+
+    reopened = PointStore(root)
+
+    assert reopened.keys() == [(0, 0, 0)]
+    assert reopened.total_points() == 1
+    reopened.append(np.array([[1.25, 0.5, 0.5]], dtype=np.float32))
+    np.testing.assert_array_equal(PointStore(root).load((1, 0, 0)), [[1.25, 0.5, 0.5]])
@@ -0,0 +1,136 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from projection import (CUBE_FACES, Cylindrical, Equirectangular, Perspective, ProjectionEngine, make_projection,
+                        reprojection_maps)
+
+
+def reference_projection(frame, fov):
+    height, width = frame.shape[:2]
+    projected_width = int(width * np.radians(fov) / (2 * np.pi))
+    projected = np.zeros((height, projected_width, 3), dtype=np.uint8)
+    for i in range(projected_width):
+        theta = i * (2 * np.pi) / projected_width
+        for j in range(height):
+            x = int(width // 2 + (j - height // 2) * np.sin(theta))
+            y = int(height // 2 + (j - height // 2) * np.cos(theta))
+            if 0 <= x < width and 0 <= y < height:
+                projected[j, i] = frame[y, x]
+    return projected
+
+
+@pytest.mark.parametrize("shape, fov", [((61, 130, 3), 120), ((80, 160, 3), 90), ((45, 50, 3), 360)])
+def test_nearest_remap_matches_the_per_pixel_loop(shape, fov):
+    frame = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+    projected = ProjectionEngine().cylindrical(frame, fov)
+
+    np.testing.assert_array_equal(projected, reference_projection(frame, fov))
+
+
+def test_linear_interpolation_keeps_the_output_geometry():
+    frame = np.full((60, 120, 3), 200, dtype=np.uint8)
+    engine = ProjectionEngine()
+
+    nearest = engine.cylindrical(frame, 120)
+    linear = engine.cylindrical(frame, 120, interpolation=cv2.INTER_LINEAR)
+
+    assert linear.shape == nearest.shape
+    # Row centre_y samples the frame centre in every column
+    assert (linear[30] == 200).all()
+
+
+def test_maps_are_cached_with_lru_eviction():
+    engine = ProjectionEngine(cache_size=2)
+    small = np.zeros((20, 40, 3), dtype=np.uint8)
+    large = np.zeros((40, 80, 3), dtype=np.uint8)
+
+    for frame, fov in [(small, 90), (small, 90), (large, 90), (small, 90), (small, 120), (large, 90)]:
+        engine.cylindrical(frame, fov)
+
+    stats = engine.get_stats()
+    assert (stats["frames"], stats["hits"], stats["misses"]) == (6, 2, 4)
+    assert (stats["cached_maps"], stats["evictions"]) == (2, 2)
+
+
+def gradient_panorama(height=100, width=200):
+    # Red encodes longitude, green latitude
+    panorama = np.zeros((height, width, 3), dtype=np.uint8)
+    panorama[..., 2] = (np.arange(width) * 256 // width)[np.newaxis, :]
+    panorama[..., 1] = (np.arange(height) * 256 // height)[:, np.newaxis]
+    return panorama
+
+
+@pytest.mark.parametrize("projection, size", [
+    (Equirectangular(), (200, 100)),
+    (Cylindrical(360), (200, 80)),
+    (Cylindrical(120, yaw=30), (150, 90)),
+    (Perspective(70, yaw=20, pitch=10), (64, 48)),
+])
+def test_projecting_onto_itself_is_the_identity(projection, size):
+    shape = (size[1], size[0])
+    map_x, map_y = reprojection_maps(projection, shape, projection, shape)
+
+    np.testing.assert_allclose(map_x, np.broadcast_to(np.arange(size[0]), shape), atol=1e-3)
+    np.testing.assert_allclose(map_y, np.broadcast_to(np.arange(size[1])[:, np.newaxis], shape), atol=1e-3)
+
+
+def test_cube_faces_look_where_they_should():
+    panorama = gradient_panorama()
+    faces = ProjectionEngine(interpolation=cv2.INTER_LINEAR).cubemap(panorama, Equirectangular(), 32)
+
+    assert list(faces) == list(CUBE_FACES)
+    centres = {face: image[16, 16].astype(int) for face, image in faces.items()}
+    # Longitude: front at the panorama's middle column, right a quarter turn on
+    for face, column in (("front", 100), ("right", 150), ("left", 50)):
+        assert abs(centres[face][2] - panorama[50, column, 2]) <= 2
+    # The back face straddles the seam, where longitude wraps
+    assert min(centres["back"][2], 256 - centres["back"][2]) <= 3
+    assert centres["up"][1] <= 3 and centres["down"][1] >= 250
+
+
+def test_batched_viewports_match_single_frames():
+    panorama = gradient_panorama()
+    batch = np.stack([panorama, panorama[::-1].copy(), 255 - panorama])
+    engine = ProjectionEngine()
+
+    viewports = engine.viewport(batch, Equirectangular(), 90, 45, -20, (40, 30))
+
+    assert viewports.shape == (3, 30, 40, 3)
+    for frame, viewport in zip(batch, viewports):
+        np.testing.assert_array_equal(viewport, engine.viewport(frame, Equirectangular(), 90, 45, -20, (40, 30)))
+    stats = engine.get_stats()
+    assert (stats["frames"], stats["misses"]) == (6, 1)
+
+
+def test_grayscale_batches_need_batched():
+    gray = np.random.default_rng(0).integers(0, 256, (3, 64, 128), dtype=np.uint8)
+    engine = ProjectionEngine()
+
+    swept = engine.cylindrical(gray, 120, batched=True)
+    viewports = engine.viewport(gray, Equirectangular(), 90, 10, 0, (40, 30), batched=True)
+
+    # Each frame is projected on its own, keyed on its (64, 128) shape, not the stack's
+    assert swept.shape == (3, 64, 42)
+    assert viewports.shape == (3, 30, 40)
+    for frame, single_swept, viewport in zip(gray, swept, viewports):
+        np.testing.assert_array_equal(single_swept, engine.cylindrical(frame, 120))
+        np.testing.assert_array_equal(viewport, engine.viewport(frame, Equirectangular(), 90, 10, 0, (40, 30)))
+    # A list needs no flag
+    np.testing.assert_array_equal(engine.cylindrical(list(gray), 120), swept)
+
+
+def test_projections_from_request_dicts():
+    viewport = make_projection({"type": "perspective", "fov": 70, "yaw": 30, "pitch": -10})
+    assert viewport.key() == ("perspective", 70.0, 30.0, -10.0)
+    assert make_projection({"type": "cube_face", "face": "up"}).key() == ("perspective", 90.0, 0.0, 90.0)
+    with pytest.raises(ValueError):
+        make_projection({"type": "fisheye"})
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from rectification import RectificationEngine
+
+
+def calibration(cameras=4):
+    return {
+        "camera_params": [
+            {
+                "camera_matrix": [[80.0, 0, 32.0], [0, 80.0, 24.0], [0, 0, 1]],
+                "distortion_coeffs": [[-0.2 + 0.01 * i, 0.05, 0, 0, 0]],
+            }
+            for i in range(cameras)
+        ],
+        "stereo_pairs": [
+            {"left": 3, "right": 0, "rotation": np.eye(3).tolist(), "translation": [-60.0, 0, 0]},
+        ],
+    }
+
+
+def test_remap_tables_match_undistort_and_are_cached_on_disk(tmp_path):
+    rng = np.random.default_rng(1)
+    images = [cv2.GaussianBlur(rng.integers(0, 255, (48, 64), dtype=np.uint8), (7, 7), 0) for _ in range(4)]
+    engine = RectificationEngine(calibration(), cache_dir=str(tmp_path))
+
+    pairs = engine.rectify_frame_set(images)
+    assert len(pairs) == 4
+    # Camera 1 sits in pairs 0 and 1 and is only undistorted once
+    assert pairs[0][1] is pairs[1][0]
+
+    camera_matrix, distortion_coeffs = engine.intrinsics(1)
+    expected = cv2.undistort(images[1], camera_matrix, distortion_coeffs)
+    difference = np.abs(pairs[0][1].astype(int) - expected.astype(int))
+    assert np.median(difference) <= 1
+
+    # One undistort-only table per camera plus the stereo-rectified pair
+    assert len(list(tmp_path.glob("rectify_*.npz"))) == 5
+    reloaded = RectificationEngine(calibration(), cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(reloaded.rectify_frame_set(images)[3][0], pairs[3][0])
@@ -0,0 +1,76 @@
+import queue
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from stage_queue import StageQueue, make_stage_queue
+
+
+def drain(stage_queue):
+    items = []
+    while stage_queue.qsize():
+        items.append(stage_queue.get())
+    return items
+
+
+@pytest.mark.parametrize("policy, expected, accepted, dropped", [
+    ("drop_oldest", [3, 4, 5], [True] * 5, 2),
+    ("drop_newest", [1, 2, 3], [True] * 3 + [False] * 2, 2),
+    ("keep_latest", [5], [True] * 5, 4),
+])
+def test_overflow_policies(policy, expected, accepted, dropped):
+    stage_queue = StageQueue(maxsize=3, policy=policy)
+
+    assert [stage_queue.put(item) for item in range(1, 6)] == accepted
+    assert drain(stage_queue) == expected
+    stats = stage_queue.get_stats()
+    assert stats["dropped"] == dropped and stats["depth"] == 0
+
+
+def test_block_policy_applies_backpressure():
+    stage_queue = StageQueue(maxsize=1, policy="block")
+    stage_queue.put("first")
+
+    assert stage_queue.put("timed out", timeout=0.05) is False
+    threading.Timer(0.1, stage_queue.get).start()
+    assert stage_queue.put("second") is True
+    assert stage_queue.get(timeout=1) == "second"
+
+    stats = stage_queue.get_stats()
+    assert stats["max_put_wait_ms"] >= 50 and stats["dropped"] == 1 and stats["max_depth"] == 1
+    with pytest.raises(queue.Empty):
+        stage_queue.get(timeout=0.01)
+
+
+def test_config_overrides_defaults():
+    stage_queue = make_stage_queue("images", {"images": {"policy": "drop_newest"}}, maxsize=4)
+    assert (stage_queue.name, stage_queue.maxsize, stage_queue.policy) == ("images", 4, "drop_newest")
+    with pytest.raises(ValueError):
+        StageQueue(policy="sometimes")
+
+
+@pytest.mark.parametrize("policy, expected_dropped", [
+    ("drop_oldest", [1, 2]),
+    ("drop_newest", [4, 5]),
+    ("keep_latest", [1, 2, 3, 4]),
+])
+def test_on_drop_sees_every_discarded_item(policy, expected_dropped):
+    dropped = []
+    stage_queue = StageQueue(maxsize=3, policy=policy, on_drop=dropped.append)
+    for item in range(1, 6):
+        stage_queue.put(item)
+    assert sorted(dropped) == expected_dropped
+
+
+def test_close_releases_blocked_producer():
+    dropped = []
+    stage_queue = StageQueue(maxsize=1, policy="block", on_drop=dropped.append)
+    stage_queue.put("first")
+    threading.Timer(0.05, stage_queue.close).start()
+    assert stage_queue.put("second") is False
+    assert dropped == ["second"]
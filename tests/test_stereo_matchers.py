@@ -0,0 +1,86 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from stereo_matchers import MatcherPool
+
+
+def stereo_pair():
+    rng = np.random.default_rng(2)
+    left = cv2.GaussianBlur(rng.integers(0, 255, (60, 120), dtype=np.uint8), (3, 3), 0)
+    right = np.roll(left, -4, axis=1)
+    return left, right
+
+
+def test_matchers_are_built_once_and_updated_in_place():
+    pool = MatcherPool({"pairs": {1: {"algorithm": "sgbm", "block_size": 5}}}, pair_count=2)
+    bm = pool.matchers[0]
+    assert pool.matchers[1].getBlockSize() == 5
+
+    pool.update(0, num_disparities=32)
+    assert pool.matchers[0] is bm
+    assert bm.getNumDisparities() == 32
+
+    pool.update(0, algorithm="sgbm")
+    assert pool.matchers[0] is not bm
+    assert pool.matchers[0].getNumDisparities() == 32
+
+
+def test_compute_reuses_output_buffer_and_records_timings(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("stereo:\n  default:\n    block_size: 9\n")
+    pool = MatcherPool(pair_count=1)
+    assert pool.reload_if_changed(str(config_path))
+    assert not pool.reload_if_changed(str(config_path))
+    assert pool.matchers[0].getBlockSize() == 9
+
+    left, right = stereo_pair()
+    first = pool.compute(0, left, right)
+    second = pool.compute(0, left, right)
+    assert first is second
+    assert first.dtype == np.int16
+
+    timings = pool.get_timings()[0]
+    assert timings["frames"] == 2
+    assert timings["mean_ms"] > 0
+
+
+def test_a_bad_reload_keeps_the_previous_matchers(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("stereo:\n  default:\n    block_size: 9\n    uniqueness_ratio: 20\n")
+    pool = MatcherPool(pair_count=2)
+    assert pool.reload_if_changed(str(config_path))
+    good = dict(pool.matchers)
+
+    config_path.write_text("stereo:\n  default:\n    block_size: 8\n")
+    os.utime(config_path, (1, 1))
+    assert not pool.reload_if_changed(str(config_path))
+    assert pool.matchers == good
+    assert pool.matchers[0].getBlockSize() == 9
+    left, right = stereo_pair()
+    pool.compute(0, left, right)
+
+    # Removing a key goes back to its default instead of keeping the old value
+    config_path.write_text("stereo:\n  default:\n    block_size: 9\n")
+    os.utime(config_path, (2, 2))
+    assert pool.reload_if_changed(str(config_path))
+    assert pool.matchers[0].getUniquenessRatio() == cv2.StereoBM_create().getUniquenessRatio()
+    assert pool.params[0] == {"algorithm": "bm", "num_disparities": 16, "block_size": 9}
+
+
+def test_invalid_settings_are_rejected_up_front():
+    for settings in ({"block_size": 4}, {"num_disparities": 20}, {"algorithm": "sgm"}, {"blocksize": 5}):
+        with pytest.raises(ValueError):
+            MatcherPool({"default": settings}, pair_count=1)
+    pool = MatcherPool(pair_count=1)
+    with pytest.raises(ValueError):
+        pool.update(0, block_size=6)
+    assert pool.params[0]["block_size"] == 15
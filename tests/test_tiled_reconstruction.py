@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+import tiled_reconstruction
+from point_store import PointStore
+from tiled_reconstruction import TileMeshCache, TiledReconstructor, crop_mesh, plan_tiles
+
+
+def test_tiles_cover_every_point_and_respect_the_budget():
+    rng = np.random.default_rng(0)
+    # A dense cluster in one corner forces that tile to split further
+    points = np.concatenate([rng.uniform(0, 4, (2000, 3)), rng.uniform(0, 0.5, (3000, 3))]).astype(np.float32)
+
+    tiles = plan_tiles(points, tile_size=2.0, overlap=0.1, max_points=1500)
+
+    cores = np.zeros(len(points), dtype=int)
+    for core_lower, core_upper, inside in tiles:
+        assert len(inside) <= 1500 or (core_upper - core_lower).max() <= 0.2
+        in_core = ((points >= core_lower) & (points < core_upper)).all(axis=1)
+        assert set(np.flatnonzero(in_core)) <= set(inside.tolist())
+        cores += in_core
+    # Core boxes partition the cloud; margins overlap
+    assert (cores == 1).all()
+    assert len(tiles) > 8
+
+
+def test_crop_keeps_triangles_owned_by_the_core_box():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [3, 0, 0], [3, 1, 0]], dtype=np.float32)
+    normals = np.tile(np.float32([0, 0, 1]), (5, 1))
+    triangles = np.array([[0, 1, 2], [1, 3, 4]])
+
+    cropped_vertices, cropped_normals, cropped_triangles = crop_mesh(
+        vertices, normals, triangles, np.float32([-1, -1, -1]), np.float32([2, 2, 1]))
+
+    np.testing.assert_array_equal(cropped_vertices, vertices[:3])
+    np.testing.assert_array_equal(cropped_triangles, [[0, 1, 2]])
+    assert len(cropped_normals) == 3
+
+
+def test_an_empty_cloud_gives_an_empty_mesh():
+    points = np.empty((0, 3), np.float32)
+    assert plan_tiles(points, tile_size=2.0, overlap=0.1, max_points=1500) == []
+
+    reconstructor = TiledReconstructor(workers=1)
+    vertices, normals, triangles = reconstructor.reconstruct(points)
+    assert vertices.shape == (0, 3) and normals.shape == (0, 3) and triangles.shape == (0, 3)
+    assert reconstructor.get_stats()['tiles'] == 0
+    # Nothing to mesh, so no pool was started
+    assert reconstructor.pool is None
+
+
+def one_triangle_tile(points, core_lower, core_upper, poisson_depth, max_points):
+    # Stands in for Poisson in the pool workers: one triangle per tile
+    vertices = (core_lower + np.float32([[0, 0, 0], [0.1, 0, 0], [0, 0.1, 0]])).astype(np.float32)
+    return vertices, np.tile(np.float32([0, 0, 1]), (3, 1)), np.array([[0, 1, 2]], dtype=np.int32)
+
+
+def test_only_tiles_with_new_points_are_meshed_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(tiled_reconstruction, "mesh_tile", one_triangle_tile)
+    store = PointStore(str(tmp_path / "points"), bucket_size=1.0)
+    cache = TileMeshCache(str(tmp_path / "points" / "meshes"))
+    # Two buckets far enough apart that neither is within the other's margin
+    store.append(np.array([[0.5, 0.5, 0.5], [5.5, 0.5, 0.5]], dtype=np.float32))
+    reconstructor = TiledReconstructor(tile_size=1.0, overlap=0.1, workers=1)
+    try:
+        first = reconstructor.reconstruct_store(store, 0.0, cache)
+        assert (reconstructor.get_stats()['tiles'], reconstructor.get_stats()['cached_tiles']) == (2, 0)
+
+        store.append(np.array([[5.25, 0.5, 0.5]], dtype=np.float32))
+        second = reconstructor.reconstruct_store(store, 0.0, cache)
+        assert (reconstructor.get_stats()['tiles'], reconstructor.get_stats()['cached_tiles']) == (1, 1)
+    finally:
+        reconstructor.close()
+    assert len(first[2]) == len(second[2]) == 2
+    np.testing.assert_array_equal(np.sort(first[0], axis=0), np.sort(second[0], axis=0))
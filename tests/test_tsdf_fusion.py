@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# Project modules import each other by flat name, as on the Pi
+sys.path.append(str(Path(__file__).resolve().parents[1] / "home" / "pi" / "project"))
+
+from depth_format import DepthFrame
+from tsdf_fusion import TSDFFusion
+
+# World-to-camera: camera 0 looks along +z, camera 1 is turned around to look along -z
+POSES = {0: np.eye(4), 1: np.diag([-1.0, 1.0, -1.0, 1.0])}
+
+
+def plane_frame(camera):
+    depth = np.full((60, 80), 1000, dtype=np.uint16)
+    return DepthFrame(depth, camera, 1.0, 1.0, 60.0, 60.0, 40.0, 30.0)
+
+
+def test_tsdf_fusion_refuses_to_start_without_poses():
+    with pytest.raises(ValueError, match="camera_poses"):
+        TSDFFusion(camera_poses={})
+
+
+def test_unposed_frames_are_counted_and_leave_the_volume_empty():
+    # Runs without open3d: skipped frames never touch the volume
+    fusion = TSDFFusion(camera_poses={0: np.eye(4)})
+
+    fusion.integrate([plane_frame(1), plane_frame(2)])
+
+    stats = fusion.get_stats()
+    assert (stats["frame_sets"], stats["frames"], stats["skipped_frames"]) == (1, 0, 2)
+    assert not fusion.mesh_due()
+    with pytest.raises(ValueError):
+        fusion.extract_mesh()
+
+
+def test_fused_plane_extracts_at_its_depth():
+    pytest.importorskip("open3d", exc_type=ImportError)
+    fusion = TSDFFusion(voxel_length=0.02, sdf_trunc=0.08, camera_poses={0: np.eye(4)}, mesh_interval=60.0)
+
+    assert not fusion.mesh_due()
+    for _ in range(3):
+        fusion.integrate([plane_frame(0)])
+    mesh = fusion.extract_mesh()
+
+    vertices = np.asarray(mesh.vertices)
+    assert len(vertices) > 0
+    assert np.median(vertices[:, 2]) == pytest.approx(1.0, abs=0.03)
+    assert not fusion.mesh_due()
+    assert fusion.get_stats()["frames"] == 3
+
+    # Only unposed frames since the last mesh: nothing new to save
+    fusion.last_mesh_time = None
+    fusion.integrate([plane_frame(1)])
+    assert not fusion.mesh_due()
+    fusion.integrate([plane_frame(0)])
+    assert fusion.mesh_due()
+
+
+def test_posed_cameras_fuse_to_distinct_surfaces_and_unposed_are_skipped():
+    pytest.importorskip("open3d", exc_type=ImportError)
+    fusion = TSDFFusion(voxel_length=0.02, sdf_trunc=0.08, camera_poses=POSES)
+
+    for _ in range(2):
+        fusion.integrate([plane_frame(0), plane_frame(1), plane_frame(2)])
+    vertices = np.asarray(fusion.extract_mesh().vertices)
+
+    front = vertices[vertices[:, 2] > 0]
+    back = vertices[vertices[:, 2] < 0]
+    assert len(front) > 0 and len(back) > 0
+    assert np.median(front[:, 2]) == pytest.approx(1.0, abs=0.03)
+    assert np.median(back[:, 2]) == pytest.approx(-1.0, abs=0.03)
+    stats = fusion.get_stats()
+    assert (stats["frames"], stats["skipped_frames"]) == (4, 2)